@@ -0,0 +1,30 @@
+"""Camada de dados do Gerenciador de Campanhas, sem dependência de tkinter."""
+from .changes import MISSING, Change, ChangeLog, describe_diff, field_diff
+from .database import (
+    HISTORY_SOURCE, CatalogDatabase, DatabaseHistory, DatabaseRecords, load_catalog_db, load_table,
+)
+from .diagnostics import Recorder, StartupReport, recorder
+from .encounters import (
+    DIFFICULTY_LEVELS, XP_BY_CHALLENGE, XP_THRESHOLDS, EncounterBuilder, encounter_multiplier, estimate_challenge,
+    xp_window,
+)
+from .export import export_campaign_file, patch_fields, patch_records_file, pending_additions, skipped_additions
+from .formats import DEFAULT_FORMAT, FORMATS, Format, file_patterns, format_for, get_format, split_extension
+from .history import HistoryStore
+from .model import (
+    ARRAY_FIELDS, DIFICULDADES, ENUM_FIELDS, FIELDS, LIST_FIELDS, NUMERIC_FIELDS, RARIDADES, Campaign,
+    append_names, build_campaign, empty_value, intern_enums, is_empty_value,
+)
+from .references import REFERENCE_FIELDS, RefCollector, ReferenceIndex, extract_refs
+from .schema import (
+    CAMPAIGN_SCHEMA, ITEM_SCHEMA, MONSTER_SCHEMA, SCHEMAS, RecordCheck, Validator, compile_schema, format_problem,
+    validate_file, validate_files, validate_records, validator_for,
+)
+from .search import (
+    FACET_FIELDS, SEARCH_FIELDS, Facets, SearchIndex, challenge_value, filter_names, normalize_text, tokenize,
+)
+from .storage import (
+    LazyRecords, file_signature, iter_json_array, load_catalog, load_records, read_catalog_cache,
+    save_records, write_array, write_catalog_cache, write_records,
+)
+from .watcher import FileWatcher
@@ -0,0 +1,207 @@
+"""Geração de arquivos de campanhas em lote, a partir de uma especificação JSON.
+
+Formato da especificação (caminhos relativos ao arquivo da especificação):
+
+    {
+        "monstros": "monstros.json",
+        "itens": "itens.json",
+        "arquivos": [
+            {
+                "origem": "campanhas.json",
+                "destino": "saida/campanhas_novo.json",
+                "compacto": false,
+                "editar": {"A Maldição do Bosque Sombrio": {"dificuldade": "médio"}},
+                "adicionar": [
+                    {"titulo": "Nova", "importar_monstros": "morto-vivo", "importar_itens": ["poção"]}
+                ]
+            }
+        ]
+    }
+
+"origem" é opcional (sem ela o destino contém só as campanhas adicionadas).
+O formato do destino sai da extensão dele (.json, .jsonl, .json.gz, .msgpack;
+ver formats) ou de "formato", que troca a extensão do destino se ela não for a
+do formato; "compacto" vale para o JSON. A origem é lida no formato da sua extensão.
+"importar_monstros"/"importar_itens" são buscas (ver SearchIndex), ou objetos
+com "busca" e critérios (ver expand_imports), cujos registros encontrados são
+acrescentados por id a "monstros"/"recompensas", sem repetir os que a campanha
+já cita, como os botões de importação da interface. "gerar_encontro" ({"nivel":
+N, "semente": S}) sorteia monstros, chefão e recompensas balanceados para a
+dificuldade e o grupoMinimo da campanha (ver EncounterBuilder).
+"""
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .encounters import EncounterBuilder
+from .export import export_campaign_file, skipped_additions
+from .formats import format_for, get_format, split_extension
+from .model import Campaign, append_names
+from .references import ReferenceIndex
+from .search import FACET_FIELDS, filter_names
+from .storage import load_catalog, load_records
+
+IMPORT_TARGETS = {"importar_monstros": ("monstros", "monstros"), "importar_itens": ("itens", "recompensas")}
+
+_catalogs = {}  # "monstros"/"itens" -> (LazyRecords, SearchIndex), por processo
+_references = ReferenceIndex()  # nome -> id dos catálogos carregados
+_encounters = []  # [EncounterBuilder] dos catálogos carregados, montado no primeiro uso
+
+
+def load_spec(path):
+    """Lê a especificação e resolve os caminhos relativos ao diretório dela."""
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return p if p is None or os.path.isabs(p) else os.path.join(base, p)
+
+    spec["monstros"] = resolve(spec.get("monstros"))
+    spec["itens"] = resolve(spec.get("itens"))
+    for job in spec.get("arquivos", []):
+        job["origem"] = resolve(job.get("origem"))
+        job["destino"] = resolve(job["destino"])
+    return spec
+
+
+def load_catalogs(monsters_path=None, items_path=None):
+    """Carrega (com cache) os catálogos usados pelas importações deste processo."""
+    _catalogs.clear()
+    if monsters_path and os.path.exists(monsters_path):
+        _catalogs["monstros"] = load_catalog(monsters_path, "nome")
+    if items_path and os.path.exists(items_path):
+        _catalogs["itens"] = load_catalog(items_path, "nome")
+    for catalog in ("monstros", "itens"):
+        _references.set_catalog(catalog, _catalogs[catalog][0] if catalog in _catalogs else {})
+    _encounters.clear()
+
+
+def generate_encounter(camp, options):
+    """Preenche monstros/chefões/recompensas com um encontro para a dificuldade e o grupoMinimo da campanha.
+
+    `options` é {"nivel": N, "semente": S} (ambos opcionais) ou só o nível.
+    """
+    if "monstros" not in _catalogs:
+        raise ValueError("'gerar_encontro' exige o arquivo de monstros.")
+    if not isinstance(options, dict):
+        options = {"nivel": options}
+    if not _encounters:
+        _encounters.append(EncounterBuilder(_catalogs["monstros"][0], _catalogs.get("itens", (None,))[0]))
+    rng = random.Random(options["semente"]) if options.get("semente") is not None else random
+    try:
+        party_size = int(camp.get("grupoMinimo") or 4)
+    except (TypeError, ValueError):
+        raise ValueError("'gerar_encontro' exige grupoMinimo inteiro.") from None
+    encounter = _encounters[0].generate(camp.get("dificuldade", "médio"), party_size,
+                                        int(options.get("nivel", 1)), rng)
+    if encounter is None:
+        raise ValueError(f"Nenhum encontro cabe no orçamento de XP de '{camp.get('titulo')}'.")
+    for field in ("monstros", "chefões", "recompensas"):
+        camp[field] = encounter[field]
+
+
+def expand_imports(camp):
+    """Troca "gerar_encontro" e as chaves "importar_*" de uma campanha pelos ids dos registros.
+
+    Cada consulta é um texto de busca ou um objeto com "busca" e critérios de
+    FACET_FIELDS (ex.: {"tipo": "Não-morto", "nivelDesafio": [null, 2]}).
+    Registros que a campanha já cita (por id ou nome) não são repetidos.
+    """
+    camp = dict(camp)
+    options = camp.pop("gerar_encontro", None)
+    if options is not None:
+        generate_encounter(camp, options)
+    for key, (catalog, field) in IMPORT_TARGETS.items():
+        queries = camp.pop(key, None)
+        if queries is None:
+            continue
+        if catalog not in _catalogs:
+            raise ValueError(f"'{key}' exige o arquivo de {catalog}.")
+        records, index = _catalogs[catalog]
+        if isinstance(queries, (str, dict)):
+            queries = [queries]
+        names = []
+        for query in queries:
+            if isinstance(query, dict):
+                criteria = {f: tuple(v) if isinstance(v, list) else v for f, v in query.items() if f in FACET_FIELDS}
+                names.extend(filter_names(index, records.facets, query.get("busca", ""), criteria))
+            else:
+                names.extend(index.search(query))
+        existing = camp.get(field)
+        if existing is None or existing == "nenhum":
+            existing = []
+        camp[field] = append_names(existing, _references.new_refs(catalog, existing, names))
+    return camp
+
+
+def run_job(job, compact=False, fmt=None):
+    """Gera um arquivo da especificação; retorna um resumo (dict) da execução."""
+    start = time.perf_counter()
+    added = {}
+    for camp in job.get("adicionar", []):
+        camp = expand_imports(camp)
+        if not camp.get("titulo"):
+            raise ValueError("Toda campanha adicionada precisa de 'titulo'.")
+        added[camp["titulo"]] = Campaign.from_dict(camp)
+    compact = job.get("compacto", compact)
+    dest = job["destino"]
+    fmt = job.get("formato", fmt)
+    if fmt:
+        fmt = get_format(fmt)
+        base, ext = split_extension(dest)
+        if ext.lower() not in (fmt.extension, *fmt.extensions):
+            dest = base + fmt.extension  # O arquivo precisa ser relido pelo formato certo
+    else:
+        fmt = format_for(dest)
+        if compact and fmt.name == "json":
+            fmt = get_format("json-compacto")
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    source = job.get("origem")
+    modified = {}  # titulo -> campos editados (só esses valores são reescritos)
+    skipped = []   # Adições ignoradas por já existirem na origem
+    if source:
+        campaigns = load_records(source, "titulo", decode=Campaign.from_dict, fmt=format_for(source))
+        locations = campaigns.locations()
+        for title, changes in job.get("editar", {}).items():
+            if title not in campaigns:
+                raise ValueError(f"Campanha '{title}' não existe em {os.path.basename(source)}.")
+            campaigns[title].update(changes)
+            modified.setdefault(title, set()).update(changes)
+        skipped = skipped_additions(campaigns, locations, modified, added)
+        export_campaign_file(source, dest, campaigns, locations, modified, added, fmt=fmt)
+    else:
+        fmt.write(dest, ((name, None, camp) for name, camp in added.items()))
+    result = {"destino": dest, "editadas": len(modified), "adicionadas": len(added) - len(skipped)}
+    if skipped:
+        result["ignoradas"] = skipped
+    result["segundos"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _run_job_safe(job, compact, fmt=None):
+    try:
+        return run_job(job, compact, fmt)
+    except Exception as e:
+        return {"destino": job.get("destino"), "erro": str(e)}
+
+
+def run_spec(spec, jobs=1, compact=False, fmt=None):
+    """Executa todos os arquivos da especificação, em `jobs` processos.
+
+    `fmt` (nome do formato) vale para os arquivos sem "formato" próprio.
+
+    Cada processo carrega os catálogos uma vez (via cache). Retorna a lista de
+    resumos na ordem da especificação; falhas vêm com a chave "erro".
+    """
+    entries = spec.get("arquivos", [])
+    if jobs <= 1 or len(entries) <= 1:
+        load_catalogs(spec.get("monstros"), spec.get("itens"))
+        return [_run_job_safe(job, compact, fmt) for job in entries]
+    # Aquece os caches no processo principal para os workers não os gravarem juntos
+    load_catalogs(spec.get("monstros"), spec.get("itens"))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=load_catalogs,
+                             initargs=(spec.get("monstros"), spec.get("itens"))) as pool:
+        return list(pool.map(_run_job_safe, entries, [compact] * len(entries), [fmt] * len(entries)))
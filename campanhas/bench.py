@@ -0,0 +1,257 @@
+"""Dados sintéticos e benchmark dos caminhos de carga, edição e exportação.
+
+generate_dataset() grava campanhas.json, monstros.json e itens.json com o
+formato dos arquivos distribuídos (campanhas citam monstros/itens por id), em
+streaming, então 1M de registros não exige a coleção inteira em memória.
+run_benchmarks() mede, sem tkinter, o trabalho de dados de cada ação da
+interface (load_file_campaigns, load_monsters/load_items, filter_catalog,
+edição/desfazer, generate_file e on_closing) e retorna um dict serializável em
+JSON, para comparar versões.
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from .changes import ChangeLog
+from .export import export_campaign_file
+from .formats import FORMATS
+from .history import HistoryStore
+from .model import DIFICULDADES, RARIDADES, Campaign
+from .references import RefCollector, ReferenceIndex
+from .storage import CACHE_SUFFIX, load_catalog, load_records
+
+BENCH_VERSION = 1
+SIZES = (1000, 10000, 100000, 1000000)
+DATASET_FILES = ("campanhas.json", "monstros.json", "itens.json")
+SEARCH_QUERIES = ("", "dra", "morto v", "raro", "caótico mau")
+
+_WORDS = ("sombra antiga floresta ruína cripta dragão culto pântano montanha gelo fogo torre "
+          "segredo maldição portal reino aldeia mestre grupo heróis tesouro masmorra névoa "
+          "lâmina trono ecos véu abismo farol ilha deserto cidade").split()
+_PLACES = ("Bosque de Eldergreen", "Cidade de Ironhaven", "Montanhas Cinzentas", "Pântano de Mirefall",
+           "Deserto de Sal", "Ilha dos Ecos", "Cripta de Valdor", "Torre de Marfim")
+_MONSTER_TYPES = ("Não-morto", "Monstruosidade", "Aberração", "Bestial", "Aracnídeo", "Humanoide",
+                  "Dragão", "Constructo", "Humanoide (goblinoide)")
+_ALIGNMENTS = ("Caótico e Mau", "Leal e Mau", "Neutro", "Neutro Mau", "Caótico Neutro")
+_CHALLENGE = ("1/8", "1/4", "1/2", "1", "2", "3", "4", "5", "6", "8")
+_ITEM_TYPES = ("Arma", "Poção", "Acessório", "Escudo", "Anel", "Armadura", "Báculo", "Amuleto")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _campaign(i, rng, monsters, items):
+    return {
+        "id": f"campanha{i}",
+        "titulo": f"{_sentence(rng, 3)[:-1]} {i}",
+        "imagem": "assets/images/ecos-logo.png",
+        "dificuldade": rng.choice(DIFICULDADES),
+        "grupoMinimo": rng.randint(2, 6),
+        "localidade": rng.choice(_PLACES),
+        "corpo": " ".join(_sentence(rng, 12) for _ in range(4)),
+        "monstros": [f"monstro{rng.randrange(monsters)}" for _ in range(rng.randint(1, 4))],
+        "chefões": [f"monstro{rng.randrange(monsters)}"],
+        "recompensas": [f"item{rng.randrange(items)}" for _ in range(rng.randint(1, 3))],
+        "npcs": [f"NPC {rng.randrange(1000)}" for _ in range(2)],
+    }
+
+
+def _monster(i, rng):
+    return {
+        "id": f"monstro{i}",
+        "foto": "assets/images/ecos-logo.png",
+        "nome": f"{_sentence(rng, 2)[:-1]} {i}",
+        "tipo": rng.choice(_MONSTER_TYPES),
+        "alinhamento": rng.choice(_ALIGNMENTS),
+        "classeArmadura": str(rng.randint(10, 20)),
+        "pontosVida": f"{rng.randint(5, 200)} ({rng.randint(1, 20)}d8)",
+        "deslocamento": "30 pés",
+        "forca": str(rng.randint(3, 20)),
+        "destreza": str(rng.randint(3, 20)),
+        "constituição": str(rng.randint(3, 20)),
+        "inteligencia": str(rng.randint(3, 20)),
+        "sabedoria": str(rng.randint(3, 20)),
+        "carisma": str(rng.randint(3, 20)),
+        "pericias": "Furtividade +4",
+        "sentidos": "Visão no escuro 60 pés, Percepção passiva 10",
+        "idiomas": "Comum",
+        "nivelDesafio": rng.choice(_CHALLENGE),
+        "ataques": [_sentence(rng, 10)],
+        "ações": [_sentence(rng, 8)],
+    }
+
+
+def _item(i, rng):
+    return {
+        "id": f"item{i}",
+        "nome": f"{_sentence(rng, 2)[:-1]} {i}",
+        "tipo": rng.choice(_ITEM_TYPES),
+        "descricao": _sentence(rng, 10),
+        "efeito": _sentence(rng, 6),
+        "dano": f"1d{rng.choice((4, 6, 8))} de fogo" if rng.random() < 0.3 else None,
+        "cura": None,
+        "buffDebuff": {"buff": "CA", "valor": "+1"} if rng.random() < 0.2 else None,
+        "raridade": rng.choice(RARIDADES),
+    }
+
+
+def _write_array(path, records, inline_arrays=False):
+    """Grava um array JSON registro a registro.
+
+    inline_arrays=True usa o estilo de campanhas.json (recuo 2, listas em uma
+    linha); senão, o de json.dump(..., indent=4) deslocado, como monstros.json.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        sep = "\n"
+        for rec in records:
+            if inline_arrays:
+                body = ",\n".join(f"    {json.dumps(k, ensure_ascii=False)}: {json.dumps(v, ensure_ascii=False)}"
+                                  for k, v in rec.items())
+                text = "  {\n" + body + "\n  }"
+            else:
+                text = "    " + json.dumps(rec, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            f.write(sep + text)
+            sep = ",\n"
+        f.write("\n]\n")
+
+
+def generate_dataset(directory, count, seed=0):
+    """Gera `count` campanhas, monstros e itens em `directory`; retorna {arquivo: bytes}."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    _write_array(os.path.join(directory, "monstros.json"), (_monster(i, rng) for i in range(count)))
+    _write_array(os.path.join(directory, "itens.json"), (_item(i, rng) for i in range(count)))
+    _write_array(os.path.join(directory, "campanhas.json"),
+                 (_campaign(i, rng, count, count) for i in range(count)), inline_arrays=True)
+    return {name: os.path.getsize(os.path.join(directory, name)) for name in DATASET_FILES}
+
+
+def _measure(func, repeat, setup=None):
+    """Roda func() `repeat` vezes (setup() antes de cada uma, fora da medição)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        result = func(arg) if setup is not None else func()
+        times.append(time.perf_counter() - start)
+    return result, {"segundos": round(min(times), 6), "mediana": round(statistics.median(times), 6),
+                    "execucoes": repeat}
+
+
+def run_benchmarks(directory, repeat=3, edit_fraction=0.01):
+    """Mede as operações sobre o conjunto de dados de `directory` (ver generate_dataset).
+
+    Os arquivos gerados durante a medição (exportação, histórico) ficam num
+    diretório temporário, removido ao final. Retorna um dict serializável em JSON.
+    """
+    paths = {name: os.path.join(directory, name) for name in DATASET_FILES}
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="bench-", dir=directory)
+    try:
+        # load_file_campaigns: leitura em streaming + coleta das referências
+        def load_campaigns():
+            refs = RefCollector()
+            return load_records(paths["campanhas.json"], "titulo", decode=Campaign.from_dict, visit=refs), refs
+        (campaigns, refs), results["carregar_campanhas"] = _measure(load_campaigns, repeat)
+
+        # load_monsters/load_items: sem cache (analisa o JSON) e com cache
+        catalogs = {}
+        for name, label in (("monstros.json", "monstros"), ("itens.json", "itens")):
+            path = paths[name]
+
+            def cold(_, path=path):
+                return load_catalog(path, "nome", rebuild=True)
+
+            def drop_cache(path=path):
+                if os.path.exists(path + CACHE_SUFFIX):
+                    os.remove(path + CACHE_SUFFIX)
+
+            _, results[f"carregar_{label}_sem_cache"] = _measure(cold, repeat, setup=drop_cache)
+            catalogs[label], results[f"carregar_{label}_com_cache"] = _measure(
+                lambda path=path: load_catalog(path, "nome"), repeat)
+
+        # filter_catalog/update_listboxes: buscas nos índices dos catálogos
+        def search():
+            return sum(len(index.search(q)) for _, index in catalogs.values() for q in SEARCH_QUERIES)
+        _, results["buscar"] = _measure(search, repeat)
+
+        # Verificação de referências (índice reverso)
+        def dangling():
+            index = ReferenceIndex()
+            index.set_catalog("monstros", catalogs["monstros"][0])
+            index.set_catalog("itens", catalogs["itens"][0])
+            index.set_source("file", refs.refs)
+            return index.dangling()
+        _, results["verificar_referencias"] = _measure(dangling, repeat)
+
+        # Edição pelo ChangeLog, desfazer/refazer e exportação só dos campos alterados
+        titles = list(campaigns)
+        rng = random.Random(1)
+        edited = rng.sample(titles, max(1, int(len(titles) * edit_fraction)))
+        log = ChangeLog(lambda source: campaigns)
+
+        def edit():
+            for title in edited:
+                log.edit("file", title, {"dificuldade": rng.choice(DIFICULDADES),
+                                         "monstros": ["monstro0", f"monstro{rng.randrange(len(titles))}"]})
+        _, results["editar"] = _measure(edit, repeat)
+
+        def undo_redo():
+            while log.undo() is not None:
+                pass
+            while log.redo() is not None:
+                pass
+        _, results["desfazer_refazer"] = _measure(undo_redo, repeat)
+
+        locations = {name: (offset, length) for name, offset, length in campaigns.summaries()}
+        pending = log.pending("file")
+        modified = {title: set(diff) for title, diff in pending["modified"].items()}
+        added = {f"Nova {i}": Campaign.from_dict(_campaign(-i, rng, 10, 10)) for i in range(1, 11)}
+        for title, camp in added.items():
+            camp["titulo"] = title
+        labels = {"json": "exportar", "json-compacto": "exportar_compacto"}
+        for fmt in FORMATS.values():
+            out_path = os.path.join(tmp, "campanhas_novo" + fmt.extension)
+            _, results[labels.get(fmt.name, f"exportar_{fmt.name}")] = _measure(
+                lambda fmt=fmt, out_path=out_path: export_campaign_file(
+                    paths["campanhas.json"], out_path, campaigns, locations, modified, added, fmt=fmt),
+                repeat)
+
+        # on_closing: diário do histórico e compactação (regrava o snapshot)
+        history = HistoryStore(os.path.join(tmp, "historico.json"))
+
+        def journal():
+            for title in edited:
+                history.put(campaigns[title])
+            history.close()
+        _, results["historico_diario"] = _measure(journal, repeat)
+        _, results["historico_compactar"] = _measure(lambda: history.compact(campaigns), repeat)
+        history.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "versao": BENCH_VERSION,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "registros": len(campaigns),
+        "editadas": len(edited),
+        "arquivos": {name: os.path.getsize(path) for name, path in paths.items()},
+        "operacoes": results,
+    }
+
+
+def format_results(result, out=sys.stdout):
+    """Tabela legível de um resultado de run_benchmarks()."""
+    out.write(f"{result['registros']} registros ({result['editadas']} editadas), Python {result['python']}\n")
+    for name, stats in result["operacoes"].items():
+        out.write(f"  {name:<28} {stats['segundos'] * 1000:>10.1f} ms  (mediana {stats['mediana'] * 1000:.1f} ms)\n")
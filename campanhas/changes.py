@@ -0,0 +1,234 @@
+"""Log de alterações das campanhas: desfazer/refazer e resumo do que mudou."""
+from collections import deque
+
+MISSING = object()  # Campo ausente no registro (antes ou depois de uma alteração)
+
+
+class Change:
+    """Um comando aplicado: inclusão, exclusão ou edição (diff por campo)."""
+
+    __slots__ = ("kind", "source", "title", "record", "diff")
+
+    def __init__(self, kind, source, title, record=None, diff=None):
+        self.kind = kind      # "add", "del" ou "edit"
+        self.source = source  # Aba da campanha ("file", "added", "history")
+        self.title = title
+        self.record = record  # Registro incluído/excluído
+        self.diff = diff      # campo -> (valor antigo, valor novo), nas edições
+
+    def describe(self):
+        if self.kind == "add":
+            return f"inclusão de '{self.title}'"
+        if self.kind == "del":
+            return f"exclusão de '{self.title}'"
+        return f"edição de '{self.title}' ({', '.join(self.diff)})"
+
+
+class ChangeLog:
+    """Comandos de inclusão/exclusão/edição sobre as coleções de campanhas.
+
+    `get_store(fonte)` devolve o dicionário titulo -> campanha da fonte; cada
+    comando guarda só o necessário para ser revertido (o diff dos campos ou o
+    registro removido), então desfazer/refazer custa O(campos alterados).
+    `on_change(fonte, titulo)` é chamado depois de cada aplicação, para a
+    interface atualizar listas, índices e o diário do histórico.
+
+    Na primeira alteração de cada campanha o estado original é guardado, e
+    pending() compara com ele: editar e desfazer não deixa nada pendente.
+    """
+
+    def __init__(self, get_store, on_change=None, limit=1000):
+        self.get_store = get_store
+        self.on_change = on_change
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+        self._baseline = {}  # (fonte, titulo) -> dict original ou MISSING
+
+    # --- Comandos ---
+    def add(self, source, title, record):
+        """Inclui uma campanha; se o título já existe, vira uma edição dela."""
+        store = self.get_store(source)
+        if title in store:
+            return self.edit(source, title, record)
+        return self._do(Change("add", source, title, record=record))
+
+    def delete(self, source, title):
+        store = self.get_store(source)
+        if title not in store:
+            return None
+        return self._do(Change("del", source, title, record=store[title]))
+
+    def edit(self, source, title, values):
+        """Atualiza os campos de `values` (como dict.update); None se nada mudou."""
+        current = self.get_store(source)[title]
+        diff = {}
+        for field, new in values.items():
+            old = current.get(field, MISSING)
+            if old != new or type(old) is not type(new):
+                diff[field] = (old, new)
+        if not diff:
+            return None
+        return self._do(Change("edit", source, title, diff=diff))
+
+    def _do(self, change):
+        self._apply(change, undo=False)
+        self._undo.append(change)
+        self._redo.clear()
+        return change
+
+    # --- Desfazer/refazer ---
+    def next_undo(self):
+        """Comando que undo() reverteria (sem aplicá-lo)."""
+        return self._undo[-1] if self._undo else None
+
+    def next_redo(self):
+        return self._redo[-1] if self._redo else None
+
+    def undo(self):
+        """Reverte o último comando; retorna-o (ou None se não houver)."""
+        if not self._undo:
+            return None
+        change = self._undo.pop()
+        self._apply(change, undo=True)
+        self._redo.append(change)
+        return change
+
+    def redo(self):
+        if not self._redo:
+            return None
+        change = self._redo.pop()
+        self._apply(change, undo=False)
+        self._undo.append(change)
+        return change
+
+    def _apply(self, change, undo):
+        store = self.get_store(change.source)
+        key = (change.source, change.title)
+        if key not in self._baseline:
+            original = store.get(change.title)
+            self._baseline[key] = MISSING if original is None else dict(original)
+        kind = change.kind
+        if undo and kind != "edit":
+            kind = "del" if kind == "add" else "add"
+        if kind == "add":
+            store[change.title] = change.record
+        elif kind == "del":
+            del store[change.title]
+        else:
+            record = store[change.title]
+            for field, (old, new) in change.diff.items():
+                value = old if undo else new
+                if value is MISSING:
+                    record.pop(field, None)
+                else:
+                    record[field] = value
+        if self.on_change is not None:
+            self.on_change(change.source, change.title)
+
+    def reset_source(self, source):
+        """Esquece os comandos de uma fonte (ex.: o arquivo foi recarregado)."""
+        self._undo = deque((c for c in self._undo if c.source != source), maxlen=self._undo.maxlen)
+        self._redo = [c for c in self._redo if c.source != source]
+        for key in [key for key in self._baseline if key[0] == source]:
+            del self._baseline[key]
+
+    def rebase(self, source, fresh):
+        """Reaplica as alterações líquidas de uma fonte sobre `fresh` (a fonte relida do disco).
+
+        Os campos editados prevalecem sobre os do disco, e inclusões/exclusões são
+        refeitas em `fresh`. Os registros editados são atualizados no lugar e
+        passam para `fresh`, então quem os referencia (ex.: o editor) continua
+        válido. Os originais passam a ser as versões do disco e os comandos da
+        fonte são esquecidos (não se desfaz através de uma recarga). Retorna
+        {titulo: [campos]} alterados no disco e pelo usuário (valeu o do usuário).
+        """
+        store = self.get_store(source)
+        pending = [(title, base, store.get(title)) for (src, title), base in self._baseline.items() if src == source]
+        self.reset_source(source)
+        conflicts = {}
+        for title, base, current in pending:
+            disk = fresh.get(title)
+            key = (source, title)
+            if current is None:
+                if base is not MISSING and disk is not None:
+                    del fresh[title]
+                    self._baseline[key] = dict(disk)
+                continue
+            if base is MISSING or disk is None:
+                fresh[title] = current
+                self._baseline[key] = MISSING if disk is None else dict(disk)
+                continue
+            diff = field_diff(base, current)
+            if not diff:
+                continue
+            theirs = field_diff(base, disk)
+            clash = [f for f in diff if f in theirs and f in field_diff(disk, current)]
+            if clash:
+                conflicts[title] = clash
+            merged = dict(disk)
+            for field, (_, new) in diff.items():
+                if new is MISSING:
+                    merged.pop(field, None)
+                else:
+                    merged[field] = new
+            for field in [f for f in current if f not in merged]:
+                del current[field]
+            current.update(merged)
+            fresh[title] = current
+            self._baseline[key] = dict(disk)
+        return conflicts
+
+    # --- Resumo ---
+    def pending(self, source):
+        """Alterações líquidas de uma fonte em relação ao estado original.
+
+        Retorna {"modified": {titulo: {campo: (original, atual)}}, "added": [titulos],
+        "deleted": [titulos]}.
+        """
+        store = self.get_store(source)
+        result = {"modified": {}, "added": [], "deleted": []}
+        for (src, title), base in self._baseline.items():
+            if src != source:
+                continue
+            current = store.get(title)
+            if base is MISSING:
+                if current is not None:
+                    result["added"].append(title)
+            elif current is None:
+                result["deleted"].append(title)
+            else:
+                diff = field_diff(base, current)
+                if diff:
+                    result["modified"][title] = diff
+        return result
+
+
+def field_diff(old, new):
+    """{campo: (antigo, novo)} dos campos que diferem entre dois registros."""
+    diff = {}
+    for field in dict.fromkeys([*old, *new]):
+        a, b = old.get(field, MISSING), new.get(field, MISSING)
+        if a is not b and (a is MISSING or b is MISSING or a != b or type(a) is not type(b)):
+            diff[field] = (a, b)
+    return diff
+
+
+def describe_diff(field, old, new, width=40):
+    """Uma linha legível para a alteração de um campo."""
+    if isinstance(old, list) and isinstance(new, list):
+        added = [v for v in new if v not in old]
+        removed = [v for v in old if v not in new]
+        parts = [f"+{v}" for v in added] + [f"-{v}" for v in removed]
+        return f"{field}: {' '.join(parts) if parts else 'reordenado'}"
+    if old is MISSING:
+        return f"{field}: (novo) {_short(new, width)}"
+    if new is MISSING:
+        return f"{field}: removido"
+    if isinstance(old, str) and isinstance(new, str) and max(len(old), len(new)) > width:
+        return f"{field}: alterado ({len(old)} -> {len(new)} caracteres)"
+    return f"{field}: {_short(old, width)} -> {_short(new, width)}"
+
+
+def _short(value, width):
+    text = repr(value) if not isinstance(value, str) else f'"{value}"'
+    return text if len(text) <= width else text[:width - 3] + "..."
@@ -0,0 +1,338 @@
+"""Linha de comando: `python -m campanhas <comando> ...` (não importa tkinter)."""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from .batch import load_spec, run_spec
+from .bench import DATASET_FILES, format_results, generate_dataset, run_benchmarks
+from .database import HISTORY_SOURCE, CatalogDatabase
+from .directory import list_campaign_files, process_directory
+from .encounters import DIFFICULTY_LEVELS, EncounterBuilder
+from .formats import FORMATS, format_for
+from .history import HistoryStore
+from .references import RefCollector, ReferenceIndex
+from .schema import SCHEMAS, format_problem, validate_files
+from .storage import load_catalog, load_records
+
+
+def cmd_gerar(args):
+    spec = load_spec(args.spec)
+    if args.monstros:
+        spec["monstros"] = os.path.abspath(args.monstros)
+    if args.itens:
+        spec["itens"] = os.path.abspath(args.itens)
+    start = time.perf_counter()
+    results = run_spec(spec, jobs=args.jobs, compact=args.compacto, fmt=args.formato)
+    failed = 0
+    for res in results:
+        if "erro" in res:
+            failed += 1
+            print(f"ERRO  {res['destino']}: {res['erro']}", file=sys.stderr)
+        elif not args.json:
+            print(f"ok    {res['destino']} (+{res['adicionadas']} adicionadas, "
+                  f"{res['editadas']} editadas, {res['segundos']:.3f}s)")
+            for title in res.get("ignoradas", ()):
+                print(f"      ignorada (o título já existe na origem): {title}")
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+    else:
+        print(f"{len(results) - failed}/{len(results)} arquivo(s) em {time.perf_counter() - start:.3f}s")
+    return 1 if failed else 0
+
+
+def cmd_diretorio(args):
+    edits = None
+    if args.edicoes:
+        with open(args.edicoes, "r", encoding="utf-8") as f:
+            edits = json.load(f)
+    start = time.perf_counter()
+    summary = process_directory(args.diretorio, edits=edits, output_dir=args.saida,
+                                jobs=args.jobs, compact=args.compacto)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=4))
+        return 1 if any(item["destino"] is None for item in summary) else 0
+    failed = 0
+    for item in summary:
+        name = os.path.basename(item["arquivo"])
+        if item["destino"] is None:
+            failed += 1
+            print(f"ERRO  {name}: {item['problemas'][0]}", file=sys.stderr)
+            continue
+        print(f"{name:<40} {item['campanhas']:>7} campanhas  {len(item['duplicadas']):>5} duplicadas  "
+              f"{item['editadas']:>5} editadas  leitura {item['leitura']:.3f}s  escrita {item['escrita']:.3f}s")
+        for title, owner in item["duplicadas"]:
+            print(f"    duplicada: '{title}' (mantida em {os.path.basename(owner)})")
+        for problem in item["problemas"]:
+            print(f"    problema: {problem}")
+    print(f"{len(summary) - failed}/{len(summary)} arquivo(s) em {time.perf_counter() - start:.3f}s")
+    return 1 if failed else 0
+
+
+def cmd_referencias(args):
+    index = ReferenceIndex()
+    index.set_catalog("monstros", load_catalog(args.monstros, "nome")[0])
+    index.set_catalog("itens", load_catalog(args.itens, "nome")[0])
+    for path in args.arquivos:
+        refs = RefCollector()
+        load_records(path, "titulo", visit=refs, fmt=format_for(path))
+        index.set_source(path, refs.refs)
+    dangling = index.dangling()
+    if args.json:
+        print(json.dumps([{"arquivo": path, "titulo": title, "campo": field, "referencia": ref}
+                          for path, title, field, ref in dangling], ensure_ascii=False, indent=4))
+    else:
+        for path, title, field, ref in dangling:
+            print(f"{os.path.basename(path)}: '{title}' {field}: {ref}")
+        print(f"{len(dangling)} referência(s) não encontrada(s)")
+    return 1 if dangling else 0
+
+
+def _sizes(text):
+    return [int(n) for n in text.split(",") if n]
+
+
+def cmd_sintetico(args):
+    for count in args.registros:
+        directory = os.path.join(args.diretorio, str(count))
+        start = time.perf_counter()
+        sizes = generate_dataset(directory, count, seed=args.semente)
+        total = sum(sizes.values()) / 1e6
+        print(f"{directory}: {count} registros, {total:.1f} MB em {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def cmd_bench(args):
+    results = []
+    for count in args.registros:
+        directory = os.path.join(args.diretorio, str(count))
+        if not all(os.path.exists(os.path.join(directory, name)) for name in DATASET_FILES):
+            generate_dataset(directory, count, seed=args.semente)
+        result = run_benchmarks(directory, repeat=args.repeticoes)
+        results.append(result)
+        if not args.json:
+            format_results(result)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+    return 0
+
+
+def cmd_encontros(args):
+    monsters = load_catalog(args.monstros, "nome")[0]
+    items = load_catalog(args.itens, "nome")[0] if args.itens and os.path.exists(args.itens) else None
+    builder = EncounterBuilder(monsters, items)
+    rng = random.Random(args.semente)
+    start = time.perf_counter()
+    encounters = builder.generate_many(args.quantidade, args.dificuldade, args.grupo, args.nivel, rng)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(encounters, ensure_ascii=False, indent=4))
+        return 0 if all(encounters) else 1
+    for encounter in encounters:
+        if encounter is None:
+            print("nenhuma combinação de monstros cabe no orçamento de XP", file=sys.stderr)
+            return 1
+        print(f"{encounter['xp_ajustado']:>7} XP  chefão: {encounter['chefões'][0]}  "
+              f"monstros: {', '.join(encounter['monstros']) or '-'}  recompensas: {', '.join(encounter['recompensas']) or '-'}")
+    print(f"{len(encounters)} encontro(s) em {elapsed:.3f}s ({len(encounters) / max(elapsed, 1e-9):.0f}/s)")
+    return 0
+
+
+def cmd_validar(args):
+    paths = []
+    for path in args.arquivos:
+        if os.path.isdir(path):
+            paths.extend(list_campaign_files(path))
+        else:
+            paths.append(path)
+    start = time.perf_counter()
+    results = validate_files(paths, kind=args.schema, jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        for res in results:
+            res["problemas"] = [{"registro": pos, "chave": name, "caminho": path, "mensagem": message}
+                                for pos, name, path, message in res["problemas"]]
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+    else:
+        for res in results:
+            if "erro" in res:
+                print(f"ERRO  {res['arquivo']}: {res['erro']}", file=sys.stderr)
+            elif res["total"]:
+                print(f"{res['arquivo']}: {res['total']} problema(s) em {res['registros']} registro(s) ({res['schema']})")
+                for problem in res["problemas"][:args.limite]:
+                    print(f"    {format_problem(problem)}")
+                if res["total"] > args.limite:
+                    print(f"    ... e mais {res['total'] - args.limite}")
+        records = sum(res["registros"] for res in results)
+        bad = sum(1 for res in results if res["total"] or "erro" in res)
+        print(f"{len(results) - bad}/{len(results)} arquivo(s) válido(s), {records} registro(s) em {elapsed:.3f}s")
+    return 1 if any(res["total"] or "erro" in res for res in results) else 0
+
+
+def _json_records(path):
+    return (record for _, _, record in format_for(path).iter_records(path))
+
+
+def cmd_banco_importar(args):
+    db = CatalogDatabase(args.banco)
+    try:
+        imports = [("monstros", args.monstros, ""), ("itens", args.itens, "")]
+        imports += [("campanhas", path, os.path.basename(path)) for path in args.campanhas]
+        for table, path, source in imports:
+            if not path:
+                continue
+            start = time.perf_counter()
+            count = db.import_records(table, _json_records(path), source)
+            if table != "campanhas":
+                db.search_index(table)  # Já deixa o índice de busca pronto para a interface
+            print(f"{path}: {count} registro(s) em {table} ({time.perf_counter() - start:.3f}s)")
+        if args.historico:
+            # Snapshot + diário, como a interface os lê
+            start = time.perf_counter()
+            records = HistoryStore(args.historico).load()
+            count = db.import_records("campanhas", (records[title] for title in records), HISTORY_SOURCE)
+            print(f"{args.historico}: {count} campanha(s) no histórico ({time.perf_counter() - start:.3f}s)")
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_banco_exportar(args):
+    db = CatalogDatabase(args.banco)
+    try:
+        os.makedirs(args.diretorio, exist_ok=True)
+        outputs = [("monstros", "", "monstros.json"), ("itens", "", "itens.json")]
+        for source in db.sources("campanhas"):
+            name = "campanhas_historico.json" if source == HISTORY_SOURCE else os.path.basename(source)
+            outputs.append(("campanhas", source, name))
+        for table, source, name in outputs:
+            path = os.path.join(args.diretorio, name)
+            count = db.export_records(table, path, source, compact=args.compacto)
+            if source == HISTORY_SOURCE:
+                # O snapshot exportado já é o histórico inteiro: um diário antigo não vale mais
+                journal = HistoryStore(path).journal_path
+                if os.path.exists(journal):
+                    open(journal, "w", encoding="utf-8").close()
+            print(f"{path}: {count} registro(s)")
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_banco_buscar(args):
+    db = CatalogDatabase(args.banco)
+    try:
+        table = "itens" if args.itens else "campanhas"
+        matches = db.search_text(table, args.texto)
+    finally:
+        db.close()
+    if args.json:
+        print(json.dumps([{"fonte": source, "chave": key} for source, key in matches], ensure_ascii=False, indent=4))
+    else:
+        for source, key in matches:
+            print(f"{source}: {key}" if source else key)
+        print(f"{len(matches)} resultado(s)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m campanhas",
+                                     description="Gerenciador de Campanhas (modo sem interface)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gerar = sub.add_parser("gerar", help="gera arquivos de campanhas a partir de uma especificação de lote")
+    gerar.add_argument("spec", help="arquivo JSON com a especificação do lote")
+    gerar.add_argument("--monstros", help="catálogo de monstros (sobrepõe o da especificação)")
+    gerar.add_argument("--itens", help="catálogo de itens (sobrepõe o da especificação)")
+    gerar.add_argument("-j", "--jobs", type=int, default=1, help="processos em paralelo (padrão: 1)")
+    gerar.add_argument("--compacto", action="store_true", help="grava JSON sem recuo")
+    gerar.add_argument("--formato", choices=list(FORMATS),
+                       help="formato dos destinos sem \"formato\" próprio (padrão: pela extensão do destino)")
+    gerar.add_argument("--json", action="store_true", help="imprime o resumo em JSON")
+    gerar.set_defaults(func=cmd_gerar)
+
+    diretorio = sub.add_parser("diretorio", help="valida, deduplica e regenera todos os .json de um diretório")
+    diretorio.add_argument("diretorio", help="diretório com os arquivos de campanhas")
+    diretorio.add_argument("--edicoes", help="JSON {titulo: {campo: valor}} com edições a aplicar")
+    diretorio.add_argument("--saida", help="diretório de saída (padrão: ao lado de cada arquivo, como <nome>_novo.json)")
+    diretorio.add_argument("-j", "--jobs", type=int, default=None, help="processos em paralelo (padrão: nº de CPUs)")
+    diretorio.add_argument("--compacto", action="store_true", help="grava JSON sem recuo")
+    diretorio.add_argument("--json", action="store_true", help="imprime o resumo em JSON")
+    diretorio.set_defaults(func=cmd_diretorio)
+
+    referencias = sub.add_parser("referencias", help="lista monstros/itens citados que não existem nos catálogos")
+    referencias.add_argument("arquivos", nargs="+", help="arquivos de campanhas")
+    referencias.add_argument("--monstros", default="monstros.json", help="catálogo de monstros (padrão: monstros.json)")
+    referencias.add_argument("--itens", default="itens.json", help="catálogo de itens (padrão: itens.json)")
+    referencias.add_argument("--json", action="store_true", help="imprime as referências em JSON")
+    referencias.set_defaults(func=cmd_referencias)
+
+    validar = sub.add_parser("validar", help="valida arquivos de campanhas/monstros/itens contra o schema")
+    validar.add_argument("arquivos", nargs="+", help="arquivos ou diretórios (todos os .json, menos *_novo.json)")
+    validar.add_argument("--schema", choices=list(SCHEMAS),
+                         help="schema de todos os arquivos (padrão: pelo nome, monstros*/itens*/campanhas)")
+    validar.add_argument("-j", "--jobs", type=int, default=None, help="processos em paralelo (padrão: nº de CPUs)")
+    validar.add_argument("--limite", type=int, default=20, help="problemas mostrados por arquivo (padrão: 20)")
+    validar.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    validar.set_defaults(func=cmd_validar)
+
+    sintetico = sub.add_parser("sintetico", help="gera campanhas/monstros/itens sintéticos para benchmark")
+    sintetico.add_argument("diretorio", help="diretório de saída (um subdiretório por tamanho)")
+    sintetico.add_argument("-n", "--registros", type=_sizes, default=[1000, 10000, 100000],
+                           help="tamanhos separados por vírgula (padrão: 1000,10000,100000)")
+    sintetico.add_argument("--semente", type=int, default=0, help="semente do gerador (padrão: 0)")
+    sintetico.set_defaults(func=cmd_sintetico)
+
+    bench = sub.add_parser("bench", help="mede carga, busca, edição, exportação e histórico")
+    bench.add_argument("diretorio", help="diretório dos dados sintéticos (gerados se faltarem)")
+    bench.add_argument("-n", "--registros", type=_sizes, default=[1000, 10000, 100000],
+                       help="tamanhos separados por vírgula (padrão: 1000,10000,100000)")
+    bench.add_argument("-r", "--repeticoes", type=int, default=3, help="execuções por operação (padrão: 3)")
+    bench.add_argument("--semente", type=int, default=0, help="semente do gerador (padrão: 0)")
+    bench.add_argument("--saida", help="grava os resultados em JSON neste arquivo")
+    bench.add_argument("--json", action="store_true", help="imprime os resultados em JSON")
+    bench.set_defaults(func=cmd_bench)
+
+    encontros = sub.add_parser("encontros", help="gera encontros balanceados (monstros, chefão e recompensas)")
+    encontros.add_argument("-d", "--dificuldade", choices=list(DIFFICULTY_LEVELS), default="médio",
+                           help="dificuldade (padrão: médio)")
+    encontros.add_argument("-g", "--grupo", type=int, default=4, help="personagens no grupo (padrão: 4)")
+    encontros.add_argument("--nivel", type=int, default=1, help="nível dos personagens, 1 a 20 (padrão: 1)")
+    encontros.add_argument("-n", "--quantidade", type=int, default=1, help="encontros a gerar (padrão: 1)")
+    encontros.add_argument("--monstros", default="monstros.json", help="catálogo de monstros (padrão: monstros.json)")
+    encontros.add_argument("--itens", default="itens.json", help="catálogo de itens (padrão: itens.json)")
+    encontros.add_argument("--semente", type=int, default=None, help="semente do sorteio")
+    encontros.add_argument("--json", action="store_true", help="imprime os encontros em JSON")
+    encontros.set_defaults(func=cmd_encontros)
+
+    banco = sub.add_parser("banco", help="importa/exporta/busca no banco SQLite (alternativa aos JSON)")
+    banco_sub = banco.add_subparsers(dest="banco_command", required=True)
+    importar = banco_sub.add_parser("importar", help="copia arquivos JSON para o banco (substitui o que havia)")
+    importar.add_argument("banco", help="arquivo do banco (criado se não existir)")
+    importar.add_argument("campanhas", nargs="*", help="arquivos de campanhas (a fonte é o nome do arquivo)")
+    importar.add_argument("--monstros", help="catálogo de monstros")
+    importar.add_argument("--itens", help="catálogo de itens")
+    importar.add_argument("--historico", help="histórico de campanhas (snapshot + diário)")
+    importar.set_defaults(func=cmd_banco_importar)
+    exportar = banco_sub.add_parser("exportar", help="grava o conteúdo do banco como arquivos JSON")
+    exportar.add_argument("banco", help="arquivo do banco")
+    exportar.add_argument("diretorio", help="diretório de saída")
+    exportar.add_argument("--compacto", action="store_true", help="grava JSON sem recuo")
+    exportar.set_defaults(func=cmd_banco_exportar)
+    buscar = banco_sub.add_parser("buscar", help="busca textual no corpo das campanhas (ou na descrição dos itens)")
+    buscar.add_argument("banco", help="arquivo do banco")
+    buscar.add_argument("texto", help="termos (todos precisam aparecer; casam por prefixo, sem acentos)")
+    buscar.add_argument("--itens", action="store_true", help="busca na descrição dos itens")
+    buscar.add_argument("--json", action="store_true", help="imprime os resultados em JSON")
+    buscar.set_defaults(func=cmd_banco_buscar)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,418 @@
+"""Banco SQLite opcional para catálogos, campanhas e histórico.
+
+Alternativa aos arquivos JSON: cada registro é uma linha (o JSON completo em
+"dados") com as colunas de filtro indexadas, e o texto de corpo/descricao fica
+numa tabela FTS5. Cada put()/delete() é uma transação, então o banco nunca fica
+com uma edição pela metade, e nada é regravado por inteiro. O índice de busca
+dos catálogos (SearchIndex) fica guardado no próprio banco e só é refeito
+quando a tabela muda. Os arquivos JSON continuam sendo o formato de troca:
+import_records()/export_records() (e `python -m campanhas banco ...`) convertem
+nos dois sentidos.
+"""
+import json
+import marshal
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from .model import Campaign, intern_enums
+from .search import FACET_FIELDS, SEARCH_FIELDS, Facets, SearchIndex, tokenize
+from .storage import write_records
+
+SCHEMA_VERSION = 1
+# Tabela -> (campo-chave, colunas indexadas além da chave)
+TABLES = {
+    "monstros": ("nome", ("id", "tipo", "nivelDesafio")),
+    "itens": ("nome", ("id", "tipo", "raridade")),
+    "campanhas": ("titulo", ("id", "dificuldade")),
+}
+FTS_FIELDS = {"campanhas": "corpo", "itens": "descricao"}  # Texto livre com busca FTS5
+DECODERS = {"monstros": intern_enums, "itens": intern_enums, "campanhas": Campaign.from_dict}
+HISTORY_SOURCE = "historico"  # Fonte das campanhas do histórico na tabela campanhas
+BATCH_SIZE = 1000
+
+
+def _column(value):
+    """Valor de uma coluna indexada (listas/dicts vão como JSON)."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+class CatalogDatabase:
+    """Conexão com o banco; segura para uso a partir dos workers de carga.
+
+    Todas as tabelas têm a coluna "fonte": nos catálogos ela é "", nas
+    campanhas é o nome do arquivo de origem (ou HISTORY_SOURCE), e a chave
+    (nome/titulo) é única dentro da fonte. A ordem dos registros (coluna pos)
+    é a do arquivo importado; atualizar um registro não o move.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MB: importações grandes mexem em vários índices
+        self.fts = self._create_schema()
+
+    def _create_schema(self):
+        """Cria as tabelas que faltarem; retorna se o SQLite tem FTS5."""
+        with self.transaction() as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor)")
+            cur.execute("INSERT OR IGNORE INTO meta VALUES ('versao', ?)", (SCHEMA_VERSION,))
+            for table, (key, columns) in TABLES.items():
+                cols = "".join(f", {col}" for col in columns)
+                cur.execute(f"CREATE TABLE IF NOT EXISTS {table} (pos INTEGER PRIMARY KEY, "
+                            f"fonte TEXT NOT NULL DEFAULT '', {key} TEXT NOT NULL{cols}, dados TEXT NOT NULL, "
+                            f"UNIQUE (fonte, {key}))")
+                # (fonte, pos): percorre uma fonte na ordem sem ordenar
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_fonte ON {table} (fonte, pos)")
+                for col in (key, *columns):
+                    cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_{col} ON {table} ({col})")
+            try:
+                for table, field in FTS_FIELDS.items():
+                    cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5"
+                                f"({field}, tokenize='unicode61 remove_diacritics 2')")
+            except sqlite3.OperationalError:
+                return False  # SQLite compilado sem FTS5: search_text() usa LIKE
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """Bloco atômico (BEGIN IMMEDIATE ... COMMIT, ROLLBACK se algo falhar)."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Leitura ---
+    def count(self, table, source=""):
+        with self._lock:
+            return self._conn.execute(f"SELECT count(*) FROM {table} WHERE fonte = ?", (source,)).fetchone()[0]
+
+    def keys(self, table, source="", columns=("id",)):
+        """Lista de (chave, *colunas) na ordem dos registros (colunas indexadas de TABLES)."""
+        key = TABLES[table][0]
+        with self._lock:
+            return self._conn.execute(f"SELECT {', '.join((key, *columns))} FROM {table} WHERE fonte = ? "
+                                      f"ORDER BY pos", (source,)).fetchall()
+
+    def get(self, table, name, source=""):
+        """Registro (dict) pela chave; None se não existir."""
+        key = TABLES[table][0]
+        with self._lock:
+            row = self._conn.execute(f"SELECT dados FROM {table} WHERE fonte = ? AND {key} = ?",
+                                     (source, name)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def iter_records(self, table, source=""):
+        """Gera (chave, registro) na ordem, lendo em lotes (memória constante)."""
+        key = TABLES[table][0]
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(f"SELECT pos, {key}, dados FROM {table} WHERE fonte = ? AND pos > ? "
+                                          f"ORDER BY pos LIMIT ?", (source, last, BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            for pos, name, data in rows:
+                yield name, json.loads(data)
+            last = rows[-1][0]
+
+    def sources(self, table="campanhas"):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT DISTINCT fonte FROM {table} ORDER BY fonte")]
+
+    def generation(self, table):
+        """Contador incrementado a cada escrita na tabela (invalida o índice guardado)."""
+        with self._lock:
+            row = self._conn.execute("SELECT valor FROM meta WHERE chave = ?", ("geracao:" + table,)).fetchone()
+        return 0 if row is None else row[0]
+
+    # --- Escrita (cada chamada é uma transação) ---
+    def put(self, table, record, source="", previous=None):
+        """Inclui ou atualiza um registro (a chave vem do próprio registro).
+
+        `previous` é a chave com que o registro estava gravado, se ela mudou (ex.:
+        campanha renomeada): a linha antiga sai na mesma transação.
+        """
+        record = dict(record)
+        with self.transaction() as cur:
+            if previous is not None and previous != record.get(TABLES[table][0]):
+                self._delete(cur, table, previous, source)
+            self._put(cur, table, record, source)
+            self._bump(cur, table)
+
+    def delete(self, table, name, source=""):
+        with self.transaction() as cur:
+            if not self._delete(cur, table, name, source):
+                return False
+            self._bump(cur, table)
+        return True
+
+    def _delete(self, cur, table, name, source):
+        key = TABLES[table][0]
+        row = cur.execute(f"SELECT pos FROM {table} WHERE fonte = ? AND {key} = ?", (source, name)).fetchone()
+        if row is None:
+            return False
+        cur.execute(f"DELETE FROM {table} WHERE pos = ?", row)
+        if self.fts and table in FTS_FIELDS:
+            cur.execute(f"DELETE FROM {table}_fts WHERE rowid = ?", row)
+        return True
+
+    def import_records(self, table, records, source="", replace=True):
+        """Grava os registros (dicts) numa única transação; retorna quantos.
+
+        replace=True apaga antes os registros da fonte, como ao reabrir o arquivo.
+        Registros sem a chave são ignorados, como em load_records. As linhas vão
+        em lotes (executemany) e o texto FTS da fonte é refeito uma vez, no fim.
+        """
+        key = TABLES[table][0]
+        field = FTS_FIELDS.get(table) if self.fts else None
+        sql = self._upsert_sql(table)
+        count = 0
+        with self.transaction() as cur:
+            if field:
+                cur.execute(f"DELETE FROM {table}_fts WHERE rowid IN "
+                            f"(SELECT pos FROM {table} WHERE fonte = ?)", (source,))
+            if replace:
+                cur.execute(f"DELETE FROM {table} WHERE fonte = ?", (source,))
+            batch = []
+            for record in records:
+                if isinstance(record, MutableMapping) and not isinstance(record, dict):
+                    record = dict(record)
+                if not isinstance(record, dict) or key not in record:
+                    continue
+                batch.append(self._row(table, record, source))
+                if len(batch) >= BATCH_SIZE:
+                    cur.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            cur.executemany(sql, batch)
+            count += len(batch)
+            if field:
+                cur.execute(f"INSERT INTO {table}_fts (rowid, {field}) SELECT pos, json_extract(dados, '$.{field}') "
+                            f"FROM {table} WHERE fonte = ? AND json_extract(dados, '$.{field}') IS NOT NULL",
+                            (source,))
+            self._bump(cur, table)
+        return count
+
+    @staticmethod
+    def _upsert_sql(table):
+        key, columns = TABLES[table]
+        names = ", ".join((key, *columns))
+        updates = ", ".join(f"{col} = excluded.{col}" for col in (*columns, "dados"))
+        return (f"INSERT INTO {table} (fonte, {names}, dados) VALUES ({', '.join('?' * (len(columns) + 3))}) "
+                f"ON CONFLICT (fonte, {key}) DO UPDATE SET {updates}")
+
+    @staticmethod
+    def _row(table, record, source):
+        key, columns = TABLES[table]
+        return (source, *(_column(record.get(col)) for col in (key, *columns)),
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    def _put(self, cur, table, record, source):
+        pos = cur.execute(self._upsert_sql(table) + " RETURNING pos", self._row(table, record, source)).fetchone()[0]
+        field = FTS_FIELDS.get(table)
+        if self.fts and field:
+            text = record.get(field)
+            cur.execute(f"DELETE FROM {table}_fts WHERE rowid = ?", (pos,))
+            if text:
+                cur.execute(f"INSERT INTO {table}_fts (rowid, {field}) VALUES (?, ?)", (pos, str(text)))
+
+    def _bump(self, cur, table):
+        cur.execute("INSERT INTO meta VALUES (?, 1) ON CONFLICT (chave) DO UPDATE SET valor = valor + 1",
+                    ("geracao:" + table,))
+
+    # --- Exportação ---
+    def export_records(self, table, path, source="", compact=False):
+        """Grava os registros da fonte como array JSON (ver write_records); retorna quantos."""
+        entries = ((name, None, record) for name, record in self.iter_records(table, source))
+        return len(write_records(path, entries, compact=compact))
+
+    # --- Busca ---
+    def search_text(self, table, query, source=None):
+        """Chaves cujo corpo/descricao contém todos os termos (por prefixo, sem acentos).
+
+        Usa a tabela FTS5; sem ela, cai para LIKE sobre o texto (com acentos).
+        `source` None busca em todas as fontes. Retorna [(fonte, chave)] na ordem.
+        """
+        key = TABLES[table][0]
+        field = FTS_FIELDS[table]
+        terms = tokenize(query)
+        if not terms:
+            return []
+        where, params = "", []
+        if source is not None:
+            where, params = " AND t.fonte = ?", [source]
+        with self._lock:
+            if self.fts:
+                match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+                sql = (f"SELECT t.fonte, t.{key} FROM {table}_fts f JOIN {table} t ON t.pos = f.rowid "
+                       f"WHERE {table}_fts MATCH ?{where} ORDER BY t.pos")
+                return self._conn.execute(sql, [match, *params]).fetchall()
+            like = " AND ".join(f"lower(json_extract(t.dados, '$.{field}')) LIKE ?" for _ in terms)
+            sql = f"SELECT t.fonte, t.{key} FROM {table} t WHERE {like}{where} ORDER BY t.pos"
+            return self._conn.execute(sql, [f"%{term}%" for term in terms] + params).fetchall()
+
+    def search_index(self, table, fields=SEARCH_FIELDS, rebuild=False):
+        """SearchIndex do catálogo, guardado no banco enquanto a tabela não mudar (`rebuild` o refaz)."""
+        generation = self.generation(table)
+        cache_key = "indice:" + table
+        row = None
+        if not rebuild:
+            with self._lock:
+                row = self._conn.execute("SELECT valor FROM meta WHERE chave = ?", (cache_key,)).fetchone()
+        if row is not None:
+            try:
+                data = marshal.loads(row[0])
+                if (data["geracao"] == generation and data["python"] == list(sys.version_info[:2])
+                        and data["index"]["fields"] == list(fields)):
+                    return SearchIndex.from_state(data["index"])
+            except (EOFError, ValueError, TypeError, KeyError):
+                pass
+        index = SearchIndex(fields=fields)
+        batch = []
+        for name, record in self.iter_records(table):
+            batch.append((name, record))
+            if len(batch) >= BATCH_SIZE:
+                index.extend(batch)
+                batch = []
+        index.extend(batch)
+        data = {"geracao": generation, "python": list(sys.version_info[:2]), "index": index.dump_state()}
+        with self.transaction() as cur:
+            # Se a tabela mudou durante a indexação, a geração gravada já não confere
+            cur.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (cache_key, marshal.dumps(data)))
+        return index
+
+
+class DatabaseRecords(MutableMapping):
+    """Dicionário chave -> registro de uma fonte do banco, lido sob demanda.
+
+    Como LazyRecords: só as chaves ficam em memória até o primeiro acesso, e
+    atribuições/remoções valem só em memória (a gravação é explícita, via
+    CatalogDatabase.put/delete ou DatabaseHistory).
+    """
+
+    def __init__(self, db, table, source="", decode=None):
+        self.db = db
+        self.table = table
+        self.source = source
+        self.decode = decode
+        self.ids = {}    # id -> chave
+        self.facets = None  # Facets, nos catálogos
+        self._data = {}  # chave -> None (no banco) ou registro já carregado
+
+    def add_keys(self, rows):
+        for name, record_id, *_ in rows:
+            self._data[name] = None
+            if record_id is not None:
+                self.ids[record_id] = name
+
+    def is_loaded(self, name):
+        return self._data[name] is not None
+
+    def __getitem__(self, name):
+        value = self._data[name]
+        if value is None:
+            value = self.db.get(self.table, name, self.source)
+            if value is None:
+                raise KeyError(name)
+            if self.decode is not None:
+                value = self.decode(value)
+            self._data[name] = value
+        return value
+
+    def __setitem__(self, name, record):
+        self._data[name] = record
+
+    def __delitem__(self, name):
+        del self._data[name]
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def load_table(db, table, source="", on_batch=None):
+    """DatabaseRecords com as chaves da fonte; on_batch(nomes, bytes) como em load_records.
+
+    Nos catálogos, records.facets vem das colunas indexadas (sem ler "dados").
+    """
+    records = DatabaseRecords(db, table, source, DECODERS[table])
+    fields = [field for field in FACET_FIELDS if field in TABLES[table][1]] if table != "campanhas" else []
+    rows = db.keys(table, source, ("id", *fields))
+    if fields:
+        records.facets = Facets(fields)
+    size = os.path.getsize(db.path) if os.path.exists(db.path) else 0
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        records.add_keys(batch)
+        if fields:
+            for name, _, *values in batch:
+                records.facets.add(name, dict(zip(fields, values)))
+        if on_batch:
+            on_batch([row[0] for row in batch], size * (start + len(batch)) // len(rows))
+    return records
+
+
+def load_catalog_db(db, table, fields=SEARCH_FIELDS, on_batch=None, rebuild=False):
+    """Equivalente a load_catalog() para um catálogo do banco: (DatabaseRecords, SearchIndex)."""
+    records = load_table(db, table, on_batch=on_batch)
+    return records, db.search_index(table, fields, rebuild)
+
+
+class DatabaseHistory:
+    """Histórico de campanhas no banco, com a interface de HistoryStore.
+
+    put()/delete() gravam na hora, cada um em sua transação, então não há
+    diário nem compactação (pending fica sempre em 0).
+    """
+
+    def __init__(self, db, source=HISTORY_SOURCE):
+        self.db = db
+        self.source = source
+        self.path = db.path
+        self.pending = 0
+
+    def exists(self):
+        return True
+
+    def load(self, on_batch=None, visit=None):
+        """Lê as campanhas do histórico; `visit(titulo, campanha)` como em HistoryStore.load."""
+        if visit is not None:
+            for title, record in self.db.iter_records("campanhas", self.source):
+                visit(title, record)
+        return load_table(self.db, "campanhas", self.source, on_batch)
+
+    def put(self, camp, previous=None):
+        """Grava a campanha; `previous` é o título anterior, se ela foi renomeada (ver HistoryStore.put)."""
+        self.db.put("campanhas", camp, self.source, previous)
+
+    def delete(self, title):
+        self.db.delete("campanhas", title, self.source)
+
+    def compact(self, records, fmt=None):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,157 @@
+"""Instrumentação opcional: tempos, contagens e bytes das operações em um buffer circular.
+
+Desligada por padrão; CAMPANHAS_DIAGNOSTICO=1 (ou main.py --diagnostico) liga a
+coleta, e CAMPANHAS_PROFILE=<arquivo.prof> grava um perfil cProfile da sessão
+inteira (só a thread da interface; as cargas nos workers aparecem nos eventos).
+Com a coleta desligada, span() não mede nada e custa uma chamada.
+StartupReport mede as fases da abertura do app (main.py --tempo-inicio).
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENV_ENABLE = "CAMPANHAS_DIAGNOSTICO"
+ENV_PROFILE = "CAMPANHAS_PROFILE"
+BUFFER_SIZE = 2000  # Eventos mantidos (os mais antigos são descartados)
+
+
+class Recorder:
+    """Buffer circular de eventos {"op", "inicio", "segundos", ...}.
+
+    Os campos extras de cada evento são livres; os usados pelo app são
+    "registros", "bytes_lidos", "bytes_gravados" e "erro". Seguro para uso a
+    partir dos workers de carga (deque.append é atômico).
+    """
+
+    def __init__(self, enabled=False, size=BUFFER_SIZE):
+        self.enabled = enabled
+        self.events = deque(maxlen=size)
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, op, **info):
+        """Mede o bloco; o dict retornado pode receber contagens durante a execução."""
+        if not self.enabled:
+            yield info
+            return
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException as e:
+            info["erro"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(op, start, time.perf_counter() - start, **info)
+
+    def record(self, op, start, seconds, **info):
+        """Registra um evento já medido (ex.: cargas que terminam em outra thread)."""
+        if not self.enabled:
+            return
+        event = {"op": op, "inicio": round(start - self._origin, 6), "segundos": round(seconds, 6),
+                 "thread": threading.current_thread().name}
+        event.update(info)
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self):
+        """Por operação: quantidade, tempo total/máximo/último e somas de registros e bytes."""
+        result = {}
+        for event in list(self.events):
+            stats = result.setdefault(event["op"], {"vezes": 0, "total": 0.0, "maximo": 0.0, "ultimo": 0.0,
+                                                    "registros": 0, "bytes_lidos": 0, "bytes_gravados": 0})
+            stats["vezes"] += 1
+            stats["total"] += event["segundos"]
+            stats["maximo"] = max(stats["maximo"], event["segundos"])
+            stats["ultimo"] = event["segundos"]
+            for key in ("registros", "bytes_lidos", "bytes_gravados"):
+                stats[key] += event.get(key) or 0
+        return result
+
+    def dump(self, path):
+        """Grava os eventos no formato Trace Event (abre em chrome://tracing ou no Perfetto)."""
+        trace = [{"name": e["op"], "ph": "X", "ts": int(e["inicio"] * 1e6), "dur": int(e["segundos"] * 1e6),
+                  "pid": os.getpid(), "tid": e["thread"],
+                  "args": {k: v for k, v in e.items() if k not in ("op", "inicio", "segundos", "thread")}}
+                 for e in list(self.events)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+recorder = Recorder(enabled=bool(os.environ.get(ENV_ENABLE)))
+
+
+class StartupReport:
+    """Marcos da abertura do app, em segundos desde `origin` (perf_counter do início do processo).
+
+    mark(fase) registra a fase (e, com a coleta ligada, um evento "inicio.<fase>"
+    desde o marco anterior); report() monta o relatório de --tempo-inicio.
+    """
+
+    TARGET = 0.2  # Meta: janela desenhada em até 200 ms
+    WINDOW_PHASE = "primeira_pintura"
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.marks = {}  # fase -> segundos desde a origem, na ordem em que aconteceram
+        self._last = self.origin
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        if phase not in self.marks:
+            self.marks[phase] = now - self.origin
+            recorder.record(f"inicio.{phase}", self._last, now - self._last)
+            self._last = now
+
+    def report(self):
+        window = self.marks.get(self.WINDOW_PHASE)
+        return {
+            "fases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.marks.items()},
+            "janela_ms": None if window is None else round(window * 1000, 1),
+            "meta_ms": round(self.TARGET * 1000),
+            "dentro_da_meta": window is not None and window <= self.TARGET,
+        }
+
+    def format(self):
+        """Relatório em texto: uma linha por fase, com o tempo desde o início e o da fase."""
+        lines = []
+        previous = 0.0
+        for phase, seconds in self.marks.items():
+            lines.append(f"{phase:<20} {seconds * 1000:>9.1f} ms  (+{(seconds - previous) * 1000:.1f})")
+            previous = seconds
+        report = self.report()
+        if report["janela_ms"] is not None:
+            verdict = "dentro da meta" if report["dentro_da_meta"] else "ACIMA da meta"
+            lines.append(f"janela desenhada em {report['janela_ms']:.1f} ms ({verdict} de {report['meta_ms']} ms)")
+        return "\n".join(lines)
+
+
+_profiler = None
+
+
+def start_profiler():
+    """Liga o cProfile se CAMPANHAS_PROFILE estiver definida; retorna o caminho de saída ou None."""
+    global _profiler
+    path = os.environ.get(ENV_PROFILE)
+    if not path or _profiler is not None:
+        return None
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    return path
+
+
+def stop_profiler():
+    """Desliga o cProfile e grava as estatísticas (ver pstats/snakeviz); retorna o caminho."""
+    global _profiler
+    if _profiler is None:
+        return None
+    _profiler.disable()
+    path = os.environ[ENV_PROFILE]
+    _profiler.dump_stats(path)
+    _profiler = None
+    return path
@@ -0,0 +1,124 @@
+"""Processamento de um diretório inteiro de arquivos de campanhas.
+
+Três fases: (1) cada arquivo é lido e validado em paralelo, guardando só os
+títulos e offsets; (2) os títulos repetidos entre arquivos são resolvidos no
+processo principal (fica a primeira ocorrência, na ordem alfabética dos
+arquivos); (3) cada arquivo é regenerado em paralelo, por patch, com as edições
+aplicadas e as duplicatas removidas.
+"""
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .export import patch_records_file
+from .schema import RecordCheck, format_problem, validator_for
+from .storage import iter_json_array
+
+OUTPUT_SUFFIX = "_novo"
+
+
+def list_campaign_files(directory, suffix=OUTPUT_SUFFIX):
+    """Arquivos .json do diretório, em ordem, ignorando saídas anteriores (`*_novo.json`)."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    return [p for p in paths if not os.path.splitext(p)[0].endswith(suffix)]
+
+
+def scan_campaign_file(path):
+    """Fase 1: títulos (titulo, offset, tamanho) e problemas de schema encontrados no arquivo."""
+    start = time.perf_counter()
+    titles = []
+    check = RecordCheck(validator_for("campanhas"))
+    try:
+        for i, (offset, length, rec) in enumerate(iter_json_array(path)):
+            check(i, rec)
+            title = rec.get("titulo") if isinstance(rec, dict) else None
+            if not isinstance(title, str) or not title.strip():
+                continue
+            titles.append((title, offset, length))
+    except (OSError, ValueError) as e:
+        return {"arquivo": path, "titulos": [], "problemas": [str(e)], "erro": str(e),
+                "leitura": time.perf_counter() - start}
+    problems = [format_problem(p) for p in check.problems]
+    if check.count > len(check.problems):
+        problems.append(f"... e mais {check.count - len(check.problems)} problema(s)")
+    return {"arquivo": path, "titulos": titles, "problemas": problems,
+            "leitura": time.perf_counter() - start}
+
+
+def plan_directory(scans, edits=None):
+    """Fase 2: decide, por arquivo, o que remover (duplicatas) e o que editar.
+
+    Retorna {arquivo: {"remover": [(offset, tamanho), ...], "editar": [(offset,
+    tamanho, alterações), ...], "duplicadas": [(titulo, arquivo dono), ...]}}.
+    """
+    edits = edits or {}
+    owner = {}
+    plans = {}
+    for scan in scans:
+        plan = plans[scan["arquivo"]] = {"remover": [], "editar": [], "duplicadas": []}
+        for title, offset, length in scan["titulos"]:
+            if title in owner:
+                plan["remover"].append((offset, length))
+                plan["duplicadas"].append((title, owner[title]))
+                continue
+            owner[title] = scan["arquivo"]
+            if title in edits:
+                plan["editar"].append((offset, length, edits[title]))
+    return plans
+
+
+def regenerate_file(path, dest, plan, compact=False):
+    """Fase 3: grava `dest` aplicando o plano do arquivo; retorna o tempo gasto."""
+    start = time.perf_counter()
+    patches = {offset: (length, None) for offset, length in plan["remover"]}
+    if plan["editar"]:
+        with open(path, "rb") as f:
+            for offset, length, changes in plan["editar"]:
+                f.seek(offset)
+                record = json.loads(f.read(length).decode("utf-8"))
+                record.update(changes)
+                patches[offset] = (length, record)
+    patch_records_file(path, dest, patches, [], compact=compact)
+    return time.perf_counter() - start
+
+
+def output_path(path, output_dir=None, suffix=OUTPUT_SUFFIX):
+    base, ext = os.path.splitext(os.path.basename(path))
+    return os.path.join(output_dir or os.path.dirname(path), f"{base}{suffix}{ext}")
+
+
+def process_directory(directory, edits=None, output_dir=None, jobs=None, compact=False):
+    """Lê, valida, deduplica, edita e regenera todos os arquivos do diretório.
+
+    `edits` mapeia titulo -> alterações (aplicadas onde o título ficar após a
+    deduplicação). Retorna um resumo por arquivo (mesma ordem de
+    list_campaign_files), com tempos de leitura/escrita em segundos.
+    """
+    paths = list_campaign_files(directory)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        scans = list(pool.map(scan_campaign_file, paths))
+        plans = plan_directory(scans, edits)
+        todo = [scan for scan in scans if "erro" not in scan]
+        dests = [output_path(scan["arquivo"], output_dir) for scan in todo]
+        write_times = pool.map(regenerate_file, [s["arquivo"] for s in todo], dests,
+                               [plans[s["arquivo"]] for s in todo], [compact] * len(todo))
+        written = dict(zip([s["arquivo"] for s in todo], zip(dests, write_times)))
+    summary = []
+    for scan in scans:
+        plan = plans[scan["arquivo"]]
+        dest, write_time = written.get(scan["arquivo"], (None, 0.0))
+        summary.append({
+            "arquivo": scan["arquivo"],
+            "destino": dest,
+            "campanhas": len(scan["titulos"]) - len(plan["duplicadas"]),
+            "duplicadas": plan["duplicadas"],
+            "editadas": len(plan["editar"]),
+            "problemas": scan["problemas"],
+            "leitura": round(scan["leitura"], 4),
+            "escrita": round(write_time, 4),
+        })
+    return summary
@@ -0,0 +1,247 @@
+"""Geração de encontros balanceados: monstros, chefão e recompensas por orçamento de XP.
+
+Segue as regras de encontro do D&D 5e: o orçamento é o limiar de XP da
+dificuldade por personagem (XP_THRESHOLDS) vezes o tamanho do grupo, e o XP
+dos monstros é multiplicado conforme a quantidade deles (ENCOUNTER_MULTIPLIERS).
+Os monstros são agrupados por nível de desafio (XP_BY_CHALLENGE) e, uma vez
+por catálogo, uma mochila limitada sobre esses grupos calcula quais somas de XP
+são alcançáveis com exatamente N monstros distintos (um inteiro por estágio,
+usado como conjunto de bits). Gerar um encontro é só sortear uma soma dentro
+da janela da dificuldade e refazer o caminho da mochila: milhares por segundo.
+"""
+import math
+import random
+import re
+
+from .search import challenge_value
+
+# XP por nível de desafio (Dungeon Master's Guide)
+XP_BY_CHALLENGE = {
+    0: 10, 0.125: 25, 0.25: 50, 0.5: 100, 1: 200, 2: 450, 3: 700, 4: 1100, 5: 1800, 6: 2300, 7: 2900,
+    8: 3900, 9: 5000, 10: 5900, 11: 7200, 12: 8400, 13: 10000, 14: 11500, 15: 13000, 16: 15000,
+    17: 18000, 18: 20000, 19: 22000, 20: 25000, 21: 33000, 22: 41000, 23: 50000, 24: 62000,
+    25: 75000, 26: 90000, 27: 105000, 28: 120000, 29: 135000, 30: 155000,
+}
+# Limiar de XP por personagem, por nível: (fácil, médio, difícil, mortal)
+XP_THRESHOLDS = {
+    1: (25, 50, 75, 100), 2: (50, 100, 150, 200), 3: (75, 150, 225, 400), 4: (125, 250, 375, 500),
+    5: (250, 500, 750, 1100), 6: (300, 600, 900, 1400), 7: (350, 750, 1100, 1700),
+    8: (450, 900, 1400, 2100), 9: (550, 1100, 1600, 2400), 10: (600, 1200, 1900, 2800),
+    11: (800, 1600, 2400, 3600), 12: (1000, 2000, 3000, 4500), 13: (1100, 2200, 3400, 5100),
+    14: (1250, 2500, 3800, 5700), 15: (1400, 2800, 4300, 6400), 16: (1600, 3200, 4800, 7200),
+    17: (2000, 3900, 5900, 8800), 18: (2100, 4200, 6300, 9500), 19: (2400, 4900, 7300, 10900),
+    20: (2800, 5700, 8500, 12700),
+}
+# Multiplicador do XP pela quantidade de monstros: (a partir de N monstros, multiplicador)
+ENCOUNTER_MULTIPLIERS = ((1, 1.0), (2, 1.5), (3, 2.0), (7, 2.5), (11, 3.0), (15, 4.0))
+_MULTIPLIER_STEPS = (0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0)
+# Dificuldade da campanha -> faixa de limiares (do limiar dela até o seguinte)
+DIFFICULTY_LEVELS = {"fácil": 0, "médio": 1, "difícil": 2}
+# Raridades e quantidade de recompensas por dificuldade
+REWARD_RARITIES = {"fácil": ("Comum", "Incomum"), "médio": ("Incomum", "Raro"),
+                   "difícil": ("Raro", "Muito Raro", "Lendário")}
+REWARD_COUNT = {"fácil": 1, "médio": 2, "difícil": 3}
+MAX_MONSTERS = 15  # Monstros por encontro (o multiplicador para de crescer em 15)
+MAX_PARTY = 10     # Grupo usado para dimensionar as tabelas (grupos maiores as refazem)
+
+# Pontos de vida máximos por nível de desafio (estimativa defensiva do DMG),
+# usados quando o monstro não tem nivelDesafio
+_HP_BY_CHALLENGE = ((6, 0), (35, 0.125), (49, 0.25), (70, 0.5), (85, 1), (100, 2), (115, 3), (130, 4),
+                    (145, 5), (160, 6), (175, 7), (190, 8), (205, 9), (220, 10))
+_LEADING_INT = re.compile(r"\s*(\d+)")
+
+
+def encounter_multiplier(count, party_size=4):
+    """Multiplicador do XP para `count` monstros (grupos < 3 sobem um passo, > 5 descem um)."""
+    value = 1.0
+    for start, multiplier in ENCOUNTER_MULTIPLIERS:
+        if count >= start:
+            value = multiplier
+    step = _MULTIPLIER_STEPS.index(value)
+    if party_size < 3:
+        step += 1
+    elif party_size > 5:
+        step -= 1
+    return _MULTIPLIER_STEPS[step]
+
+
+def xp_window(dificuldade, party_size, level=1):
+    """(mínimo, máximo) de XP ajustado para a dificuldade: do limiar dela até o seguinte."""
+    if dificuldade not in DIFFICULTY_LEVELS:
+        raise ValueError(f"Dificuldade inválida: {dificuldade!r} (use {', '.join(DIFFICULTY_LEVELS)}).")
+    if level not in XP_THRESHOLDS:
+        raise ValueError("O nível do grupo deve estar entre 1 e 20.")
+    if party_size < 1:
+        raise ValueError("O grupo precisa de pelo menos 1 personagem.")
+    thresholds = XP_THRESHOLDS[level]
+    step = DIFFICULTY_LEVELS[dificuldade]
+    return thresholds[step] * party_size, thresholds[step + 1] * party_size
+
+
+def challenge_xp(value):
+    """XP de um nível de desafio ("1/4", "5", 2...); None se não estiver na tabela."""
+    number = challenge_value(value)
+    return XP_BY_CHALLENGE.get(number) if number is not None else None
+
+
+def estimate_challenge(record):
+    """Nível de desafio estimado pelos pontos de vida (com ajuste pela classe de armadura)."""
+    match = _LEADING_INT.match(str(record.get("pontosVida", "")))
+    if match is None:
+        return None
+    hp = int(match.group(1))
+    levels = [cr for _, cr in _HP_BY_CHALLENGE]
+    step = next((i for i, (limit, _) in enumerate(_HP_BY_CHALLENGE) if hp <= limit), None)
+    if step is None:
+        # Acima de 220 PV: +1 nível a cada 15 PV, até 30
+        return min(30, 10 + math.ceil((hp - 220) / 15))
+    armor = _LEADING_INT.match(str(record.get("classeArmadura", "")))
+    if armor is not None:
+        expected = 13 if levels[step] <= 3 else 14 if levels[step] <= 7 else 15
+        step += (int(armor.group(1)) - expected) // 2
+    return levels[max(0, min(step, len(levels) - 1))]
+
+
+class EncounterBuilder:
+    """Gera encontros a partir de um catálogo de monstros (e, opcionalmente, de itens).
+
+    `monsters`/`items` são os registros carregados (LazyRecords, DatabaseRecords
+    ou dict); com `facets` (ver load_catalog), os níveis de desafio e raridades
+    vêm das colunas e só os monstros sem nivelDesafio são abertos. As tabelas
+    são montadas no construtor; generate() não lê registro nenhum.
+    """
+
+    def __init__(self, monsters, items=None, max_monsters=MAX_MONSTERS):
+        self.max_monsters = max_monsters
+        self._ids = {name: ref for ref, name in getattr(monsters, "ids", {}).items()}
+        self._item_ids = {name: ref for ref, name in getattr(items, "ids", {}).items()} if items else {}
+        # Grupos por XP: [(xp, [nomes])], do menor para o maior
+        by_xp = {}
+        for value, names in _groups(monsters, "nivelDesafio").items():
+            xp = challenge_xp(value) if value is not None else None
+            if xp is not None:
+                by_xp.setdefault(xp, []).extend(names)
+            else:
+                for name in names:
+                    estimated = estimate_challenge(monsters[name])
+                    if estimated is not None:
+                        by_xp.setdefault(XP_BY_CHALLENGE[estimated], []).append(name)
+        self.tiers = sorted(by_xp.items())
+        self._unit = math.gcd(*(xp for xp, _ in self.tiers)) if self.tiers else 1
+        self._rewards = _groups(items, "raridade") if items else {}
+        self._reward_cache = {}
+        self._stages = None
+        self._limit = 0
+        self._build(max(XP_THRESHOLDS[20][3] * MAX_PARTY, 1))
+
+    def _build(self, max_xp):
+        """Mochila limitada: stages[t][c] = somas (bits, em unidades de XP) com c monstros dos t primeiros grupos."""
+        limit = max_xp // self._unit + 1
+        mask = (1 << limit) - 1
+        top = self.max_monsters
+        reach = [1] + [0] * top  # 0 monstros: só a soma 0
+        stages = [reach]
+        for xp, names in self.tiers:
+            step = xp // self._unit
+            cap = min(len(names), top)
+            new = list(reach)
+            for count in range(1, top + 1):
+                bits = new[count]
+                for k in range(1, min(cap, count) + 1):
+                    if reach[count - k]:
+                        bits |= reach[count - k] << (k * step)
+                new[count] = bits & mask
+            reach = new
+            stages.append(reach)
+        self._stages = stages
+        self._limit = limit
+
+    def generate(self, dificuldade, party_size, level=1, rng=random, min_monsters=2):
+        """Um encontro aleatório dentro da janela de XP da dificuldade; None se não houver.
+
+        Retorna {"monstros": [ids], "chefões": [id], "recompensas": [ids], "xp": bruto,
+        "xp_ajustado": com multiplicador}. O monstro de maior XP vira o chefão; os
+        demais vão para "monstros". Quantidades abaixo de `min_monsters` só são
+        usadas se nenhuma outra couber no orçamento.
+        """
+        low, high = xp_window(dificuldade, party_size, level)
+        if high // self._unit >= self._limit:
+            self._build(high)
+        final = self._stages[-1]
+        options = []
+        for count in range(1, self.max_monsters + 1):
+            multiplier = encounter_multiplier(count, party_size)
+            lo = math.ceil(low / multiplier / self._unit)
+            hi = math.ceil(high / multiplier / self._unit) - 1  # Abaixo do limiar seguinte
+            if hi >= lo and (final[count] >> lo) & ((1 << (hi - lo + 1)) - 1):
+                options.append((count, lo, hi, multiplier))
+        if not options:
+            return None
+        preferred = [option for option in options if option[0] >= min_monsters]
+        count, lo, hi, multiplier = rng.choice(preferred or options)
+        total = _random_bit(final[count], lo, hi, rng)
+        picks = self._pick(count, total, rng)
+        picks.sort(key=lambda pick: -pick[0])
+        boss, minions = picks[0], picks[1:]
+        xp = sum(pick_xp for pick_xp, _ in picks)
+        return {
+            "monstros": [self._ids.get(name, name) for _, name in minions],
+            "chefões": [self._ids.get(boss[1], boss[1])],
+            "recompensas": self.rewards(dificuldade, rng),
+            "xp": xp,
+            "xp_ajustado": int(xp * multiplier),
+        }
+
+    def generate_many(self, count, dificuldade, party_size, level=1, rng=random):
+        """Lista com `count` encontros (para produção em lote)."""
+        return [self.generate(dificuldade, party_size, level, rng) for _ in range(count)]
+
+    def _pick(self, count, total, rng):
+        """Refaz o caminho da mochila: [(xp, nome)] com `count` monstros distintos somando `total`."""
+        picks = []
+        for t in range(len(self.tiers), 0, -1):
+            if count == 0:
+                break
+            xp, names = self.tiers[t - 1]
+            step = xp // self._unit
+            previous = self._stages[t - 1]
+            choices = [k for k in range(0, min(len(names), count) + 1)
+                       if total - k * step >= 0 and (previous[count - k] >> (total - k * step)) & 1]
+            k = rng.choice(choices)
+            picks.extend((xp, name) for name in rng.sample(names, k))
+            count -= k
+            total -= k * step
+        return picks
+
+    def rewards(self, dificuldade, rng=random):
+        """Ids de itens sorteados nas raridades da dificuldade (REWARD_RARITIES)."""
+        pool = self._reward_cache.get(dificuldade)
+        if pool is None:
+            pool = [name for rarity in REWARD_RARITIES[dificuldade] for name in self._rewards.get(rarity, ())]
+            if not pool:
+                pool = [name for names in self._rewards.values() for name in names]
+            pool = self._reward_cache[dificuldade] = pool
+        picks = rng.sample(pool, min(REWARD_COUNT[dificuldade], len(pool)))
+        return [self._item_ids.get(name, name) for name in picks]
+
+
+def _groups(records, field):
+    """{valor: [nomes]} pelas facets do catálogo ou, sem elas, abrindo os registros."""
+    facets = getattr(records, "facets", None)
+    if facets is not None and field in facets.fields:
+        return facets.groups(field)
+    result = {}
+    for name in records:
+        value = records[name].get(field)
+        result.setdefault(str(value) if value is not None else None, []).append(name)
+    return result
+
+
+def _random_bit(bits, lo, hi, rng):
+    """Posição de um bit ligado de `bits` entre lo e hi (inclusive), sorteada."""
+    window = (bits >> lo) & ((1 << (hi - lo + 1)) - 1)
+    start = rng.randrange(hi - lo + 1)
+    above = window >> start
+    if above:
+        return lo + start + ((above & -above).bit_length() - 1)
+    return lo + (window & -window).bit_length() - 1
@@ -0,0 +1,339 @@
+"""Geração de arquivos de campanhas por patch (copiando o que não mudou)."""
+import codecs
+import json
+import os
+from json.decoder import scanstring
+
+from .formats import format_for, get_format
+from .storage import dump_record, file_signature
+
+_COPY_CHUNK = 1 << 20
+_SCAN_CHUNK = 4096  # Leituras das buscas por espaços/vírgulas em volta dos elementos
+_DECODER = json.JSONDecoder()
+_WS_CHARS = (" ", "\t", "\n", "\r")
+
+
+def _copy_range(src, dest, start, end):
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = src.read(min(_COPY_CHUNK, remaining))
+        if not chunk:
+            break
+        dest.write(chunk)
+        remaining -= len(chunk)
+
+
+def _last_non_ws(src, start, end):
+    """Posição do último byte que não é espaço em [start, end), ou None (lido em blocos, de trás para frente)."""
+    while end > start:
+        chunk_start = max(start, end - _SCAN_CHUNK)
+        src.seek(chunk_start)
+        stripped = src.read(end - chunk_start).rstrip()
+        if stripped:
+            return chunk_start + len(stripped) - 1
+        end = chunk_start
+    return None
+
+
+def _next_non_ws(src, pos):
+    """Posição do primeiro byte que não é espaço a partir de `pos` (ou o fim do arquivo)."""
+    src.seek(pos)
+    while True:
+        chunk = src.read(_SCAN_CHUNK)
+        stripped = chunk.lstrip()
+        if stripped or not chunk:
+            return pos + len(chunk) - len(stripped)
+        pos += len(chunk)
+
+
+def _line_indent(src, pos):
+    """Recuo (espaços iniciais) da linha que contém a posição `pos` do arquivo."""
+    end = pos
+    while end > 0:
+        start = max(0, end - _SCAN_CHUNK)
+        src.seek(start)
+        newline = src.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    indent = b""
+    src.seek(end)
+    while end < pos:
+        chunk = src.read(min(_SCAN_CHUNK, pos - end))
+        if not chunk:
+            break
+        stripped = chunk.lstrip(b" \t")
+        indent += chunk[:len(chunk) - len(stripped)]
+        if stripped:
+            break
+        end += len(chunk)
+    return indent
+
+
+def _array_bounds(src):
+    """(fim do último elemento, posição do "]" final) de um arquivo com array de topo.
+
+    Retorna None se o arquivo não for um array JSON bem terminado.
+    """
+    head = src.read(64).lstrip(codecs.BOM_UTF8).lstrip()
+    if not head.startswith(b"["):
+        return None
+    close = _last_non_ws(src, 0, src.seek(0, os.SEEK_END))
+    src.seek(close)
+    if src.read(1) != b"]":
+        return None
+    return _last_non_ws(src, 0, close) + 1, close
+
+
+def _comma_before(src, start, offset):
+    """Posição da vírgula que separa o elemento em `offset` do anterior (em [start, offset)), ou None."""
+    comma = _last_non_ws(src, start, offset)
+    if comma is None:
+        return None
+    src.seek(comma)
+    return comma if src.read(1) == b"," else None
+
+
+def _skip_comma_after(src, pos):
+    """Pula a vírgula (e os espaços) que seguem um elemento removido; retorna a nova posição."""
+    comma = _next_non_ws(src, pos)
+    src.seek(comma)
+    if src.read(1) != b",":
+        return pos
+    return _next_non_ws(src, comma + 1)
+
+
+def _skip_ws(text, pos):
+    while text[pos:pos + 1] in _WS_CHARS:
+        pos += 1
+    return pos
+
+
+def _member_spans(text):
+    """[(chave, início, fim do valor)] dos membros de topo de um objeto JSON; None se não for objeto."""
+    pos = _skip_ws(text, 0)
+    if not text.startswith("{", pos):
+        return None
+    spans = []
+    pos += 1
+    while True:
+        pos = _skip_ws(text, pos)
+        if text.startswith("}", pos):
+            return spans
+        if not text.startswith('"', pos):
+            return None
+        key, pos = scanstring(text, pos + 1)
+        pos = _skip_ws(text, pos)
+        if not text.startswith(":", pos):
+            return None
+        pos = _skip_ws(text, pos + 1)
+        _, end = _DECODER.raw_decode(text, pos)
+        spans.append((key, pos, end))
+        pos = _skip_ws(text, end)
+        if text.startswith(",", pos):
+            pos += 1
+        elif not text.startswith("}", pos):
+            return None
+
+
+def patch_fields(raw, record, fields, prefix=""):
+    """Reescreve só os valores de `fields` no texto original de um registro.
+
+    `raw` são os bytes do registro no arquivo e `prefix` o recuo da sua linha.
+    Campos alterados têm apenas o valor trocado, mantendo o valor em uma linha se
+    ele já estava assim; campos novos entram no fim do objeto, no mesmo estilo
+    (recuado ou em uma linha). O resto do registro é
+    mantido byte a byte. Retorna None se não der para aplicar só os campos
+    (campo removido, chave duplicada, formato inesperado): aí o registro inteiro
+    deve ser reserializado.
+    """
+    text = raw.decode("utf-8")
+    try:
+        spans = _member_spans(text)
+    except (ValueError, IndexError):
+        return None
+    if not spans or any(field not in record for field in fields):
+        return None
+    positions = {key: (start, end) for key, start, end in spans}
+    if len(positions) != len(spans):
+        return None
+    first_start = spans[0][1]
+    member_start = text.rfind("\n", 0, first_start)
+    if member_start < 0:
+        # Registro em uma linha: separadores de json.dumps padrão ou compactos
+        colon = text.rfind(":", 0, first_start)
+        key_sep, item_sep = (": ", ", ") if text[colon + 1:first_start] else (":", ",")
+        member_indent = None
+    else:
+        line = text[member_start + 1:first_start]
+        member_indent = line[:len(line) - len(line.lstrip())]
+        unit = len(member_indent) - len(prefix)
+        if unit <= 0:
+            return None
+        key_sep, item_sep = ": ", ", "
+
+    def dump(value, inline):
+        if inline:
+            return json.dumps(value, ensure_ascii=False, separators=(item_sep, key_sep))
+        return json.dumps(value, ensure_ascii=False, indent=unit).replace("\n", "\n" + member_indent)
+
+    out = []
+    pos = 0
+    for key, start, end in spans:
+        if key in fields:
+            out.append(text[pos:start])
+            # Valores que estavam em uma linha (ex.: "monstros": ["a", "b"]) continuam assim
+            out.append(dump(record[key], member_indent is None or "\n" not in text[start:end]))
+            pos = end
+    last_end = spans[-1][2]
+    out.append(text[pos:last_end])
+    for field in fields:
+        if field not in positions:
+            lead = item_sep if member_indent is None else ",\n" + member_indent
+            out.append(lead + json.dumps(field, ensure_ascii=False) + key_sep
+                       + dump(record[field], member_indent is None))
+    out.append(text[last_end:])
+    return "".join(out).encode("utf-8")
+
+
+def patch_records_file(src_path, dest_path, patches, additions, compact=False, fmt=None):
+    """Gera dest_path a partir do array JSON em src_path, alterando só o necessário.
+
+    `patches` mapeia offset -> (tamanho, registro novo) de elementos a substituir;
+    com registro None o elemento é removido (junto com sua vírgula). Um terceiro
+    item opcional, (tamanho, registro, campos), reescreve só esses campos do
+    texto original (ver patch_fields). Os bytes entre
+    eles (registros intocados, espaços, vírgulas) são copiados sem análise.
+    `additions` são acrescentados ao fim do array, com o mesmo recuo do último
+    elemento. Com compact=True, com outro formato de saída `fmt` (nome ou
+    formats.Format) ou se a origem não for um array JSON, os registros são lidos
+    (no formato da origem, pela extensão) e regravados um a um, em streaming.
+    Grava de forma atômica e retorna o número de registros serializados ou removidos.
+    """
+    output = get_format(fmt or ("json-compacto" if compact else "json"))
+    source = format_for(src_path)
+    with open(src_path, "rb") as src:
+        bounds = _array_bounds(src) if output.name == "json" and source.name == "json" else None
+        if bounds is None:
+            def entries():
+                for offset, length, rec in source.iter_records(src_path):
+                    if offset in patches:
+                        rec = patches[offset][1]
+                        if rec is None:
+                            continue
+                    yield None, None, rec  # Sem nome: o gravador não acumula as posições
+                for rec in additions:
+                    yield None, None, rec
+            output.write(dest_path, entries())
+            return len(patches) + len(additions)
+        last_end, close = bounds
+        tmp_path = dest_path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            pos = 0
+            ends_with_element = False  # Última coisa escrita (até pos) foi um elemento?
+            for offset in sorted(patches):
+                length, record, *fields = patches[offset]
+                if record is None:
+                    comma = _comma_before(src, pos, offset)
+                    if comma is not None:
+                        # Remove ", elemento": a saída volta a terminar no elemento anterior
+                        _copy_range(src, out, pos, comma)
+                        ends_with_element = True
+                        pos = offset + length
+                    else:
+                        # Primeiro elemento da saída: remove "elemento, "
+                        _copy_range(src, out, pos, offset)
+                        ends_with_element = False
+                        pos = _skip_comma_after(src, offset + length)
+                    continue
+                prefix = _line_indent(src, offset)
+                _copy_range(src, out, pos, offset)
+                data = None
+                if fields and fields[0] is not None:
+                    src.seek(offset)
+                    data = patch_fields(src.read(length), record, fields[0], prefix.decode("ascii"))
+                out.write(data if data is not None else dump_record(record, prefix.decode("ascii")))
+                ends_with_element = True
+                pos = offset + length
+            if pos < last_end:
+                _copy_range(src, out, pos, last_end)
+                src.seek(last_end - 1)
+                ends_with_element = src.read(1) != b"["
+                pos = last_end
+            if additions:
+                src.seek(last_end - 1)
+                has_source_elements = src.read(1) != b"["
+                prefix = _line_indent(src, last_end) if has_source_elements else b"    "
+                sep = b",\n" if ends_with_element else b"\n"
+                for record in additions:
+                    out.write(sep + prefix + dump_record(record, prefix.decode("ascii")))
+                    sep = b",\n"
+                if not ends_with_element:
+                    out.write(b"\n")
+                    pos = close  # Descarta o espaço que havia antes do "]"
+            _copy_range(src, out, pos, src.seek(0, os.SEEK_END))
+        os.replace(tmp_path, dest_path)
+    return len(patches) + len(additions)
+
+
+def _present_titles(campaigns, locations, modified, deleted):
+    """Títulos que o arquivo gerado terá antes das adições (com as renomeações)."""
+    present = set(locations).difference(t for t in deleted if t not in campaigns)
+    for title in modified:
+        if title in present and title in campaigns:
+            present.discard(title)
+            present.add(campaigns[title].get("titulo"))
+    return present
+
+
+def export_campaign_file(src_path, dest_path, campaigns, locations, modified, added, compact=False,
+                         deleted=(), fmt=None):
+    """Gera o novo arquivo de campanhas: o original com as edições, exclusões e adições.
+
+    `locations` é o mapa titulo -> (offset, tamanho) montado ao carregar src_path.
+    `modified` é um conjunto de títulos (registro inteiro reserializado) ou um
+    mapa titulo -> campos alterados (só esses valores são reescritos); os títulos
+    de `deleted` são removidos e os de `added` entram no fim do array se o título
+    ainda não existir no arquivo. `fmt` escolhe o formato de saída (ver
+    patch_records_file). Levanta ValueError se o original mudou desde a carga (os
+    offsets não valeriam mais).
+    """
+    signature = getattr(campaigns, "signature", None)
+    if signature is not None and signature != file_signature(src_path):
+        raise ValueError(f"'{os.path.basename(src_path)}' foi modificado desde que foi carregado; "
+                         "selecione-o novamente.")
+    patches = {}
+    for title in deleted:
+        location = locations.get(title)
+        if location is not None and title not in campaigns:
+            patches[location[0]] = (location[1], None)
+    for title in modified:
+        location = locations.get(title)
+        if location is None or title not in campaigns:
+            continue
+        fields = modified[title] if isinstance(modified, dict) else None
+        patches[location[0]] = (location[1], campaigns[title], fields)
+    present = _present_titles(campaigns, locations, modified, deleted)
+    additions = [camp for name, camp in added.items() if name not in present]
+    return patch_records_file(src_path, dest_path, patches, additions, compact=compact, fmt=fmt)
+
+
+def pending_additions(campaigns, added_titles, added):
+    """Campanhas a acrescentar ao arquivo gerado: {titulo: campanha}.
+
+    Primeiro as do próprio arquivo que não têm posição nele (`added_titles`, o
+    pending()["added"] da fonte: ex.: editadas aqui e excluídas no disco, que a
+    recarga repõe), depois as de `added` (as criadas na sessão).
+    """
+    additions = {title: campaigns[title] for title in added_titles if title in campaigns}
+    for name, camp in added.items():
+        additions.setdefault(name, camp)
+    return additions
+
+
+def skipped_additions(campaigns, locations, modified, added, deleted=()):
+    """Títulos de `added` que export_campaign_file ignora por já existirem no arquivo."""
+    present = _present_titles(campaigns, locations, modified, deleted)
+    return [name for name in added if name in present]
@@ -0,0 +1,209 @@
+"""Formatos dos arquivos de registros: JSON (recuado ou compacto), JSON Lines, JSON com gzip e MessagePack.
+
+Cada formato tem um gravador em streaming, write(caminho, entradas), que recebe as
+entradas de write_records e vai ao disco em blocos de WRITE_BUFFER bytes, num
+temporário renomeado no fim: a memória não cresce com o número de registros. O
+leitor registro a registro, iter_records(caminho), é o que load_records usa com
+`fmt`. O formato de um arquivo sai da extensão (format_for); MessagePack só entra
+em FORMATS se o pacote msgpack estiver instalado.
+"""
+import gzip
+import io
+import json
+import os
+
+from .storage import WRITE_BUFFER, dump_record, iter_json_array, write_array, write_records
+
+try:
+    import msgpack
+except ImportError:  # Opcional: sem ele, o formato MessagePack não é oferecido
+    msgpack = None
+
+
+def _record(raw, record):
+    """Registro de uma entrada de write_records (bytes JSON originais ou registro)."""
+    if record is None:
+        return json.loads(raw)
+    return record if isinstance(record, dict) else dict(record)  # Campaign e outros Mapping
+
+
+def _gzip_open(path, mode):
+    return gzip.open(path, mode)
+
+
+class Format:
+    """Um formato: nome (usado na linha de comando e nas especificações), extensão e rótulo."""
+
+    name = extension = label = None
+    extensions = ()  # Outras extensões reconhecidas na leitura
+    seekable = True  # Offsets do leitor são posições no arquivo (LazyRecords lê sob demanda)
+    loads = None     # bytes de um registro no arquivo -> registro; None: os bytes são JSON
+
+    def iter_records(self, path):
+        """Gera (offset, tamanho, registro) de cada registro do arquivo."""
+        raise NotImplementedError
+
+    def write(self, path, entries):
+        """Grava as entradas (nome, bytes JSON ou None, registro ou None); retorna {nome: (offset, tamanho)}.
+
+        Entradas com nome None não entram no retorno (ver write_records).
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb", buffering=WRITE_BUFFER) as f:
+            offsets = self._write(f, entries)
+        os.replace(tmp_path, path)
+        return offsets
+
+    def _write(self, f, entries):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<Format {self.name}>"
+
+
+class JsonFormat(Format):
+    """Array JSON, recuado como json.dump(..., indent=4) ou com um registro por linha."""
+
+    extension = ".json"
+
+    def __init__(self, compact=False):
+        self.compact = compact
+        self.name = "json-compacto" if compact else "json"
+        self.label = "JSON compacto" if compact else "JSON (recuado)"
+
+    def iter_records(self, path):
+        return iter_json_array(path)
+
+    def write(self, path, entries):
+        return write_records(path, entries, compact=self.compact)
+
+
+class JsonLinesFormat(Format):
+    """Um registro JSON compacto por linha (linhas em branco são ignoradas na leitura)."""
+
+    name = "jsonl"
+    extension = ".jsonl"
+    label = "JSON Lines"
+
+    def iter_records(self, path):
+        with open(path, "rb") as f:
+            offset = 0
+            for number, line in enumerate(f, 1):
+                if number == 1 and line.startswith(b"\xef\xbb\xbf"):
+                    offset, line = 3, line[3:]
+                stripped = line.strip()
+                if stripped:
+                    try:
+                        record = json.loads(stripped)
+                    except ValueError as e:
+                        raise ValueError(f"linha {number}: {e}") from e
+                    yield offset + len(line) - len(line.lstrip()), len(stripped), record
+                offset += len(line)
+
+    def _write(self, f, entries):
+        offsets = {}
+        pos = 0
+        for name, raw, record in entries:
+            if raw is None or b"\n" in raw:
+                raw = dump_record(_record(raw, record), compact=True)
+            if name is not None:
+                offsets[name] = (pos, len(raw))
+            pos += f.write(raw) + f.write(b"\n")
+        return offsets
+
+
+class GzipJsonFormat(Format):
+    """Array JSON compacto dentro de um gzip (lê com zcat); offsets do conteúdo descompactado."""
+
+    name = "json.gz"
+    extension = ".json.gz"
+    extensions = (".gz",)
+    label = "JSON + gzip"
+    seekable = False
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def iter_records(self, path):
+        return iter_json_array(path, opener=_gzip_open)
+
+    def _write(self, f, entries):
+        # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=self.level, mtime=0) as gz:
+            with io.BufferedWriter(gz, WRITE_BUFFER) as out:
+                return write_array(out, entries, compact=True)
+
+
+class MessagePackFormat(Format):
+    """Registros MessagePack em sequência (sem array em volta), lidos um a um."""
+
+    name = "msgpack"
+    extension = ".msgpack"
+    extensions = (".mpk",)
+    label = "MessagePack"
+
+    @staticmethod
+    def loads(raw):
+        return msgpack.unpackb(raw, raw=False)
+
+    def iter_records(self, path):
+        with open(path, "rb") as f:
+            unpacker = msgpack.Unpacker(f, raw=False, read_size=1 << 16)
+            offset = 0
+            for record in unpacker:
+                end = unpacker.tell()
+                yield offset, end - offset, record
+                offset = end
+
+    def _write(self, f, entries):
+        packer = msgpack.Packer(use_bin_type=True)
+        offsets = {}
+        pos = 0
+        for name, raw, record in entries:
+            data = packer.pack(_record(raw, record))
+            if name is not None:
+                offsets[name] = (pos, len(data))
+            pos += f.write(data)
+        return offsets
+
+
+_ALL = (JsonFormat(), JsonFormat(compact=True), JsonLinesFormat(), GzipJsonFormat(), MessagePackFormat())
+FORMATS = {fmt.name: fmt for fmt in _ALL if fmt.name != "msgpack" or msgpack is not None}
+DEFAULT_FORMAT = "json"
+
+
+def get_format(fmt):
+    """Format pelo nome (ver FORMATS); aceita também um Format."""
+    if isinstance(fmt, Format):
+        return fmt
+    if fmt == "msgpack" and msgpack is None:
+        raise ValueError("O formato msgpack precisa do pacote msgpack (pip install msgpack).")
+    try:
+        return FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"Formato desconhecido: {fmt} (use {', '.join(FORMATS)}).") from None
+
+
+def split_extension(path):
+    """(base, extensão) do caminho, com as extensões duplas dos formatos (ex.: ".json.gz")."""
+    lower = path.lower()
+    for fmt in _ALL:
+        for ext in (fmt.extension, *fmt.extensions):
+            if ext.count(".") > 1 and lower.endswith(ext):
+                return path[:-len(ext)], path[-len(ext):]
+    return os.path.splitext(path)
+
+
+def format_for(path):
+    """Formato de leitura de um arquivo, pela extensão (padrão: array JSON)."""
+    ext = split_extension(path)[1].lower()
+    for fmt in _ALL:
+        if ext == fmt.extension or ext in fmt.extensions:
+            return get_format(fmt.name)
+    return FORMATS[DEFAULT_FORMAT]
+
+
+def file_patterns():
+    """Padrões de nome de arquivo de todos os formatos disponíveis (ex.: para diálogos de abrir)."""
+    exts = dict.fromkeys(ext for fmt in FORMATS.values() for ext in (fmt.extension, *fmt.extensions))
+    return " ".join(f"*{ext}" for ext in exts)
@@ -0,0 +1,138 @@
+"""Histórico de campanhas com diário append-only."""
+import json
+import os
+import threading
+
+from .formats import format_for, get_format, split_extension
+from .model import Campaign
+from .storage import LazyRecords, load_records, save_records
+
+
+class HistoryStore:
+    """Histórico de campanhas: snapshot JSON + diário append-only (JSONL).
+
+    Cada inclusão/edição/exclusão vira uma linha em `<base>.jsonl` no momento em
+    que acontece ({"op": "put", "campanha": {...}} ou {"op": "del", "titulo": ...};
+    um put de campanha renomeada leva também "anterior", o título que ela deixa),
+    então nada se perde se o processo morrer. load() lê o snapshot em streaming e
+    reaplica o diário; quando ele passa de COMPACT_THRESHOLD operações, compact()
+    regrava o snapshot (temp + rename) e esvazia o diário. O formato do snapshot
+    sai da extensão de `path` (ver formats.format_for) ou de `fmt`.
+    """
+
+    COMPACT_THRESHOLD = 500
+
+    def __init__(self, path="campanhas_historico.json", fmt=None):
+        self.path = path
+        self.format = get_format(fmt) if fmt else format_for(path)
+        base = split_extension(path)[0]
+        self.journal_path = base + ".jsonl" if base + ".jsonl" != path else base + ".diario.jsonl"
+        self.pending = 0      # Operações no diário desde a última compactação
+        self._journal = None  # Arquivo do diário aberto para append
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def load(self, on_batch=None, visit=None):
+        """Lê snapshot + diário e retorna um LazyRecords (titulo -> Campaign).
+
+        `visit(titulo, campanha)` é chamado para cada registro do snapshot e para
+        cada operação do diário (com campanha None nas exclusões).
+        """
+        if os.path.exists(self.path):
+            records = load_records(self.path, "titulo", on_batch=on_batch, visit=visit,
+                                   decode=Campaign.from_dict, fmt=self.format)
+        else:
+            records = LazyRecords(self.path, Campaign.from_dict)
+        with self._lock:
+            self.pending = self._replay(records, visit)
+            if self.pending >= self.COMPACT_THRESHOLD:
+                self._compact(records)
+        return records
+
+    def _replay(self, records, visit=None):
+        try:
+            f = open(self.journal_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+        count = 0
+        with f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Linha truncada (processo morto no meio da escrita)
+                if op.get("op") == "put":
+                    camp = Campaign.from_dict(op["campanha"])
+                    previous = op.get("anterior")
+                    if previous is not None and previous != camp["titulo"]:
+                        records.pop(previous, None)
+                        if visit is not None:
+                            visit(previous, None)
+                    records[camp["titulo"]] = camp
+                    if visit is not None:
+                        visit(camp["titulo"], camp)
+                elif op.get("op") == "del":
+                    records.pop(op["titulo"], None)
+                    if visit is not None:
+                        visit(op["titulo"], None)
+                count += 1
+        return count
+
+    def put(self, camp, previous=None):
+        """Registra a versão atual de uma campanha.
+
+        `previous` é o título com que ela foi gravada antes, se foi renomeada: a
+        entrada antiga sai na mesma linha do diário.
+        """
+        op = {"op": "put", "campanha": dict(camp)}
+        if previous is not None and previous != camp.get("titulo"):
+            op["anterior"] = previous
+        self._append(op)
+
+    def delete(self, title):
+        """Registra a remoção de uma campanha."""
+        self._append({"op": "del", "titulo": title})
+
+    def _append(self, op):
+        line = json.dumps(op, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._journal is None:
+                if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path):
+                    with open(self.journal_path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = "\n" + line  # Isola uma última linha truncada
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(line)
+            self._journal.flush()
+            self.pending += 1
+
+    def compact(self, records, fmt=None):
+        """Grava `records` como novo snapshot e esvazia o diário.
+
+        `fmt` troca o formato do snapshot (ex.: JSON compacto), desde que a
+        extensão do arquivo continue valendo para a leitura.
+        """
+        with self._lock:
+            self._compact(records, fmt)
+
+    def _compact(self, records, fmt=None):
+        fmt = self.format if fmt is None else get_format(fmt)
+        if fmt.extension != self.format.extension:
+            raise ValueError(f"O histórico {os.path.basename(self.path)} não pode ser gravado como {fmt.name}.")
+        self._close_journal()
+        save_records(self.path, records, fmt)
+        # Se o processo morrer antes desta linha, reaplicar o diário é inofensivo
+        open(self.journal_path, "w", encoding="utf-8").close()
+        self.pending = 0
+
+    def close(self):
+        with self._lock:
+            self._close_journal()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
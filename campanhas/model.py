@@ -0,0 +1,191 @@
+"""Campos das campanhas, registro tipado (Campaign) e montagem a partir do formulário."""
+import sys
+from collections.abc import MutableMapping
+
+# Campos da campanha, na ordem do formulário
+FIELDS = (
+    "id", "titulo", "imagem", "dificuldade", "grupoMinimo", "localidade",
+    "corpo", "monstros", "chefões", "recompensas", "npcs",
+)
+NUMERIC_FIELDS = ("grupoMinimo",)
+# Campos que podem ter múltiplas linhas (listas ou textos mais longos)
+LIST_FIELDS = ("corpo", "monstros", "chefões", "recompensas", "npcs")
+# Campos gravados como array JSON (um nome por linha no formulário)
+ARRAY_FIELDS = ("monstros", "chefões", "recompensas", "npcs")
+
+# Valores de vocabulário fechado: repetidos em milhares de registros, são
+# internados (sys.intern) para que todos compartilhem o mesmo objeto str
+ENUM_FIELDS = ("dificuldade", "raridade", "tipo")
+DIFICULDADES = ("fácil", "médio", "difícil")
+RARIDADES = ("Comum", "Incomum", "Raro", "Muito Raro", "Lendário", "Mítico")
+for _value in DIFICULDADES + RARIDADES:
+    sys.intern(_value)
+# Arrays de ids de monstros/itens: os mesmos ids se repetem entre campanhas
+_INTERNED_ARRAYS = ("monstros", "chefões", "recompensas")
+
+
+def intern_enums(record):
+    """Interna os valores de ENUM_FIELDS de um registro (dict); retorna o próprio registro."""
+    for field in ENUM_FIELDS:
+        value = record.get(field)
+        if type(value) is str:
+            record[field] = sys.intern(value)
+    return record
+
+
+def empty_value(field):
+    """Texto mostrado no formulário quando o campo é marcado como "Não tem"."""
+    if field in NUMERIC_FIELDS and field not in LIST_FIELDS:
+        return "0"
+    return "nenhum"
+
+
+def is_empty_value(value):
+    return value in ("nenhum", "0", 0) or (isinstance(value, list) and not value)
+
+
+# Nome do atributo de cada campo (identificadores ASCII)
+_ATTRS = {field: field.replace("õ", "o") for field in FIELDS}
+
+
+class Campaign(MutableMapping):
+    """Campanha tipada: listas de verdade em ARRAY_FIELDS e int em grupoMinimo.
+
+    Um atributo por campo (__slots__, sem dict por instância); continua se
+    comportando como dicionário com as chaves do JSON, então o resto do código
+    usa camp["titulo"], camp.get(...) e camp.update(...) como antes.
+    from_dict/to_dict não perdem nada: valores fora do tipo esperado (ex.:
+    "nenhum" em monstros), campos ausentes, campos extras e a ordem das chaves
+    voltam para o JSON exatamente como vieram.
+    """
+
+    __slots__ = tuple(_ATTRS.values()) + ("_extra", "_order")
+
+    def __init__(self, values=(), **kwargs):
+        self._extra = None  # Campos fora de FIELDS
+        self._order = None  # Ordem das chaves, se diferente da canônica
+        self.update(values, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        camp = cls.__new__(cls)
+        camp._extra = None
+        camp._order = None
+        for key, value in data.items():
+            attr = _ATTRS.get(key)
+            if attr is None:
+                if camp._extra is None:
+                    camp._extra = {}
+                camp._extra[key] = value
+            else:
+                if key in _INTERNED_ARRAYS and type(value) is list:
+                    value = [sys.intern(v) if type(v) is str else v for v in value]
+                setattr(camp, attr, value)
+        value = getattr(camp, "dificuldade", None)
+        if type(value) is str:
+            camp.dificuldade = sys.intern(value)
+        keys = tuple(data)
+        if keys != tuple(camp._canonical_keys()):
+            camp._order = keys
+        return camp
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def _canonical_keys(self):
+        for field, attr in _ATTRS.items():
+            if hasattr(self, attr):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __getitem__(self, key):
+        attr = _ATTRS.get(key)
+        if attr is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        try:
+            return getattr(self, attr)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if self._order is not None and key not in self:
+            self._order += (key,)
+        attr = _ATTRS.get(key)
+        if attr is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        else:
+            setattr(self, attr, value)
+
+    def __delitem__(self, key):
+        attr = _ATTRS.get(key)
+        if attr is None:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+        else:
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._order is not None:
+            self._order = tuple(k for k in self._order if k != key)
+
+    def __contains__(self, key):
+        attr = _ATTRS.get(key)
+        if attr is None:
+            return self._extra is not None and key in self._extra
+        return hasattr(self, attr)
+
+    def __iter__(self):
+        return iter(self._order) if self._order is not None else self._canonical_keys()
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, Campaign):
+            return self.to_dict() == other.to_dict()
+        return super().__eq__(other)
+
+    def __repr__(self):
+        return f"Campaign({self.to_dict()!r})"
+
+
+def build_campaign(values, empty=()):
+    """Monta uma Campaign a partir dos textos do formulário.
+
+    `values` mapeia campo -> texto digitado; campos em `empty` (marcados "Não
+    tem") ficam vazios: [] nos arrays, 0 nos numéricos e "nenhum" nos textos.
+    Arrays recebem um nome por linha. Levanta ValueError se não houver título ou
+    se um campo numérico não for inteiro.
+    """
+    camp = Campaign()
+    for field in FIELDS:
+        text = "" if field in empty else str(values.get(field, "")).strip()
+        if field in ARRAY_FIELDS:
+            camp[field] = [] if is_empty_value(text) else [line.strip() for line in text.splitlines() if line.strip()]
+        elif field in NUMERIC_FIELDS:
+            try:
+                camp[field] = int(text) if text else 0
+            except ValueError:
+                raise ValueError(f"O campo '{field}' deve ser um número inteiro.") from None
+        else:
+            camp[field] = "nenhum" if field in empty else text
+    if not camp["titulo"] or camp["titulo"] == "nenhum":
+        raise ValueError("O campo 'titulo' é obrigatório.")
+    camp.dificuldade = sys.intern(camp.dificuldade)
+    return camp
+
+
+def append_names(current, names):
+    """Acrescenta nomes a um campo de lista (texto com um nome por linha ou lista)."""
+    if isinstance(current, list):
+        return current + list(names)
+    if not current or current == "nenhum":
+        return "\n".join(names)
+    return "\n".join([current, *names])
@@ -0,0 +1,166 @@
+"""Referências das campanhas a monstros/itens, resolvidas por id.
+
+As campanhas citam monstros em "monstros"/"chefões" e itens em "recompensas",
+normalmente pelo "id" do catálogo (ex.: "goblin", "item1"); campanhas montadas
+pela interface podem citar pelo "nome". ReferenceIndex mantém os dois sentidos:
+catálogo id -> nome e id -> campanhas que o usam, atualizados por campanha em
+O(referências dela).
+"""
+from .model import is_empty_value
+
+# Campo da campanha -> catálogo referenciado
+REFERENCE_FIELDS = {"monstros": "monstros", "chefões": "monstros", "recompensas": "itens"}
+CATALOGS = ("monstros", "itens")
+
+
+def extract_refs(camp):
+    """Lista de (catálogo, campo, referência) de uma campanha.
+
+    Aceita listas (formato dos arquivos) e textos com uma referência por linha
+    (formato do formulário); "nenhum"/"0" não contam como referência.
+    """
+    refs = []
+    for field, catalog in REFERENCE_FIELDS.items():
+        value = camp.get(field)
+        if isinstance(value, str):
+            value = value.splitlines()
+        elif not isinstance(value, list):
+            continue
+        for ref in value:
+            if isinstance(ref, str):
+                ref = ref.strip()
+                if ref and not is_empty_value(ref):
+                    refs.append((catalog, field, ref))
+    return refs
+
+
+class ReferenceIndex:
+    """Índices id -> nome dos catálogos e índice reverso referência -> campanhas.
+
+    As campanhas são identificadas por (origem, titulo), onde origem é a aba de
+    onde vieram ("file", "added", "history").
+    """
+
+    def __init__(self):
+        self._catalogs = {catalog: {} for catalog in CATALOGS}   # catálogo -> registros (nome -> ...)
+        self._ids = {catalog: {} for catalog in CATALOGS}        # catálogo -> id -> nome
+        self._refs = {}                                          # (origem, titulo) -> [(catálogo, campo, ref)]
+        self._used_by = {catalog: {} for catalog in CATALOGS}    # catálogo -> ref -> set de (origem, titulo)
+        self._refs_of = {}                                       # catálogo -> nome -> id (montado no 1º uso)
+
+    # --- Catálogos ---
+    def set_catalog(self, catalog, records):
+        """Registra um catálogo carregado (records.ids, se houver, dá o id -> nome)."""
+        self._catalogs[catalog] = records
+        ids = getattr(records, "ids", None)
+        if ids is None:
+            ids = {rec["id"]: name for name, rec in records.items() if rec.get("id") is not None}
+        self._ids[catalog] = ids
+        self._refs_of.pop(catalog, None)
+
+    def name_of(self, catalog, ref):
+        """Nome do registro citado por id ou por nome; None se a referência não existe."""
+        name = self._ids[catalog].get(ref)
+        if name is not None:
+            return name
+        return ref if ref in self._catalogs[catalog] else None
+
+    def ref_of(self, catalog, name):
+        """Referência gravada nas campanhas para o registro: o id, ou o nome se não tiver id."""
+        refs = self._refs_of.get(catalog)
+        if refs is None:
+            refs = self._refs_of[catalog] = {name: ref for ref, name in self._ids[catalog].items()}
+        return refs.get(name, name)
+
+    def new_refs(self, catalog, current, names):
+        """Referências (ids) dos registros `names` que ainda não estão em `current`.
+
+        `current` é o valor do campo (lista ou texto com uma referência por linha);
+        uma referência já presente conta pelo id ou pelo nome. Repetições em
+        `names` também são descartadas, e a ordem de `names` é mantida.
+        """
+        if isinstance(current, str):
+            current = current.splitlines()
+        seen = set()
+        for ref in current or ():
+            if isinstance(ref, str) and ref.strip():
+                ref = ref.strip()
+                seen.add(self.name_of(catalog, ref) or ref)
+        result = []
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                result.append(self.ref_of(catalog, name))
+        return result
+
+    # --- Campanhas ---
+    def set_campaign(self, source, title, camp):
+        """(Re)indexa as referências de uma campanha; camp None remove a campanha."""
+        key = (source, title)
+        for catalog, _, ref in self._refs.pop(key, ()):
+            users = self._used_by[catalog].get(ref)
+            if users is not None:
+                users.discard(key)
+                if not users:
+                    del self._used_by[catalog][ref]
+        if camp is None:
+            return
+        refs = extract_refs(camp)
+        self._refs[key] = refs
+        for catalog, _, ref in refs:
+            self._used_by[catalog].setdefault(ref, set()).add(key)
+
+    def remove_campaign(self, source, title):
+        self.set_campaign(source, title, None)
+
+    def set_source(self, source, refs_by_title):
+        """Troca todas as campanhas de uma origem; `refs_by_title` vem de RefCollector."""
+        for key in [key for key in self._refs if key[0] == source]:
+            self.set_campaign(key[0], key[1], None)
+        for title, refs in refs_by_title.items():
+            key = (source, title)
+            self._refs[key] = refs
+            for catalog, _, ref in refs:
+                self._used_by[catalog].setdefault(ref, set()).add(key)
+
+    def users_of(self, catalog, name):
+        """Campanhas (origem, titulo) que citam o registro `name`, pelo nome ou pelo id."""
+        users = set(self._used_by[catalog].get(name, ()))
+        record = self._catalogs[catalog].get(name) if name in self._catalogs[catalog] else None
+        record_id = record.get("id") if isinstance(record, dict) else None
+        if record_id is not None:
+            users.update(self._used_by[catalog].get(record_id, ()))
+        return sorted(users)
+
+    def dangling(self):
+        """Referências que não existem nos catálogos: [(origem, titulo, campo, ref)].
+
+        Cada referência distinta é resolvida uma única vez (O(referências)).
+        Catálogos não carregados são ignorados.
+        """
+        result = []
+        for catalog in CATALOGS:
+            if not self._catalogs[catalog]:
+                continue
+            for ref, users in self._used_by[catalog].items():
+                if self.name_of(catalog, ref) is not None:
+                    continue
+                for source, title in users:
+                    for ref_catalog, field, value in self._refs[(source, title)]:
+                        if ref_catalog == catalog and value == ref:
+                            result.append((source, title, field, ref))
+        result.sort()
+        return result
+
+
+class RefCollector:
+    """Coleta referências durante a leitura (callback `visit` de load_records/HistoryStore.load)."""
+
+    def __init__(self):
+        self.refs = {}  # titulo -> [(catálogo, campo, ref)]
+
+    def __call__(self, title, camp):
+        if camp is None:
+            self.refs.pop(title, None)
+        else:
+            self.refs[title] = extract_refs(camp)
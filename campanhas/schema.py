@@ -0,0 +1,338 @@
+"""Schemas declarativos de campanhas, monstros e itens, compilados em validadores.
+
+Um schema é {"chave": campo-chave, "campos": {campo: regra}, "ausentes": valores}.
+Cada regra pode ter:
+  "tipo": "texto", "inteiro", "numero", "lista", "objeto" ou "nulo" (ou uma tupla deles)
+  "obrigatorio": o campo precisa existir (e não ser um dos "ausentes")
+  "vazio": False recusa texto em branco
+  "valores": vocabulário fechado; "padrao": expressão regular (textos)
+  "min"/"max": limites (números)
+  "itens": regra dos elementos (listas)
+Os "ausentes" ("nenhum", o "Não tem" do formulário) contam como campo ausente, e
+campos fora do schema são aceitos. compile_schema gera uma única vez (exec) uma
+função que testa o registro inteiro sem chamadas por campo; só os registros
+reprovados passam pelas funções por campo, que montam as mensagens.
+"""
+import os
+import re
+import time
+from collections.abc import Mapping
+
+from .formats import format_for
+from .model import DIFICULDADES, RARIDADES
+
+MAX_PROBLEMS = 1000  # Problemas guardados por arquivo (os demais só são contados)
+
+_TEXT = {"tipo": "texto"}
+_NAMES = {"tipo": "lista", "itens": {"tipo": "texto", "vazio": False}}
+# Histórico gravado pelas versões antigas do app: listas como texto com um nome
+# por linha e grupoMinimo como texto numérico (os formatos que build_campaign lê)
+_LEGACY_NAMES = {**_NAMES, "tipo": ("lista", "texto")}
+
+CAMPAIGN_SCHEMA = {
+    "chave": "titulo",
+    "ausentes": ("nenhum",),
+    "campos": {
+        "id": _TEXT,
+        "titulo": {"tipo": "texto", "obrigatorio": True, "vazio": False},
+        "imagem": _TEXT,
+        "dificuldade": {"tipo": "texto", "valores": DIFICULDADES},
+        "grupoMinimo": {"tipo": ("inteiro", "texto"), "min": 0, "padrao": r"\s*\d+\s*"},
+        "localidade": _TEXT,
+        "corpo": _TEXT,
+        "monstros": _LEGACY_NAMES,
+        "chefões": _LEGACY_NAMES,
+        "recompensas": _LEGACY_NAMES,
+        "npcs": _LEGACY_NAMES,
+    },
+}
+
+MONSTER_SCHEMA = {
+    "chave": "nome",
+    "ausentes": ("nenhum",),
+    "campos": {
+        "id": {"tipo": "texto", "vazio": False},
+        "nome": {"tipo": "texto", "obrigatorio": True, "vazio": False},
+        "foto": _TEXT,
+        "tipo": _TEXT,
+        "alinhamento": _TEXT,
+        "classeArmadura": _TEXT,
+        "pontosVida": _TEXT,
+        "deslocamento": _TEXT,
+        "nivelDesafio": {"tipo": "texto", "padrao": r"\d+(/\d+)?"},
+        "ataques": {"tipo": "lista", "itens": _TEXT},
+        "ações": {"tipo": "lista", "itens": _TEXT},
+    },
+}
+
+ITEM_SCHEMA = {
+    "chave": "nome",
+    "ausentes": ("nenhum",),
+    "campos": {
+        "id": {"tipo": "texto", "vazio": False},
+        "nome": {"tipo": "texto", "obrigatorio": True, "vazio": False},
+        "tipo": _TEXT,
+        "descricao": _TEXT,
+        "efeito": {"tipo": ("texto", "nulo")},
+        "dano": {"tipo": ("texto", "nulo")},
+        "cura": {"tipo": ("texto", "nulo")},
+        "buffDebuff": {"tipo": ("objeto", "nulo")},
+        "raridade": {"tipo": "texto", "valores": RARIDADES},
+    },
+}
+
+SCHEMAS = {"campanhas": CAMPAIGN_SCHEMA, "monstros": MONSTER_SCHEMA, "itens": ITEM_SCHEMA}
+
+_TYPES = {"texto": (str,), "inteiro": (int,), "numero": (int, float), "lista": (list,),
+          "objeto": (dict,), "nulo": (type(None),)}
+_TYPE_NAMES = {"texto": "texto", "inteiro": "número inteiro", "numero": "número", "lista": "lista",
+               "objeto": "objeto", "nulo": "null"}
+_JSON_NAMES = {str: "texto", int: "número inteiro", float: "número", bool: "booleano", list: "lista",
+               dict: "objeto", type(None): "null"}
+_ABSENT = object()
+
+
+def _compile_rule(rule):
+    """Função (valor, caminho, saída) que acrescenta (caminho, mensagem) a `saída`."""
+    kinds = rule.get("tipo", ())
+    kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+    checks = []  # valor -> mensagem ou None; a primeira falha encerra o valor
+    if kinds:
+        accepted = frozenset(t for kind in kinds for t in _TYPES[kind])
+        expected = " ou ".join(_TYPE_NAMES[kind] for kind in kinds)
+
+        def check_type(value):
+            # type() e não isinstance: bool não passa por inteiro
+            if type(value) not in accepted:
+                return f"esperado {expected}, encontrado {_JSON_NAMES.get(type(value), type(value).__name__)}"
+        checks.append(check_type)
+    if rule.get("vazio") is False:
+        checks.append(lambda v: "não pode ser vazio" if type(v) is str and not v.strip() else None)
+    if "valores" in rule:
+        allowed = frozenset(rule["valores"])
+        shown = ", ".join(rule["valores"])
+        checks.append(lambda v: None if type(v) is not str or v in allowed else f"'{v}' não é um de: {shown}")
+    if "padrao" in rule:
+        pattern = re.compile(rule["padrao"])
+        checks.append(lambda v: None if type(v) is not str or pattern.fullmatch(v)
+                      else f"'{v}' fora do formato {rule['padrao']}")
+    low, high = rule.get("min"), rule.get("max")
+    if low is not None or high is not None:
+        def check_range(value):
+            if type(value) not in (int, float):
+                return None
+            if low is not None and value < low:
+                return f"{value} menor que {low}"
+            if high is not None and value > high:
+                return f"{value} maior que {high}"
+        checks.append(check_range)
+    item_check = _compile_rule(rule["itens"]) if "itens" in rule else None
+
+    def validate(value, path, out):
+        for check in checks:
+            message = check(value)
+            if message:
+                out.append((path, message))
+                return
+        if item_check is not None and type(value) is list:
+            for i, item in enumerate(value):
+                item_check(item, f"{path}[{i}]", out)
+    return validate
+
+
+def _rule_lines(rule, var, env, indent, depth=0):
+    """Linhas Python que fazem `return False` se `var` não satisfaz a regra (constantes vão para `env`)."""
+    n = len(env)
+    pad = " " * indent
+    kinds = rule.get("tipo", ())
+    kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+    conditions = []  # Condições de falha
+    if kinds:
+        env[f"_t{n}"] = frozenset(t for kind in kinds for t in _TYPES[kind])
+        conditions.append(f"type({var}) not in _t{n}")
+    if rule.get("vazio") is False:
+        conditions.append(f"(type({var}) is str and not {var}.strip())")
+    if "valores" in rule:
+        env[f"_v{n}"] = frozenset(rule["valores"])
+        conditions.append(f"(type({var}) is str and {var} not in _v{n})")
+    if "padrao" in rule:
+        env[f"_p{n}"] = re.compile(rule["padrao"]).fullmatch
+        conditions.append(f"(type({var}) is str and _p{n}({var}) is None)")
+    if rule.get("min") is not None:
+        conditions.append(f"(type({var}) in _num and {var} < {rule['min']!r})")
+    if rule.get("max") is not None:
+        conditions.append(f"(type({var}) in _num and {var} > {rule['max']!r})")
+    lines = [f"{pad}if {' or '.join(conditions)}:", f"{pad}    return False"] if conditions else []
+    if "itens" in rule:
+        item = f"x{depth}"
+        lines.append(f"{pad}if type({var}) is list:")
+        lines.append(f"{pad}    for {item} in {var}:")
+        lines.extend(_rule_lines(rule["itens"], item, env, indent + 8, depth + 1) or [f"{pad}        pass"])
+    return lines
+
+
+def _compile_fast(fields, absent):
+    """Gera `ok(registro)`: True se o registro (um dict) passa em todas as regras."""
+    env = {"_A": _ABSENT, "_absent": absent, "_num": frozenset((int, float))}
+    lines = ["def ok(record):", "    get = record.get"]
+    for field, rule in fields.items():
+        lines.append(f"    v = get({field!r}, _A)")
+        lines.append("    if v is _A or (type(v) is str and v in _absent):")
+        lines.append("        " + ("return False" if rule.get("obrigatorio") else "pass"))
+        lines.append("    else:")
+        lines.extend(_rule_lines(rule, "v", env, 8) or ["        pass"])
+    lines.append("    return True")
+    exec("\n".join(lines), env)
+    return env["ok"]
+
+
+class Validator:
+    """Schema compilado: validator(registro) -> [(caminho, mensagem)] (vazia se válido)."""
+
+    def __init__(self, schema):
+        self.key = schema["chave"]
+        self._absent = frozenset(schema.get("ausentes", ()))
+        self._ok = _compile_fast(schema["campos"], self._absent)
+        self._fields = tuple((field, _compile_rule(rule), bool(rule.get("obrigatorio")))
+                             for field, rule in schema["campos"].items())
+
+    def __call__(self, record):
+        if not isinstance(record, Mapping):
+            return [("", "o registro não é um objeto")]
+        if self._ok(record):
+            return []
+        out = []
+        absent = self._absent
+        for field, check, required in self._fields:
+            value = record.get(field, _ABSENT)
+            if value is _ABSENT or (type(value) is str and value in absent):
+                if required:
+                    out.append((field, "campo obrigatório"))
+                continue
+            check(value, field, out)
+        return out
+
+
+def compile_schema(schema):
+    return Validator(schema)
+
+
+_validators = {}
+
+
+def validator_for(kind):
+    """Validador de SCHEMAS[kind] ("campanhas", "monstros" ou "itens"), compilado uma vez."""
+    validator = _validators.get(kind)
+    if validator is None:
+        validator = _validators[kind] = compile_schema(SCHEMAS[kind])
+    return validator
+
+
+def schema_kind(path):
+    """Schema pelo nome do arquivo: monstros*.json, itens*.json ou (o resto) campanhas."""
+    name = os.path.basename(path).lower()
+    for kind in ("monstros", "itens"):
+        if name.startswith(kind):
+            return kind
+    return "campanhas"
+
+
+class RecordCheck:
+    """Problemas de um arquivo, coletados registro a registro durante a leitura.
+
+    Chamado como check(posição, registro) (ver load_records); além do schema,
+    aponta chaves repetidas. `problems` guarda até `limit` tuplas (posição, nome,
+    caminho, mensagem) e `count` conta todas.
+    """
+
+    def __init__(self, validator, limit=MAX_PROBLEMS):
+        self.validator = validator
+        self.limit = limit
+        self.problems = []
+        self.count = 0
+        self._seen = {}  # chave -> posição da primeira ocorrência
+
+    def __call__(self, position, record):
+        validator = self.validator
+        if type(record) is dict:
+            # Caminho rápido: registro válido, só resta conferir a repetição da chave
+            errors = [] if validator._ok(record) else validator(record)
+            name = record.get(validator.key)
+        else:
+            errors = validator(record)
+            name = record.get(validator.key) if isinstance(record, Mapping) else None
+        if type(name) is str:
+            first = self._seen.setdefault(name, position)
+            if first != position:
+                errors.append((validator.key, f"repetido (já aparece no registro {first})"))
+        else:
+            name = None
+        for path, message in errors:
+            if self.count < self.limit:
+                self.problems.append((position, name, path, message))
+            self.count += 1
+
+    def dump_state(self):
+        """Estado serializável (marshal), guardado no cache dos catálogos."""
+        return [self.count, [list(p) for p in self.problems]]
+
+    def restore(self, state):
+        """Retoma os problemas de dump_state() (sem reler o arquivo)."""
+        self.count = state[0]
+        self.problems = [tuple(p) for p in state[1]]
+
+
+def format_problem(problem):
+    """Uma linha legível: "registro 3 'Título' grupoMinimo: mensagem"."""
+    position, name, path, message = problem
+    where = "registro" if position is None else f"registro {position}"
+    if name is not None:
+        where += f" '{name}'"
+    return f"{where} {path}: {message}" if path else f"{where}: {message}"
+
+
+def validate_records(records, kind, names=None):
+    """Valida registros em memória (nome -> registro); `names` restringe a alguns nomes.
+
+    Retorna [(None, nome, caminho, mensagem)].
+    """
+    validator = validator_for(kind)
+    problems = []
+    for name in records if names is None else names:
+        for path, message in validator(records[name]):
+            problems.append((None, name, path, message))
+    return problems
+
+
+def validate_file(path, kind=None):
+    """Valida um arquivo inteiro em uma passada (streaming); pode rodar em outro processo.
+
+    Retorna {"arquivo", "schema", "registros", "total", "problemas", "segundos"} e
+    "erro" se o arquivo não pôde ser lido.
+    """
+    start = time.perf_counter()
+    kind = kind or schema_kind(path)
+    check = RecordCheck(validator_for(kind))
+    result = {"arquivo": path, "schema": kind, "registros": 0}
+    try:
+        for position, (_, _, record) in enumerate(format_for(path).iter_records(path)):
+            check(position, record)
+            result["registros"] += 1
+    except (OSError, ValueError) as e:
+        result["erro"] = str(e)
+    result["total"] = check.count
+    result["problemas"] = check.problems
+    result["segundos"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def validate_files(paths, kind=None, jobs=None):
+    """validate_file de vários arquivos em paralelo (um processo por CPU, por padrão), na ordem de `paths`."""
+    paths = list(paths)
+    if jobs == 1 or len(paths) < 2:
+        return [validate_file(path, kind) for path in paths]
+    # Importado aqui: multiprocessing pesa na abertura da interface, que não usa processos
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunk = max(1, len(paths) // (4 * (jobs or os.cpu_count() or 1)))
+        return list(pool.map(validate_file, paths, [kind] * len(paths), chunksize=chunk))
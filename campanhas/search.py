@@ -0,0 +1,312 @@
+"""Busca indexada (prefixo, sem acentos) sobre catálogos de monstros/itens."""
+import bisect
+import re
+import unicodedata
+from array import array
+
+from .model import RARIDADES
+
+# Campos de monstros/itens cobertos pela busca
+SEARCH_FIELDS = ("nome", "tipo", "raridade", "nivelDesafio", "alinhamento", "descricao")
+_TOKEN_RE = re.compile(r"[\w/]+")
+
+
+def normalize_text(text):
+    """Minúsculas e sem acentos ("Poção" -> "pocao") para comparações de busca."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+_FOLDED = {}  # Cache token bruto -> token normalizado (o vocabulário se repete muito)
+
+
+def tokenize(text):
+    """Quebra o texto em tokens normalizados (ver normalize_text)."""
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    tokens = _TOKEN_RE.findall(text.casefold())
+    folded = _FOLDED
+    if len(folded) > 500000:
+        folded.clear()
+    result = []
+    for tok in tokens:
+        norm = folded.get(tok)
+        if norm is None:
+            norm = folded[tok] = normalize_text(tok)
+        result.append(norm)
+    return result
+
+
+class SearchIndex:
+    """Índice invertido (token -> ids) sobre os campos SEARCH_FIELDS de um catálogo.
+
+    Cada termo da consulta casa por prefixo, sem acentos; os termos são combinados
+    com E. Os tokens ficam numa lista ordenada, então o intervalo de um prefixo é
+    achado com bisect, e as uniões por prefixo curto são memorizadas.
+    """
+
+    PREFIX_CACHE_LEN = 3  # Prefixos até este tamanho têm a união memorizada
+
+    def __init__(self, records=None, fields=SEARCH_FIELDS):
+        self.fields = fields
+        self._names = []      # id -> nome (None após remoção/reindexação)
+        self._ids = {}        # nome -> id
+        self._postings = {}   # token -> set de ids
+        self._tokens = []     # tokens ordenados (None = precisa reordenar)
+        self._prefix_cache = {}
+        if records:
+            self.extend(records.items())
+
+    def __len__(self):
+        return len(self._ids)
+
+    def dump_state(self):
+        """Estado do índice só com tipos básicos (serializável com marshal).
+
+        As postings vão como bytes de array("i"): carregar milhares de sets é o que
+        domina a leitura, então elas só viram set quando um token é consultado.
+        """
+        if self._tokens is None:
+            self._tokens = sorted(self._postings)
+        postings = {tok: ids if isinstance(ids, bytes) else array("i", ids).tobytes()
+                    for tok, ids in self._postings.items()}
+        return {"fields": list(self.fields), "names": self._names,
+                "postings": postings, "tokens": self._tokens}
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls(fields=tuple(state["fields"]))
+        index._names = state["names"]
+        index._ids = dict(zip(index._names, range(len(index._names))))
+        index._ids.pop(None, None)
+        index._postings = state["postings"]
+        index._tokens = state["tokens"]
+        return index
+
+    def _record_tokens(self, name, record):
+        tokens = set(tokenize(name))
+        for field in self.fields:
+            value = record.get(field)
+            if value:
+                tokens.update(tokenize(value))
+        return tokens
+
+    def _posting(self, tok):
+        """Set de ids do token (desempacotando postings vindas do cache)."""
+        ids = self._postings.get(tok)
+        if isinstance(ids, bytes):
+            packed = array("i")
+            packed.frombytes(ids)
+            ids = self._postings[tok] = set(packed)
+        return ids
+
+    def _index(self, name, record):
+        old_id = self._ids.get(name)
+        if old_id is not None:
+            # Reindexação: o id antigo vira "morto" e é ignorado nas buscas
+            self._names[old_id] = None
+        doc_id = len(self._names)
+        self._names.append(name)
+        self._ids[name] = doc_id
+        for tok in self._record_tokens(name, record):
+            ids = self._posting(tok)
+            if ids is None:
+                self._postings[tok] = {doc_id}
+            else:
+                ids.add(doc_id)
+
+    def extend(self, pairs):
+        """Indexa vários pares (nome, registro) de uma vez."""
+        for name, record in pairs:
+            self._index(name, record)
+        self._tokens = None
+        self._prefix_cache.clear()
+
+    def add(self, name, record):
+        """Indexa (ou reindexa) um registro."""
+        self.extend(((name, record),))
+
+    def remove(self, name, record=None):
+        """Remove um registro; com o registro indexado, limpa também as postings."""
+        doc_id = self._ids.pop(name, None)
+        if doc_id is None:
+            return
+        self._names[doc_id] = None
+        if record is not None:
+            for tok in self._record_tokens(name, record):
+                ids = self._posting(tok)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[tok]
+            self._tokens = None
+        self._prefix_cache.clear()
+
+    def _prefix_ids(self, prefix):
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+        tokens = self._tokens
+        if tokens is None:
+            tokens = self._tokens = sorted(self._postings)
+        lo = bisect.bisect_left(tokens, prefix)
+        hi = bisect.bisect_left(tokens, prefix + "\U0010ffff", lo)
+        posting = self._posting
+        if hi - lo == 1:
+            result = posting(tokens[lo])
+        else:
+            result = set().union(*(posting(tokens[i]) for i in range(lo, hi)))
+        if len(prefix) <= self.PREFIX_CACHE_LEN:
+            self._prefix_cache[prefix] = result
+        return result
+
+    def search(self, query):
+        """Retorna os nomes que casam com a consulta, na ordem original do catálogo."""
+        names = self._names
+        terms = tokenize(query)
+        if not terms:
+            return [n for n in names if n is not None]
+        matches = sorted((self._prefix_ids(t) for t in set(terms)), key=len)
+        result = matches[0]
+        for ids in matches[1:]:
+            if not result:
+                break
+            result = result & ids
+        if len(result) == len(names):
+            return [n for n in names if n is not None]
+        return [names[i] for i in sorted(result) if names[i] is not None]
+
+
+# Campos de monstros/itens usados nos filtros por critério
+FACET_FIELDS = ("tipo", "raridade", "nivelDesafio")
+_CHALLENGE_RE = re.compile(r"\s*(\d+)(?:\s*/\s*(\d+))?")
+
+
+def challenge_value(text):
+    """Nível de desafio como número ("1/4" -> 0.25, "5 (1800 XP)" -> 5.0); None se inválido."""
+    match = _CHALLENGE_RE.match(str(text)) if text is not None else None
+    if match is None:
+        return None
+    num, den = match.groups()
+    if den is not None:
+        return int(num) / int(den) if int(den) else None
+    return float(num)
+
+
+class Facets:
+    """Colunas compactas dos campos FACET_FIELDS de um catálogo, para filtros por critério.
+
+    Cada campo vira um array de códigos (um por registro, na ordem do catálogo)
+    e a lista dos valores distintos; filtrar é testar o código de cada registro
+    contra os códigos aceitos, sem abrir os registros. Pode ser usado como
+    callback `visit` de load_records.
+    """
+
+    def __init__(self, fields=FACET_FIELDS):
+        self.fields = tuple(fields)
+        self.names = []    # Nomes na ordem do catálogo
+        self._rows = {}    # nome -> posição
+        self._values = {field: [None] for field in self.fields}  # código -> valor (0 = ausente)
+        self._codes = {field: {} for field in self.fields}       # valor -> código
+        self._columns = {field: array("I") for field in self.fields}
+
+    def __call__(self, name, record):
+        self.add(name, record)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, record):
+        """Registra os valores de um registro (um nome repetido substitui o anterior)."""
+        row = self._rows.get(name)
+        if row is None:
+            row = self._rows[name] = len(self.names)
+            self.names.append(name)
+            for column in self._columns.values():
+                column.append(0)
+        for field in self.fields:
+            value = record.get(field)
+            if value is None or value == "":
+                code = 0
+            else:
+                value = str(value)
+                code = self._codes[field].get(value)
+                if code is None:
+                    code = self._codes[field][value] = len(self._values[field])
+                    self._values[field].append(value)
+            self._columns[field][row] = code
+
+    def values(self, field):
+        """Valores distintos do campo, ordenados (nivelDesafio por nível, raridade pela escala)."""
+        values = self._values[field][1:]
+        if field == "nivelDesafio":
+            return sorted(values, key=lambda v: (challenge_value(v) is None, challenge_value(v) or 0, v))
+        if field == "raridade":
+            order = {value: i for i, value in enumerate(RARIDADES)}
+            return sorted(values, key=lambda v: (order.get(v, len(order)), normalize_text(v)))
+        return sorted(values, key=normalize_text)
+
+    def match(self, criteria):
+        """Set dos nomes que atendem a todos os critérios.
+
+        `criteria` mapeia campo -> texto (o valor começa com ele, comparando os
+        tokens sem acentos: "Humanoide" inclui "Humanoide (goblinoide)" e
+        "nao morto" casa com "Não-morto")
+        ou campo -> (mínimo, máximo) numérico, para nivelDesafio (None = sem limite).
+        """
+        rows = None
+        for field, wanted in criteria.items():
+            if not isinstance(wanted, tuple):
+                wanted = " ".join(tokenize(wanted))
+            accepted = {code for code, value in enumerate(self._values[field])
+                        if value is not None and _accepts(field, value, wanted)}
+            column = self._columns[field]
+            candidates = range(len(column)) if rows is None else rows
+            rows = [row for row in candidates if column[row] in accepted]
+        if rows is None:
+            return set(self.names)
+        names = self.names
+        return {names[row] for row in rows}
+
+    def groups(self, field):
+        """{valor: [nomes]} do campo, na ordem do catálogo (registros sem o campo ficam em None)."""
+        values = self._values[field]
+        result = {}
+        for name, code in zip(self.names, self._columns[field]):
+            result.setdefault(values[code], []).append(name)
+        return result
+
+    def dump_state(self):
+        """Estado só com tipos básicos (serializável com marshal)."""
+        return {"fields": list(self.fields), "names": self.names,
+                "values": {f: self._values[f] for f in self.fields},
+                "columns": {f: self._columns[f].tobytes() for f in self.fields}}
+
+    @classmethod
+    def from_state(cls, state):
+        facets = cls(state["fields"])
+        facets.names = state["names"]
+        facets._rows = dict(zip(facets.names, range(len(facets.names))))
+        for field in facets.fields:
+            values = facets._values[field] = state["values"][field]
+            facets._codes[field] = dict(zip(values[1:], range(1, len(values))))
+            facets._columns[field].frombytes(state["columns"][field])
+        return facets
+
+
+def _accepts(field, value, wanted):
+    if isinstance(wanted, tuple):
+        number = challenge_value(value) if field == "nivelDesafio" else None
+        low, high = wanted
+        return number is not None and (low is None or number >= low) and (high is None or number <= high)
+    return " ".join(tokenize(value)).startswith(wanted)
+
+
+def filter_names(index, facets, query="", criteria=None):
+    """Nomes que casam com a busca e atendem aos critérios (ver Facets.match), na ordem do catálogo."""
+    names = index.search(query)
+    if criteria and facets is not None:
+        allowed = facets.match(criteria)
+        names = [name for name in names if name in allowed]
+    return names
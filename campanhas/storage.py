@@ -0,0 +1,420 @@
+"""Leitura em streaming, registros preguiçosos, gravação atômica e cache de catálogos."""
+import codecs
+import json
+import marshal
+import os
+import sys
+from collections.abc import MutableMapping
+
+from .model import intern_enums
+from .search import FACET_FIELDS, SEARCH_FIELDS, Facets, SearchIndex
+
+_WS = " \t\n\r"
+_SCALAR_END = _WS + ",]"
+WRITE_BUFFER = 1 << 20  # Os gravadores vão ao disco em blocos deste tamanho
+
+
+def iter_json_array(path, chunk_size=1 << 16, opener=open):
+    """Lê o array de topo de um arquivo JSON registro a registro.
+
+    Gera (offset, tamanho, registro), com offset/tamanho em bytes, sem carregar o
+    arquivo inteiro. Se o topo não for um array, gera o valor único encontrado.
+    `opener` abre o arquivo (ex.: gzip.open; aí os offsets são do conteúdo descompactado).
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with opener(path, "rb") as f:
+        buf = ""
+        pos = 0          # Posição atual em buf (caracteres)
+        mark = 0         # Posição em buf cujo offset em bytes é byte_pos
+        byte_pos = 0
+        eof = False
+        if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+            byte_pos = len(codecs.BOM_UTF8)
+        else:
+            f.seek(0)
+
+        def fill(size):
+            nonlocal buf, pos, mark, eof
+            data = f.read(size)
+            eof = not data
+            # Descarta o trecho já consumido para o buffer não crescer
+            buf = buf[mark:] + utf8.decode(data, final=eof)
+            pos -= mark
+            mark = 0
+
+        def skip(chars):
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill(chunk_size)
+
+        skip(_WS)
+        in_array = pos < len(buf) and buf[pos] == "["
+        if in_array:
+            pos += 1
+        size = chunk_size
+        while True:
+            skip(_WS + "," if in_array else _WS)
+            if pos >= len(buf) or (in_array and buf[pos] == "]"):
+                return
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # Objetos, arrays e textos terminam num delimitador; um número ou
+                # literal só está completo se vier seguido de espaço, "," ou "]"
+                # ("12." no fim do buffer decodifica como 12): senão lê mais e repete
+                complete = (buf[pos] in '{["' or eof
+                            or (end < len(buf) and buf[end] in _SCALAR_END))
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                fill(size)
+                size *= 2  # Registros enormes: evita reanálise quadrática
+                continue
+            size = chunk_size
+            byte_pos += len(buf[mark:pos].encode("utf-8"))
+            length = len(buf[pos:end].encode("utf-8"))
+            yield byte_pos, length, value
+            byte_pos += length
+            pos = mark = end
+            if not in_array:
+                return
+
+
+class LazyRecords(MutableMapping):
+    """Dicionário nome -> registro que mantém em memória só (offset, tamanho).
+
+    O registro é lido do arquivo (seek + json.loads) no primeiro acesso e passa a
+    ficar residente, de modo que edições feitas nele são preservadas. Registros
+    atribuídos diretamente (ex.: campanhas novas) ficam sempre em memória.
+    `decode` converte o dict lido (ex.: Campaign.from_dict) e `loads` converte os
+    bytes do registro no arquivo (padrão: JSON; ver formats.Format.loads).
+    """
+
+    def __init__(self, path, decode=None, loads=None):
+        self.path = path
+        self.decode = decode
+        self.loads = loads
+        self.signature = None  # [tamanho, mtime_ns] do arquivo quando foi lido
+        self.ids = {}    # id -> nome, quando carregado com id_field (catálogos)
+        self.facets = None  # Facets dos catálogos (filtros por critério)
+        self.problems = None  # RecordCheck com os problemas de validação, se foi validado na carga
+        self._data = {}  # nome -> (offset, tamanho) ou registro já carregado
+        self._positions = {}  # nome -> (offset, tamanho) dos registros do arquivo que já estão em memória
+
+    @classmethod
+    def from_summaries(cls, path, names, offsets, lengths, decode=None):
+        records = cls(path, decode)
+        records._data = dict(zip(names, zip(offsets, lengths)))
+        return records
+
+    def add_summary(self, name, offset, length):
+        self._data[name] = (offset, length)
+
+    def add_loaded(self, name, offset, length, record):
+        """Registro lido de um formato sem acesso direto (ex.: gzip): fica em memória."""
+        self._data[name] = record
+        self._positions[name] = (offset, length)
+
+    def summaries(self):
+        """Lista de (nome, offset, tamanho) dos registros ainda não carregados."""
+        return [(name, v[0], v[1]) for name, v in self._data.items() if isinstance(v, tuple)]
+
+    def locations(self):
+        """{nome: (offset, tamanho)} de todos os registros que vieram do arquivo, abertos ou não."""
+        return {name: value if isinstance(value, tuple) else self._positions[name]
+                for name, value in self._data.items() if isinstance(value, tuple) or name in self._positions}
+
+    def is_loaded(self, name):
+        return not isinstance(self._data[name], tuple)
+
+    def raw(self, name):
+        """Bytes originais do registro no arquivo (None se não vier do arquivo)."""
+        value = self._data[name]
+        if not isinstance(value, tuple):
+            return None
+        offset, length = value
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def iter_raw(self):
+        """Gera (nome, bytes JSON originais, None) ou (nome, None, registro), lendo o arquivo uma vez.
+
+        Registros de arquivos que não são JSON (com `loads`) saem convertidos, sem
+        ficar residentes.
+        """
+        f = None
+        try:
+            for name, value in self._data.items():
+                if isinstance(value, tuple):
+                    if f is None:
+                        f = open(self.path, "rb")
+                    f.seek(value[0])
+                    if self.loads is not None:
+                        yield name, None, self.loads(f.read(value[1]))
+                    else:
+                        yield name, f.read(value[1]), None
+                else:
+                    yield name, None, value
+        finally:
+            if f is not None:
+                f.close()
+
+    def rebase(self, path, offsets, loads=None):
+        """Aponta os registros não carregados para `path` com os novos (offset, tamanho)."""
+        self.path = path
+        self.loads = loads
+        self.signature = file_signature(path)
+        for name, value in self._data.items():
+            if isinstance(value, tuple):
+                self._data[name] = offsets[name]
+        self._positions = {name: offsets[name] for name in self._positions if name in offsets}
+
+    def __getitem__(self, name):
+        value = self._data[name]
+        if isinstance(value, tuple):
+            raw = self.raw(name)
+            value = json.loads(raw.decode("utf-8")) if self.loads is None else self.loads(raw)
+            if self.decode is not None:
+                value = self.decode(value)
+            self._positions[name] = self._data[name]
+            self._data[name] = value
+        return value
+
+    def __setitem__(self, name, record):
+        self._data[name] = record
+
+    def __delitem__(self, name):
+        del self._data[name]
+        self._positions.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def dump_record(record, prefix="    ", compact=False):
+    """Serializa um registro como elemento de array, com as linhas após a primeira
+    recuadas por `prefix` (o recuo do próprio elemento no arquivo)."""
+    if not isinstance(record, dict):
+        record = dict(record)  # Campaign e outros Mapping
+    if compact:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    text = json.dumps(record, ensure_ascii=False, indent=len(prefix) if prefix else None)
+    return text.replace("\n", "\n" + prefix).encode("utf-8")
+
+
+def write_records(path, entries, compact=False):
+    """Grava um array JSON em streaming e de forma atômica (temp + os.replace).
+
+    `entries` gera (nome, bytes originais ou None, registro ou None): bytes
+    originais são copiados como estão (no modo compacto, são reserializados);
+    entradas com nome None não entram no mapa retornado.
+    O formato padrão é o de json.dump(..., indent=4); compact=True grava um
+    registro por linha, sem recuo. Retorna {nome: (offset, tamanho)} de cada
+    registro no novo arquivo.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb", buffering=WRITE_BUFFER) as f:
+        offsets = write_array(f, entries, compact)
+    os.replace(tmp_path, path)
+    return offsets
+
+
+def write_array(f, entries, compact=False):
+    """Escreve o array JSON de write_records no arquivo binário `f` já aberto."""
+    first, sep = (b"\n", b",\n") if compact else (b"\n    ", b",\n    ")
+    offsets = {}
+    pos = f.write(b"[")
+    lead = first
+    for name, raw, record in entries:
+        if compact:
+            raw = dump_record(json.loads(raw) if record is None else record, compact=True)
+        elif raw is None:
+            raw = dump_record(record)
+        pos += f.write(lead)
+        if name is not None:
+            offsets[name] = (pos, len(raw))
+        pos += f.write(raw)
+        lead = sep
+    f.write(b"]" if lead is first else b"\n]")  # Vazio: "[]", como json.dump
+    return offsets
+
+
+def save_records(path, records, fmt=None):
+    """Grava os registros como array JSON (indent=4), de forma atômica.
+
+    Registros de um LazyRecords que nunca foram abertos são copiados byte a byte do
+    arquivo de origem, sem json.loads/dumps; depois da gravação eles passam a
+    apontar para o novo arquivo. `fmt` (formats.Format) grava em outro formato;
+    se ele não permite ler registros avulsos (gzip), os registros ficam em memória.
+    """
+    lazy = isinstance(records, LazyRecords)
+    if lazy and fmt is not None and not fmt.seekable:
+        for name, _, _ in records.summaries():
+            records[name]  # O arquivo antigo vai ser substituído: abre os que faltam
+    entries = records.iter_raw() if lazy else ((n, None, r) for n, r in records.items())
+    offsets = write_records(path, entries) if fmt is None else fmt.write(path, entries)
+    if lazy:
+        records.rebase(path, offsets, None if fmt is None else fmt.loads)
+
+
+def load_records(path, key, index=None, on_batch=None, batch_size=1000, id_field=None, visit=None,
+                 decode=None, check=None, fmt=None):
+    """Carrega um arquivo de registros em modo streaming.
+
+    Retorna um LazyRecords indexado pelo campo `key` (registros sem ele são
+    ignorados). Se `index` (SearchIndex) for informado, os registros são indexados
+    à medida que chegam; `on_batch(nomes, bytes_lidos)` recebe os nomes novos em
+    lotes, para que a interface preencha a lista e mostre o progresso. Com
+    `id_field`, preenche records.ids (id -> nome); `visit(nome, registro)` é
+    chamado para cada registro lido, antes de ele ser descartado. `decode`
+    converte cada registro quando ele é aberto (ver LazyRecords). `check(posição,
+    registro)` (ex.: schema.RecordCheck) vê todos os elementos do array, inclusive os
+    ignorados, e fica em records.problems. `fmt` (formats.Format, ex.:
+    formats.format_for(path)) lê outros formatos; o padrão é o array JSON.
+    Formatos sem acesso direto a um registro (gzip) mantêm os registros em memória.
+    """
+    records = LazyRecords(path, decode, None if fmt is None else fmt.loads)
+    reader = iter_json_array if fmt is None else fmt.iter_records
+    in_memory = fmt is not None and not fmt.seekable
+    records.problems = check
+    records.signature = file_signature(path)
+    ids = records.ids
+    batch = []
+    pairs = []
+    done = 0
+    for position, (offset, length, rec) in enumerate(reader(path)):
+        done = offset + length
+        if check is not None:
+            check(position, rec)
+        if not isinstance(rec, dict) or key not in rec:
+            continue
+        name = rec[key]
+        if name not in records:
+            batch.append(name)
+        if in_memory:
+            records.add_loaded(name, offset, length, rec if decode is None else decode(rec))
+        else:
+            records.add_summary(name, offset, length)
+        if id_field is not None and rec.get(id_field) is not None:
+            ids[rec[id_field]] = name
+        if visit is not None:
+            visit(name, rec)
+        if index is not None:
+            pairs.append((name, rec))
+        if len(batch) >= batch_size or len(pairs) >= batch_size:
+            if pairs:
+                index.extend(pairs)
+                pairs = []
+            if on_batch and batch:
+                on_batch(batch, done)
+            batch = []
+    if pairs:
+        index.extend(pairs)
+    if on_batch and batch:
+        on_batch(batch, done)
+    return records
+
+
+CACHE_VERSION = 4
+CACHE_SUFFIX = ".cache"
+
+
+def file_signature(path):
+    """[tamanho, mtime_ns] do arquivo; muda sempre que o conteúdo é regravado."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def read_catalog_cache(path, key, fields=SEARCH_FIELDS, check=None):
+    """Lê o cache de `path` (arquivo `path + CACHE_SUFFIX`), se ainda for válido.
+
+    O cache é descartado se o tamanho/mtime do JSON mudou, se foi gerado para outro
+    campo-chave/campos de busca ou por outra versão do formato. Com `check`
+    (RecordCheck), os problemas gravados no cache são restaurados nele; um cache
+    gravado sem validação é descartado. Retorna (LazyRecords, SearchIndex) ou None.
+    """
+    try:
+        with open(path + CACHE_SUFFIX, "rb") as f:
+            data = marshal.loads(f.read())  # marshal.load(f) lê o arquivo aos pedaços
+        if (data["version"] != CACHE_VERSION or data["python"] != list(sys.version_info[:2])
+                or data["signature"] != file_signature(path) or data["key"] != key
+                or data["index"]["fields"] != list(fields)):
+            return None
+        records = LazyRecords.from_summaries(path, data["names"], data["offsets"], data["lengths"],
+                                             decode=intern_enums)
+        records.ids = data["ids"]
+        records.facets = Facets.from_state(data["facets"])
+        if check is not None:
+            if data["problems"] is None:
+                return None
+            check.restore(data["problems"])
+            records.problems = check
+        return records, SearchIndex.from_state(data["index"])
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        return None
+
+
+def write_catalog_cache(path, key, records, index, signature):
+    """Grava o cache de forma atômica (arquivo temporário + os.replace)."""
+    summaries = records.summaries()
+    data = {
+        "version": CACHE_VERSION,
+        "python": list(sys.version_info[:2]),
+        "signature": signature,
+        "key": key,
+        "names": [name for name, _, _ in summaries],
+        "offsets": [offset for _, offset, _ in summaries],
+        "lengths": [length for _, _, length in summaries],
+        "ids": records.ids,
+        "facets": records.facets.dump_state(),
+        "problems": records.problems.dump_state() if records.problems is not None else None,
+        "index": index.dump_state(),
+    }
+    tmp_path = path + CACHE_SUFFIX + ".tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(data, f)
+    os.replace(tmp_path, path + CACHE_SUFFIX)
+
+
+def load_catalog(path, key, fields=SEARCH_FIELDS, on_batch=None, rebuild=False, check=None):
+    """Carrega um catálogo (monstros/itens) com índice de busca, usando o cache.
+
+    Com cache válido o JSON não é analisado; caso contrário o arquivo é lido em
+    streaming (load_records) e o cache é regravado. `rebuild=True` ignora o cache.
+    Retorna (LazyRecords, SearchIndex); records.ids mapeia o campo "id" -> nome,
+    records.facets tem as colunas de FACET_FIELDS (ver Facets) e os valores de
+    ENUM_FIELDS (tipo, raridade...) saem internados. `check` (RecordCheck) valida
+    o arquivo na mesma passada; com cache, os problemas vêm dele.
+    """
+    if not rebuild:
+        cached = read_catalog_cache(path, key, fields, check)
+        if cached is not None:
+            records, index = cached
+            if on_batch:
+                on_batch(list(records), os.path.getsize(path))
+            return records, index
+    signature = file_signature(path)
+    index = SearchIndex(fields=fields)
+    facets = Facets(FACET_FIELDS)
+    records = load_records(path, key, index=index, on_batch=on_batch, id_field="id", visit=facets,
+                           decode=intern_enums, check=check)
+    records.facets = facets
+    if file_signature(path) == signature:
+        try:
+            write_catalog_cache(path, key, records, index, signature)
+        except OSError:
+            pass  # Sem permissão de escrita: segue sem cache
+    return records, index
@@ -0,0 +1,202 @@
+"""Observação de arquivos: avisa quando um arquivo observado é regravado.
+
+No Linux usa inotify (via ctypes, sobre os diretórios dos arquivos, para pegar
+também editores que gravam num temporário e renomeiam); nos demais sistemas,
+ou se inotify não estiver disponível, compara tamanho/mtime a cada `interval`
+segundos. Nos dois casos a mudança só é avisada depois de `debounce` segundos
+sem novos eventos e se a assinatura do arquivo (file_signature) realmente
+mudou, então gravações em várias etapas geram um único aviso.
+"""
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+
+from .storage import file_signature
+
+# Eventos inotify que podem significar conteúdo novo (ver inotify(7))
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+
+def _signature(path):
+    try:
+        return file_signature(path)
+    except OSError:
+        return None
+
+
+class _Inotify:
+    """Descritor inotify mínimo: add(diretório) e read() -> nomes de arquivo com eventos."""
+
+    def __init__(self):
+        import ctypes.util  # Puxa subprocess/shutil: só quando o observador é criado (depois da abertura)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._dirs = {}  # wd -> diretório
+
+    def add(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch({directory})")
+        self._dirs[wd] = directory
+
+    def read(self):
+        """Caminhos citados nos eventos pendentes (vazio se não houver)."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, _, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+            if wd in self._dirs and name:
+                paths.add(os.path.join(self._dirs[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Chama `callback(caminho)` (na thread do observador) quando um arquivo observado muda.
+
+    watch()/unwatch() podem ser chamados a qualquer momento; a assinatura de
+    referência é a do momento do watch() (ou do último aviso).
+    """
+
+    def __init__(self, callback, interval=1.0, debounce=0.3, use_inotify=True):
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self._signatures = {}  # caminho absoluto -> assinatura conhecida
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._wake = None  # (leitura, escrita) do pipe que acorda o select em stop()
+        self._close_lock = threading.Lock()
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None  # Sem inotify: polling
+            else:
+                self._wake = os.pipe()
+        self._watched_dirs = set()
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "polling"
+
+    def watch(self, path, signature=None):
+        """Passa a observar `path`; `signature` é a versão já carregada (padrão: a atual)."""
+        path = os.path.abspath(path)
+        directory = os.path.dirname(path)
+        with self._lock:
+            self._signatures[path] = signature if signature is not None else _signature(path)
+            if self._inotify is not None and directory not in self._watched_dirs:
+                try:
+                    self._inotify.add(directory)
+                    self._watched_dirs.add(directory)
+                except OSError:
+                    pass  # O polling periódico continua cobrindo o arquivo
+
+    def unwatch(self, path):
+        with self._lock:
+            self._signatures.pop(os.path.abspath(path), None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Encerra a thread (acordando-a na hora) e libera o inotify."""
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"\0")
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=2)
+            if thread.is_alive():
+                return  # Ainda num callback: a própria thread fecha os descritores ao sair
+        self._close()
+
+    def _close(self):
+        with self._close_lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            if self._wake is not None:
+                for fd in self._wake:
+                    os.close(fd)
+                self._wake = None
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            if self._stop.is_set():
+                self._close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                # Com inotify, o polling vira só uma rede de segurança (diretórios sem watch)
+                fds = [self._inotify.fd, self._wake[0]]
+                ready, _, _ = select.select(fds, [], [], self.interval * 5)
+                if self._stop.is_set():
+                    return
+                if self._inotify.fd in ready:
+                    with self._lock:
+                        watched = set(self._signatures)
+                    if not self._inotify.read() & watched:
+                        continue
+                    # Espera a gravação terminar (sem novos eventos por `debounce` segundos)
+                    while self._inotify.fd in select.select(fds, [], [], self.debounce)[0]:
+                        if self._stop.is_set():
+                            return
+                        self._inotify.read()
+                    if self._stop.is_set():
+                        return
+            elif self._stop.wait(self.interval):
+                return
+            self.check()
+
+    def check(self):
+        """Compara as assinaturas agora e avisa os arquivos que mudaram."""
+        with self._lock:
+            items = list(self._signatures.items())
+        changed = []
+        for path, known in items:
+            current = _signature(path)
+            if current is not None and current != known:
+                if self._inotify is None and self.debounce:
+                    # Polling: só avisa quando a assinatura estabiliza
+                    self._stop.wait(self.debounce)
+                    if _signature(path) != current:
+                        continue
+                changed.append((path, current))
+        for path, current in changed:
+            with self._lock:
+                if path not in self._signatures:
+                    continue
+                self._signatures[path] = current
+            self.callback(path)
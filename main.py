@@ -1,11 +1,328 @@
+import time
+_START = time.perf_counter()  # Origem do relatório de inicialização (--tempo-inicio)
+import argparse
 import json
 import os
+import queue
+import sqlite3
+import sys
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, font as tkfont
+
+from campanhas import diagnostics
+from campanhas import (
+    DEFAULT_FORMAT, DIFFICULTY_LEVELS, FIELDS, FORMATS, LIST_FIELDS, NUMERIC_FIELDS, Campaign, CatalogDatabase,
+    ChangeLog, DatabaseHistory, EncounterBuilder, FileWatcher, HistoryStore, RecordCheck, RefCollector,
+    ReferenceIndex, SearchIndex, build_campaign, challenge_value, describe_diff, empty_value, export_campaign_file,
+    file_patterns, file_signature, filter_names, format_for, format_problem, is_empty_value, load_catalog,
+    load_catalog_db, load_records, normalize_text, pending_additions, skipped_additions, split_extension,
+    validate_records, validator_for,
+)
+
+UI_POLL_MS = 30  # Intervalo de leitura da fila de resultados dos workers
+DIAG_RECENT_EVENTS = 100  # Eventos recentes mostrados na aba Diagnóstico
+LOAD_OPS = {"file": "load_file_campaigns", "history": "load_history",
+            "monster": "load_monsters", "item": "load_items"}
+SUMMARY_MAX_LINES = 40  # Linhas do resumo mostrado antes de gerar o arquivo
+PROBLEMS_MAX_LINES = 10  # Problemas de validação listados nas mensagens (formulário e resumo)
+IMPORT_CONFIRM = 200    # Importações filtradas maiores que isso pedem confirmação
+# Critérios de filtro das abas de catálogo: (campo, rótulo); nivelDesafio tem "de" e "até"
+CATALOG_CRITERIA = {"monster": (("tipo", "Tipo:"), ("nivelDesafio", "ND de:")),
+                    "item": (("tipo", "Tipo:"), ("raridade", "Raridade:"))}
+# Aba do catálogo -> (campo da campanha, catálogo, singular, plural)
+CATALOG_IMPORTS = {"monster": ("monstros", "monstros", "monstro", "Monstro(s)"),
+                   "item": ("recompensas", "itens", "item", "Item(ns)")}
+
+
+class VirtualListbox(ttk.Frame):
+    """Lista virtualizada: apenas as linhas visíveis existem no tk.Listbox.
+
+    O modelo completo fica em self._items (lista de nomes); o Listbox interno
+    recebe só a janela [self._top, self._top + self._rows). Alterações são
+    aplicadas por diferença (insert/rename/remove), sem reconstruir a lista.
+    self._index (nome -> posição) vale para self._items[:self._indexed]; o resto
+    é indexado na primeira busca que precisar dele (ver _find).
+    """
+
+    def __init__(self, master, selectmode=tk.BROWSE, **kwargs):
+        super().__init__(master)
+        self._items = []        # Nomes na ordem de exibição
+        self._index = {}        # Nome -> posição em self._items (ver _find)
+        self._indexed = 0       # Posições [0, _indexed) estão corretas em self._index
+        self._selected = set()  # Nomes selecionados (sobrevivem à rolagem)
+        self._top = 0
+        self._rows = 1
+        self.listbox = tk.Listbox(self, selectmode=selectmode, exportselection=False,
+                                  activestyle="none", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", lambda e: self._scroll_units(-1 * (e.delta // 120) * 3))
+        self.listbox.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll_units(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._move_selection(-self._rows))
+        self.listbox.bind("<Next>", lambda e: self._move_selection(self._rows))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def _find(self, name):
+        """Posição do nome em self._items, ou None."""
+        idx = self._index.get(name)
+        if idx is not None and idx < self._indexed:
+            return idx
+        if self._indexed < len(self._items):
+            # Entradas a partir de _indexed ficaram defasadas (inserção/remoção no meio, extend)
+            index = self._index
+            for i in range(self._indexed, len(self._items)):
+                index[self._items[i]] = i
+            self._indexed = len(self._items)
+            return index.get(name)
+        return None
+
+    # --- Atualizações do modelo ---
+    def set_items(self, names, keep=False):
+        """Substitui todo o conteúdo; com `keep`, mantém a seleção e a rolagem (recargas)."""
+        self._items = list(names)
+        self._index = {}
+        self._indexed = 0
+        if keep:
+            if self._selected:
+                present = set(self._items)
+                self._selected = {n for n in self._selected if n in present}
+            self._top = min(self._top, max(len(self._items) - 1, 0))
+        else:
+            self._selected.clear()
+            self._top = 0
+        self._render()
+
+    def insert(self, name, index=None):
+        """Acrescenta um nome ao final da lista (ou na posição `index`)."""
+        if index is None or index >= len(self._items):
+            index = len(self._items)
+            self._items.append(name)
+        else:
+            self._items.insert(index, name)
+        if self._indexed == index:
+            self._index[name] = index
+            self._indexed += 1
+        else:
+            self._indexed = min(self._indexed, index)
+        self._render()
+
+    def extend(self, names):
+        """Acrescenta vários nomes ao final da lista (carga progressiva)."""
+        self._items.extend(names)
+        self._render()
+
+    def rename(self, old, new):
+        """Troca um nome mantendo a posição."""
+        idx = self._find(old)
+        if idx is None:
+            return
+        self._items[idx] = new
+        del self._index[old]
+        self._index[new] = idx
+        if old in self._selected:
+            self._selected.discard(old)
+            self._selected.add(new)
+        self._render()
+
+    def remove(self, name):
+        """Remove um nome (se presente); retorna a posição que ele ocupava ou None."""
+        idx = self._find(name)
+        if idx is None:
+            return None
+        del self._items[idx]
+        del self._index[name]
+        self._indexed = min(self._indexed, idx)
+        self._selected.discard(name)
+        self._render()
+        return idx
+
+    # --- Seleção ---
+    def selected(self):
+        """Retorna o primeiro nome selecionado (na ordem da lista) ou None."""
+        names = self.selected_all()
+        return names[0] if names else None
+
+    def selected_all(self):
+        """Retorna todos os nomes selecionados, na ordem da lista."""
+        if not self._selected:
+            return []
+        if len(self._selected) == 1:
+            return list(self._selected)
+        return [n for n in self._items if n in self._selected]
+
+    def see(self, name):
+        """Rola a lista até que o nome fique visível."""
+        idx = self._find(name)
+        if idx is None:
+            return
+        if idx < self._top or idx >= self._top + self._rows:
+            self._top = idx
+            self._render()
+
+    # --- Rolagem e renderização ---
+    def yview(self, *args):
+        """Comando da barra de rolagem ("moveto" ou "scroll")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._set_top(int(float(args[1]) * len(self._items)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._rows
+            self._scroll_units(step)
+
+    def _scroll_units(self, step):
+        self._set_top(self._top + step)
+        return "break"
+
+    def _set_top(self, top):
+        top = max(0, min(top, len(self._items) - self._rows))
+        if top != self._top:
+            self._top = top
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def _move_selection(self, step):
+        if not self._items:
+            return "break"
+        current = self.selected()
+        idx = self._find(current) + step if current is not None else 0
+        idx = max(0, min(idx, len(self._items) - 1))
+        self._selected = {self._items[idx]}
+        if idx < self._top:
+            self._top = idx
+        elif idx >= self._top + self._rows:
+            self._top = idx - self._rows + 1
+        self._render()
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def _on_resize(self, event=None):
+        lb = self.listbox
+        line_height = (tkfont.Font(font=lb.cget("font")).metrics("linespace")
+                       + 1 + 2 * int(lb.cget("selectborderwidth")))
+        inner = lb.winfo_height() - 2 * (int(lb.cget("borderwidth")) + int(lb.cget("highlightthickness")))
+        rows = max(1, inner // line_height)
+        if rows != self._rows:
+            self._rows = rows
+            self._top = max(0, min(self._top, len(self._items) - self._rows))
+            self._render()
+
+    def _on_select(self, event=None):
+        visible = self._items[self._top:self._top + self._rows]
+        chosen = {visible[i] for i in self.listbox.curselection() if i < len(visible)}
+        if self.listbox.cget("selectmode") in (tk.BROWSE, tk.SINGLE):
+            if chosen:
+                self._selected = chosen
+        else:
+            self._selected.difference_update(visible)
+            self._selected.update(chosen)
+
+    def _render(self):
+        self._top = max(0, min(self._top, len(self._items) - self._rows))
+        visible = self._items[self._top:self._top + self._rows]
+        lb = self.listbox
+        lb.delete(0, tk.END)
+        if visible:
+            lb.insert(tk.END, *visible)
+        if self._selected:
+            for i, name in enumerate(visible):
+                if name in self._selected:
+                    lb.selection_set(i)
+        lb.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self._items)
+        if total <= self._rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + self._rows) / total)
+
+
+class LazyText(tk.Text):
+    """tk.Text que insere textos longos em partes, sem travar a janela.
+
+    set_text mostra o primeiro trecho na hora e agenda o restante com after_idle;
+    get conclui a inserção antes de ler e delete descarta o que falta, então quem
+    usa o widget sempre vê o texto inteiro.
+    """
+
+    CHUNK = 16384  # Caracteres inseridos por vez
+
+    def __init__(self, master=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self._pending = ""
+        self._job = None
+
+    def set_text(self, text, state=tk.NORMAL):
+        self.config(state=tk.NORMAL)
+        self.delete("1.0", tk.END)
+        super().insert(tk.END, text[:self.CHUNK])
+        self.config(state=state)
+        self._pending = text[self.CHUNK:]
+        if self._pending:
+            self._job = self.after_idle(self._render_next)
+
+    def get(self, index1, index2=None):
+        self.flush()
+        return super().get(index1, index2)
+
+    def delete(self, index1, index2=None):
+        self._cancel()
+        super().delete(index1, index2)
+
+    def flush(self):
+        """Insere de uma vez o restante pendente."""
+        if self._pending:
+            rest = self._pending
+            self._cancel()
+            self._append(rest)
+
+    def _cancel(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+        self._pending = ""
+
+    def _append(self, text):
+        state = self.cget("state")
+        self.config(state=tk.NORMAL)
+        super().insert(tk.END, text)
+        self.config(state=state)
+
+    def _render_next(self):
+        self._job = None
+        chunk, self._pending = self._pending[:self.CHUNK], self._pending[self.CHUNK:]
+        self._append(chunk)
+        if self._pending:
+            self._job = self.after_idle(self._render_next)
+
 
 class CampaignApp:
-    def __init__(self, root):
+    def __init__(self, root, rebuild_cache=False, database=None, watch_files=True, startup=None):
         self.root = root
+        # Marcos da abertura (ver StartupReport); o relatório sai quando as cargas iniciais terminam
+        self.startup = startup if startup is not None else diagnostics.StartupReport()
+        self.rebuild_cache = rebuild_cache  # Ignora os caches de monstros/itens (--rebuild-cache)
+        # Banco SQLite (--banco): catálogos e histórico vêm dele em vez dos JSON
+        self.database = CatalogDatabase(database) if database else None
         self.root.title("Gerenciador de Campanhas")
         self.root.geometry("1400x900")  # Janela maior
 
@@ -13,79 +330,381 @@ class CampaignApp:
         self.file_campaigns = {}       # Campanhas carregadas do arquivo (ex.: campanhas.json)
         self.added_campaigns = {}      # Campanhas criadas nesta sessão
         self.historic_campaigns = {}   # Campanhas carregadas do histórico (campanhas_historico.json)
+        self._journal_titles = {}      # Título -> "titulo" com que foi gravada no diário, se diferente
         self.monsters = {}             # Dados do arquivo monstros.json
         self.items = {}                # Dados do arquivo itens.json
+        self.monster_index = SearchIndex()  # Índices de busca (ver SearchIndex)
+        self.item_index = SearchIndex()
+        self.references = ReferenceIndex()  # id -> registro e registro -> campanhas que o citam
+        self.encounters = None  # EncounterBuilder, montado no primeiro uso (refeito se os catálogos mudam)
 
-        self.modified_file_campaigns = set()  # Títulos de campanhas do arquivo que foram editadas
+        # Inclusões/edições/exclusões passam pelo log de alterações (desfazer/refazer
+        # e resumo do que mudou no arquivo, ver ChangeLog)
+        self.changes = ChangeLog(self._campaigns, on_change=self._on_campaign_change)
+        self._removed_at = {}  # (fonte, titulo) -> posição na lista quando foi excluída
 
         self.campaign_file_path = None
+        self.file_locations = {}  # titulo -> (offset, tamanho) no arquivo, montado na carga
+        self.problems = {}  # fonte ("file", "monster", "item") -> RecordCheck da última carga do JSON
+        if self.database is not None:
+            self.history = DatabaseHistory(self.database)
+        else:
+            self.history = HistoryStore("campanhas_historico.json")
+        self.history_loaded = False  # Só compacta o histórico se ele foi lido sem erros
 
-        # Campos da campanha
-        self.fields = [
-            "id", "titulo", "imagem", "dificuldade", "grupoMinimo", "localidade",
-            "corpo", "monstros", "chefões", "recompensas", "npcs"
-        ]
-        self.numeric_fields = ["grupoMinimo"]
+        # Campos da campanha (ver campanhas.model)
+        self.fields = list(FIELDS)
+        self.numeric_fields = list(NUMERIC_FIELDS)
         # Para campos que podem ter múltiplas linhas (listas ou textos mais longos)
-        self.list_fields = ["corpo", "monstros", "chefões", "recompensas", "npcs"]
+        self.list_fields = list(LIST_FIELDS)
 
         self.entries = {}     # Widgets de entrada do formulário
+        self.criteria_vars = {}   # aba do catálogo -> (campo, "min"/"max"/None) -> StringVar
+        self.criteria_boxes = {}  # aba do catálogo -> campo -> combos (valores vêm do catálogo)
         self.check_vars = {}  # Variáveis dos checkbuttons
 
-        # Carrega histórico e outros arquivos (se existirem)
-        self.load_history()
-        self.load_monsters()
-        self.load_items()
+        # Janelas de edição e de detalhes: criadas no primeiro uso e reaproveitadas
+        self.editor = None
+        self.editor_canvas = None
+        self.edit_entries = {}
+        self.edit_check_vars = {}
+        self.edit_target = None  # (fonte, titulo, campanha) em edição
+        self.detail_window = None
+        self.detail_text = None
+
+        # Carregamento em segundo plano: os workers nunca tocam em widgets; eles
+        # enfileiram chamadas em ui_queue, executadas na thread do Tk
+        self.executor = None  # ThreadPoolExecutor, criado na primeira carga (depois da primeira pintura)
+        self.ui_queue = queue.Queue()
+        self._loading = {}   # fonte ("file", "history", "monster", "item") -> token da carga
+        self._futures = {}   # fonte -> Future da carga em andamento
+        self._progress = {}  # fonte -> (bytes lidos, bytes totais)
+
+        # Arquivos alterados em disco são recarregados sozinhos (--sem-monitorar desliga);
+        # o watcher avisa da sua thread e a recarga é agendada na thread do Tk
+        self.watch_files = watch_files
+        self.watcher = None
+        self._watched = {}  # caminho absoluto -> função que recarrega a fonte
+        self.on_startup_done = None  # Chamado (sem argumentos) quando as cargas iniciais terminam
+
+        # Abas de Histórico, Monstros, Itens e Diagnóstico: o conteúdo é criado na
+        # primeira vez que a aba é selecionada (ver _on_tab_changed)
+        self._tab_builders = {}  # nome do widget da aba -> função que monta o conteúdo
+        self.history_campaign_list = None
+        self.monster_list = self.item_list = None
+        self.monster_search = self.item_search = None
+        self.diagnostics_text = None
 
         self.setup_ui()
+        self.startup.mark("interface")
+        self.root.after(UI_POLL_MS, self._drain_ui_queue)
 
         # Ao fechar, salvar o histórico
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-    def load_history(self):
-        """Carrega o arquivo campanhas_historico.json (se existir); caso contrário, inicia com vazio."""
-        if os.path.exists("campanhas_historico.json"):
+        # after_idle + after(0): roda depois que o Tk processou o desenho da janela
+        self.root.after_idle(self.root.after, 0, self._after_first_paint)
+
+    def _after_first_paint(self):
+        """O que não é preciso para desenhar a janela: cargas iniciais e observação dos arquivos."""
+        self.startup.mark("primeira_pintura")
+        if self.watch_files:
+            self.watcher = FileWatcher(lambda path: self._post(self._on_file_changed, path))
+            self.watcher.start()
+        # Carrega histórico e outros arquivos (se existirem); as listas são
+        # preenchidas progressivamente, com a janela já desenhada
+        self.load_history()
+        self.load_monsters()
+        self.load_items()
+        self._check_startup_done()
+
+    def _check_startup_done(self):
+        if "cargas" in self.startup.marks or "primeira_pintura" not in self.startup.marks:
+            return
+        if not any(source in self._loading for source in ("history", "monster", "item")):
+            self.startup.mark("cargas")
+            if self.on_startup_done is not None:
+                self.on_startup_done()
+
+    # --- Carregamento em segundo plano ---
+    def _post(self, func, *args):
+        """Agenda func(*args) na thread do Tk; pode ser chamado de qualquer thread."""
+        self.ui_queue.put((func, args))
+
+    def _drain_ui_queue(self, reschedule=True):
+        """Executa as chamadas enfileiradas pelos workers (no máximo ~UI_POLL_MS por vez)."""
+        deadline = time.perf_counter() + UI_POLL_MS / 1000
+        try:
+            while reschedule is False or time.perf_counter() < deadline:
+                func, args = self.ui_queue.get_nowait()
+                func(*args)
+        except queue.Empty:
+            pass
+        if reschedule:
+            self.root.after(UI_POLL_MS, self._drain_ui_queue)
+
+    def _start_load(self, source, path, pane, load, apply, error_msg, reload=False):
+        """Executa `load(on_batch)` num worker, preenchendo `pane` aos poucos.
+
+        `load` retorna (registros, índice) e `path` serve só para medir o progresso.
+        Ao terminar, `apply(registros, índice)` é chamado na thread do Tk. Uma nova
+        carga da mesma fonte invalida a anterior (seus resultados são descartados).
+        Com `reload` (arquivo alterado em disco), a lista atual fica na tela até o
+        apply e um erro só aparece na barra de status.
+        """
+        token = object()
+        self._loading[source] = token
+        total = os.path.getsize(path) if os.path.exists(path) else 0
+        self._progress[source] = (0, max(total, 1))
+        if reload:
+            pane = None
+        elif pane is not None:  # None: aba ainda não montada (preenchida ao ser aberta)
+            pane.set_items([])
+        self._update_status()
+
+        def on_batch(names, done):
+            self._post(self._on_load_batch, source, token, pane, names, done)
+
+        def work():
+            start = time.perf_counter()
             try:
-                with open("campanhas_historico.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    for camp in data:
-                        if "titulo" in camp:
-                            self.historic_campaigns[camp["titulo"]] = camp
+                records, index = load(on_batch)
             except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao carregar o histórico de campanhas: {e}")
+                diagnostics.recorder.record(LOAD_OPS[source], start, time.perf_counter() - start,
+                                            bytes_lidos=total, erro=str(e))
+                self._post(self._on_load_done, source, token, None, f"{error_msg}: {e}", reload)
+            else:
+                diagnostics.recorder.record(LOAD_OPS[source], start, time.perf_counter() - start,
+                                            registros=len(records), bytes_lidos=total)
+                self._post(self._on_load_done, source, token, lambda: apply(records, index), None, reload)
+
+        if self.executor is None:
+            # Importado aqui: concurrent.futures (e logging) não pesam antes da primeira pintura
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="loader")
+        self._futures[source] = self.executor.submit(work)
+
+    def _on_load_batch(self, source, token, pane, names, done):
+        if self._loading.get(source) is not token:
+            return
+        if pane is not None:
+            pane.extend(names)
+        self._progress[source] = (done, self._progress[source][1])
+        self._update_status()
+
+    def _on_load_done(self, source, token, apply, error, reload=False):
+        if self._loading.get(source) is not token:
+            return
+        del self._loading[source]
+        del self._progress[source]
+        self._futures.pop(source, None)
+        if error and not reload:
+            messagebox.showerror("Erro", error)
+        elif not error:
+            apply()
+        self._update_status()
+        if error and reload:
+            self.status_var.set(error)  # Ex.: arquivo ainda sendo gravado; a próxima mudança recarrega de novo
+        if "cargas" not in self.startup.marks:
+            self.startup.mark(f"carga_{source}")
+            self._check_startup_done()
+
+    def _watch(self, path, signature, reload):
+        """Passa a recarregar `path` (chamando `reload()`) quando ele mudar em disco.
+
+        `signature` é a versão já carregada (file_signature do início da carga).
+        """
+        if self.watcher is not None and signature is not None:
+            path = os.path.abspath(path)
+            self._watched[path] = reload
+            self.watcher.watch(path, signature)
+
+    def _unwatch(self, path):
+        if self.watcher is not None:
+            path = os.path.abspath(path)
+            self._watched.pop(path, None)
+            self.watcher.unwatch(path)
+
+    def _on_file_changed(self, path):
+        """Recarrega só a fonte cujo arquivo mudou (chamado pelo FileWatcher, via ui_queue)."""
+        reload = self._watched.get(path)
+        if reload is not None:
+            reload()
+
+    def _wait_for_load(self, source):
+        """Bloqueia até a carga da fonte terminar e aplica o resultado."""
+        future = self._futures.get(source)
+        if future is not None:
+            future.result()
+            self._drain_ui_queue(reschedule=False)
+
+    def _is_loading(self, source):
+        """Indica (e avisa na barra de status) se a fonte ainda está carregando."""
+        if source in self._loading:
+            self.status_var.set("Aguarde: os dados desta aba ainda estão sendo carregados.")
+            return True
+        return False
+
+    def _update_status(self):
+        if not self._progress:
+            self.progress["value"] = 0
+            self.status_var.set("Pronto")
+            return
+        done = sum(d for d, _ in self._progress.values())
+        total = sum(t for _, t in self._progress.values())
+        self.progress["value"] = 100 * done / total
+        labels = {"file": "campanhas", "history": "histórico", "monster": "monstros", "item": "itens"}
+        self.status_var.set("Carregando " + ", ".join(labels[s] for s in self._progress) + "...")
+
+    def load_history(self):
+        """Carrega o histórico (snapshot + diário, ver HistoryStore); se não existir, inicia vazio."""
+        if self.history.exists():
+            def load(on_batch):
+                refs = RefCollector()  # Referências extraídas no worker, durante a leitura
+                return self.history.load(on_batch, visit=refs), refs.refs
+
+            def apply(records, refs):
+                self.historic_campaigns = records
+                self.history_loaded = True
+                self.changes.reset_source("history")
+                self.references.set_source("history", refs)
+                if self.history_campaign_list is not None:
+                    self.history_campaign_list.set_items(records)
+            self._start_load("history", self.history.path, self.history_campaign_list, load, apply,
+                             "Erro ao carregar o histórico de campanhas")
         else:
             self.historic_campaigns = {}
+            self.history_loaded = True
 
-    def load_monsters(self):
-        """Carrega os dados do arquivo monstros.json (se existir)."""
-        if os.path.exists("monstros.json"):
-            try:
-                with open("monstros.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    for m in data:
-                        if "nome" in m:
-                            self.monsters[m["nome"]] = m
-            except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao carregar monstros: {e}")
-        else:
-            self.monsters = {}
+    def load_monsters(self, reload=False):
+        """Carrega os dados do arquivo monstros.json (ou do banco, se houver)."""
+        def apply(records, index):
+            self.monsters, self.monster_index = records, index
+            self.references.set_catalog("monstros", records)
+            self.encounters = None
+            self._set_criteria_choices("monster", records)
+            self.filter_catalog("monster", keep=reload)
+        self._load_catalog("monster", "monstros", "monstros.json", self.monster_list, apply,
+                           "Erro ao carregar monstros", reload)
 
-    def load_items(self):
-        """Carrega os dados do arquivo itens.json (se existir)."""
-        if os.path.exists("itens.json"):
-            try:
-                with open("itens.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    for it in data:
-                        if "nome" in it:
-                            self.items[it["nome"]] = it
-            except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao carregar itens: {e}")
-        else:
-            self.items = {}
+    def load_items(self, reload=False):
+        """Carrega os dados do arquivo itens.json (ou do banco, se houver)."""
+        def apply(records, index):
+            self.items, self.item_index = records, index
+            self.references.set_catalog("itens", records)
+            self.encounters = None
+            self._set_criteria_choices("item", records)
+            self.filter_catalog("item", keep=reload)
+        self._load_catalog("item", "itens", "itens.json", self.item_list, apply, "Erro ao carregar itens", reload)
+
+    def _load_catalog(self, source, table, path, pane, apply, error_msg, reload=False):
+        if self.database is not None:
+            rebuild = self.rebuild_cache or reload
+            self._start_load(source, self.database.path, pane,
+                             lambda on_batch: load_catalog_db(self.database, table, on_batch=on_batch,
+                                                              rebuild=rebuild),
+                             apply, error_msg, reload)
+        elif os.path.exists(path):
+            signature = file_signature(path)
+            reload_func = self.load_monsters if source == "monster" else self.load_items
+
+            def watched_apply(records, index):
+                apply(records, index)
+                self._watch(path, signature, lambda: reload_func(reload=True))
+                self._report_problems(source, path, records.problems)
+            self._start_load(source, path, pane,
+                             lambda on_batch: load_catalog(path, "nome", on_batch=on_batch, rebuild=self.rebuild_cache,
+                                                           check=RecordCheck(validator_for(table))),
+                             watched_apply, error_msg, reload)
+
+    def _journal_history(self, title):
+        """Grava no diário do histórico a versão que a campanha terá ao fechar o app.
+
+        As adicionadas nesta sessão prevalecem sobre as do histórico (como no
+        fechamento); se o título não existe em nenhum dos dois, é uma exclusão.
+        A edição não muda a chave (`title`), mas o histórico grava pelo campo
+        "titulo": se ele mudou desde a última gravação, a entrada antiga sai.
+        """
+        previous = self._journal_titles.pop(title, title)
+        other = None
+        if previous != title:
+            other = self._live_campaign(previous)
+        try:
+            camp = self._live_campaign(title)
+            if camp is None:
+                if other is None:
+                    self.history.delete(previous)
+            else:
+                written = camp.get("titulo", title)
+                if written != title:
+                    self._journal_titles[title] = written
+                self.history.put(camp, previous if other is None and previous != written else None)
+            if other is not None:
+                self.history.put(other)  # A entrada antiga é de outra campanha: regrava-a
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Erro", f"Erro ao salvar o histórico: {e}")
+
+    def _live_campaign(self, title):
+        """Campanha que o histórico terá sob `title` ao fechar o app (ou None)."""
+        if title in self.added_campaigns:
+            return self.added_campaigns[title]
+        if title in self.historic_campaigns:
+            return self.historic_campaigns[title]
+        return None
+
+    def _campaigns(self, source):
+        """Dicionário titulo -> campanha de uma aba ("file", "added" ou "history")."""
+        return {"file": self.file_campaigns, "added": self.added_campaigns,
+                "history": self.historic_campaigns}[source]
+
+    def _pane(self, source):
+        return {"file": self.file_campaign_list, "added": self.added_campaign_list,
+                "history": self.history_campaign_list}[source]
+
+    def _on_campaign_change(self, source, title):
+        """Reflete um comando do ChangeLog na lista da aba, nas referências e no diário."""
+        camp = self._campaigns(source).get(title)
+        pane = self._pane(source)
+        if pane is None:
+            pass  # Aba ainda não montada: a lista sai inteira dos dados quando ela abrir
+        elif camp is None:
+            index = pane.remove(title)
+            if index is not None:
+                self._removed_at[(source, title)] = index
+        elif title not in pane:
+            pane.insert(title, self._removed_at.pop((source, title), None))
+        self.references.set_campaign(source, title, camp)
+        if source != "file":
+            self._journal_history(title)
+
+    def undo(self, event=None):
+        if self._typing(event):
+            return None  # Ctrl+Z num campo de texto é o desfazer do próprio widget
+        if self._replay_change(self.changes.next_undo(), self.changes.undo, "Desfeito"):
+            return "break"
+
+    def redo(self, event=None):
+        if self._typing(event):
+            return None
+        if self._replay_change(self.changes.next_redo(), self.changes.redo, "Refeito"):
+            return "break"
+
+    @staticmethod
+    def _typing(event):
+        """True se o atalho veio de um widget de edição de texto (Text, Entry, Spinbox...)."""
+        return event is not None and isinstance(getattr(event, "widget", None), (tk.Text, tk.Entry, tk.Spinbox))
+
+    def _replay_change(self, change, apply, label):
+        """Aplica o desfazer/refazer; retorna True se algo mudou."""
+        if change is None:
+            return False
+        if self._is_loading(change.source) or (change.source == "added" and self._is_loading("history")):
+            return False
+        if self.edit_target is not None and self.edit_target[:2] == (change.source, change.title):
+            self._hide_editor()  # O editor mostraria valores antigos
+        apply()
+        self.status_var.set(f"{label}: {change.describe()}")
+        return True
 
     def setup_ui(self):
         # Header: seleção de arquivo de campanhas
@@ -111,8 +730,9 @@ class CampaignApp:
         self.form_inner = ttk.Frame(canvas)
         canvas.create_window((0, 0), window=self.form_inner, anchor="nw")
         self.form_inner.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.bind("<Enter>", lambda e: canvas.bind_all("<MouseWheel>", lambda event: self._on_mousewheel(event, canvas)))
-        canvas.bind("<Leave>", lambda e: canvas.unbind_all("<MouseWheel>"))
+        # Um único handler global de roda do mouse, que rola o canvas sob o ponteiro
+        self._scroll_canvases = {canvas}
+        self.root.bind_all("<MouseWheel>", self._on_mousewheel)
         for idx, field in enumerate(self.fields):
             lbl = ttk.Label(self.form_inner, text=field)
             lbl.grid(row=idx, column=0, sticky=tk.W, padx=5, pady=2)
@@ -129,6 +749,15 @@ class CampaignApp:
                                    command=lambda f=field, v=var: self.toggle_field(f, v))
             chk.grid(row=idx, column=2, padx=5, pady=2)
             self.check_vars[field] = var
+        # Encontro balanceado: preenche monstros/chefões/recompensas pela dificuldade e grupoMinimo
+        encounter_frame = ttk.Frame(self.form_inner)
+        encounter_frame.grid(row=len(self.fields), column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(encounter_frame, text="Nível do grupo:").pack(side=tk.LEFT)
+        self.party_level = tk.StringVar(value="1")
+        spn_level = ttk.Spinbox(encounter_frame, from_=1, to=20, width=4, textvariable=self.party_level)
+        spn_level.pack(side=tk.LEFT, padx=5)
+        btn_encounter = ttk.Button(encounter_frame, text="Gerar Encontro", command=self.generate_encounter)
+        btn_encounter.pack(side=tk.LEFT, padx=5)
 
         # Notebook com 5 abas:
         # 1. Campanhas do Arquivo, 2. Campanhas Adicionadas, 3. Histórico de Campanhas,
@@ -139,9 +768,9 @@ class CampaignApp:
         # Aba 1: Campanhas do Arquivo
         self.tab_file = ttk.Frame(notebook)
         notebook.add(self.tab_file, text="Campanhas do Arquivo")
-        self.file_campaign_listbox = tk.Listbox(self.tab_file, width=40)
-        self.file_campaign_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.file_campaign_listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("file"))
+        self.file_campaign_list = VirtualListbox(self.tab_file, width=40)
+        self.file_campaign_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.file_campaign_list.listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("file"))
         file_button_frame = ttk.Frame(self.tab_file)
         file_button_frame.pack(fill=tk.X, padx=5, pady=5)
         btn_del_file = ttk.Button(file_button_frame, text="Excluir", command=self.delete_campaign_from_file)
@@ -150,67 +779,210 @@ class CampaignApp:
         # Aba 2: Campanhas Adicionadas (sessão atual)
         self.tab_added = ttk.Frame(notebook)
         notebook.add(self.tab_added, text="Campanhas Adicionadas")
-        self.added_campaign_listbox = tk.Listbox(self.tab_added, width=40)
-        self.added_campaign_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.added_campaign_listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("added"))
+        self.added_campaign_list = VirtualListbox(self.tab_added, width=40)
+        self.added_campaign_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.added_campaign_list.listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("added"))
         added_button_frame = ttk.Frame(self.tab_added)
         added_button_frame.pack(fill=tk.X, padx=5, pady=5)
         btn_del_added = ttk.Button(added_button_frame, text="Excluir", command=self.delete_campaign_from_added)
         btn_del_added.pack(side=tk.LEFT, padx=5)
 
-        # Aba 3: Histórico de Campanhas
-        self.tab_history = ttk.Frame(notebook)
-        notebook.add(self.tab_history, text="Histórico de Campanhas")
-        self.history_campaign_listbox = tk.Listbox(self.tab_history, width=40)
-        self.history_campaign_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.history_campaign_listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("history"))
+        # Abas 3 a 6: só o quadro vazio; o conteúdo é montado na primeira seleção
+        self.notebook = notebook
+        self.tab_history = self._add_lazy_tab(notebook, "Histórico de Campanhas", self._build_history_tab)
+        self.tab_monsters = self._add_lazy_tab(notebook, "Monstros", self._build_monsters_tab)
+        self.tab_items = self._add_lazy_tab(notebook, "Itens", self._build_items_tab)
+        if diagnostics.recorder.enabled:
+            self.tab_diagnostics = self._add_lazy_tab(notebook, "Diagnóstico", self._build_diagnostics_tab)
+        notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+        # Frame inferior: botões para adicionar campanha e gerar arquivo
+        bottom_frame = ttk.Frame(self.root)
+        bottom_frame.pack(fill=tk.X, padx=10, pady=5)
+        btn_add = ttk.Button(bottom_frame, text="Adicionar Campanha", command=self.add_campaign)
+        btn_add.pack(side=tk.LEFT, padx=5)
+        btn_generate = ttk.Button(bottom_frame, text="Gerar Arquivo", command=self.generate_file)
+        btn_generate.pack(side=tk.LEFT, padx=5)
+        btn_refs = ttk.Button(bottom_frame, text="Verificar Referências", command=self.check_references)
+        btn_refs.pack(side=tk.LEFT, padx=5)
+        btn_validate = ttk.Button(bottom_frame, text="Validar Dados", command=self.validate_data)
+        btn_validate.pack(side=tk.LEFT, padx=5)
+        btn_undo = ttk.Button(bottom_frame, text="Desfazer", command=self.undo)
+        btn_undo.pack(side=tk.LEFT, padx=5)
+        btn_redo = ttk.Button(bottom_frame, text="Refazer", command=self.redo)
+        btn_redo.pack(side=tk.LEFT, padx=5)
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        # Formato do arquivo gerado (e do snapshot do histórico, se couber na extensão dele)
+        ttk.Label(bottom_frame, text="Formato:").pack(side=tk.LEFT, padx=(5, 0))
+        self.output_format = tk.StringVar(value=FORMATS[DEFAULT_FORMAT].label)
+        format_box = ttk.Combobox(bottom_frame, textvariable=self.output_format, state="readonly", width=14,
+                                  values=[fmt.label for fmt in FORMATS.values()])
+        format_box.pack(side=tk.LEFT, padx=5)
+        self.status_var = tk.StringVar(value="Pronto")
+        self.progress = ttk.Progressbar(bottom_frame, length=200, mode="determinate", maximum=100)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        status_label = ttk.Label(bottom_frame, textvariable=self.status_var)
+        status_label.pack(side=tk.RIGHT, padx=5)
+
+        self.update_listboxes()
+
+    def _add_lazy_tab(self, notebook, text, build):
+        tab = ttk.Frame(notebook)
+        notebook.add(tab, text=text)
+        self._tab_builders[str(tab)] = build
+        return tab
+
+    def _on_tab_changed(self, event=None):
+        """Monta o conteúdo da aba selecionada, se for a primeira vez."""
+        build = self._tab_builders.pop(str(self.notebook.select()), None)
+        if build is not None:
+            with diagnostics.recorder.span("montar_aba"):
+                build()
+
+    def _build_history_tab(self):
+        """Aba 3: Histórico de Campanhas."""
+        self.history_campaign_list = VirtualListbox(self.tab_history, width=40)
+        self.history_campaign_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.history_campaign_list.listbox.bind("<Double-Button-1>", lambda e: self.edit_campaign_popup("history"))
         history_button_frame = ttk.Frame(self.tab_history)
         history_button_frame.pack(fill=tk.X, padx=5, pady=5)
         btn_del_history = ttk.Button(history_button_frame, text="Excluir", command=self.delete_campaign_from_history)
         btn_del_history.pack(side=tk.LEFT, padx=5)
+        if "history" not in self._loading:
+            self.history_campaign_list.set_items(self.historic_campaigns)
 
-        # Aba 4: Monstros (importação para o campo "monstros")
-        self.tab_monsters = ttk.Frame(notebook)
-        notebook.add(self.tab_monsters, text="Monstros")
-        self.monster_listbox = tk.Listbox(self.tab_monsters, width=40)
-        self.monster_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.monster_listbox.bind("<Double-Button-1>", lambda e: self.show_detail_popup("monster"))
+    def _build_monsters_tab(self):
+        """Aba 4: Monstros (importação para o campo "monstros")."""
+        self.monster_search = tk.StringVar()
+        self._build_search_bar(self.tab_monsters, self.monster_search, lambda: self.filter_catalog("monster"))
+        self._build_criteria_bar(self.tab_monsters, "monster")
+        self.monster_list = VirtualListbox(self.tab_monsters, selectmode=tk.EXTENDED, width=40)
+        self.monster_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.monster_list.listbox.bind("<Double-Button-1>", lambda e: self.show_detail_popup("monster"))
         monster_button_frame = ttk.Frame(self.tab_monsters)
         monster_button_frame.pack(fill=tk.X, padx=5, pady=5)
-        btn_import_monster = ttk.Button(monster_button_frame, text="Importar para Campanha", command=lambda: self.import_monster_to_campaign(individual=True))
+        btn_import_monster = ttk.Button(monster_button_frame, text="Importar Selecionados", command=lambda: self.import_monster_to_campaign(individual=True))
         btn_import_monster.pack(side=tk.LEFT, padx=5)
-        btn_import_all_monsters = ttk.Button(monster_button_frame, text="Importar Todos", command=lambda: self.import_monster_to_campaign(individual=False))
+        btn_import_all_monsters = ttk.Button(monster_button_frame, text="Importar Filtrados", command=lambda: self.import_monster_to_campaign(individual=False))
         btn_import_all_monsters.pack(side=tk.LEFT, padx=5)
+        self._set_criteria_choices("monster", self.monsters)
+        self.filter_catalog("monster")
 
-        # Aba 5: Itens (importação para o campo "recompensas")
-        self.tab_items = ttk.Frame(notebook)
-        notebook.add(self.tab_items, text="Itens")
-        self.item_listbox = tk.Listbox(self.tab_items, width=40)
-        self.item_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.item_listbox.bind("<Double-Button-1>", lambda e: self.show_detail_popup("item"))
+    def _build_items_tab(self):
+        """Aba 5: Itens (importação para o campo "recompensas")."""
+        self.item_search = tk.StringVar()
+        self._build_search_bar(self.tab_items, self.item_search, lambda: self.filter_catalog("item"))
+        self._build_criteria_bar(self.tab_items, "item")
+        self.item_list = VirtualListbox(self.tab_items, selectmode=tk.EXTENDED, width=40)
+        self.item_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.item_list.listbox.bind("<Double-Button-1>", lambda e: self.show_detail_popup("item"))
         item_button_frame = ttk.Frame(self.tab_items)
         item_button_frame.pack(fill=tk.X, padx=5, pady=5)
-        btn_import_item = ttk.Button(item_button_frame, text="Importar para Campanha", command=lambda: self.import_item_to_campaign(individual=True))
+        btn_import_item = ttk.Button(item_button_frame, text="Importar Selecionados", command=lambda: self.import_item_to_campaign(individual=True))
         btn_import_item.pack(side=tk.LEFT, padx=5)
-        btn_import_all_items = ttk.Button(item_button_frame, text="Importar Todos", command=lambda: self.import_item_to_campaign(individual=False))
+        btn_import_all_items = ttk.Button(item_button_frame, text="Importar Filtrados", command=lambda: self.import_item_to_campaign(individual=False))
         btn_import_all_items.pack(side=tk.LEFT, padx=5)
+        self._set_criteria_choices("item", self.items)
+        self.filter_catalog("item")
 
-        # Frame inferior: botões para adicionar campanha e gerar arquivo
-        bottom_frame = ttk.Frame(self.root)
-        bottom_frame.pack(fill=tk.X, padx=10, pady=5)
-        btn_add = ttk.Button(bottom_frame, text="Adicionar Campanha", command=self.add_campaign)
-        btn_add.pack(side=tk.LEFT, padx=5)
-        btn_generate = ttk.Button(bottom_frame, text="Gerar Arquivo", command=self.generate_file)
-        btn_generate.pack(side=tk.LEFT, padx=5)
+    def _build_diagnostics_tab(self):
+        """Aba 6 (só com a instrumentação ligada): Diagnóstico."""
+        diag_button_frame = ttk.Frame(self.tab_diagnostics)
+        diag_button_frame.pack(fill=tk.X, padx=5, pady=5)
+        btn_diag_refresh = ttk.Button(diag_button_frame, text="Atualizar", command=self.refresh_diagnostics)
+        btn_diag_refresh.pack(side=tk.LEFT, padx=5)
+        btn_diag_clear = ttk.Button(diag_button_frame, text="Limpar",
+                                    command=lambda: (diagnostics.recorder.clear(), self.refresh_diagnostics()))
+        btn_diag_clear.pack(side=tk.LEFT, padx=5)
+        btn_diag_save = ttk.Button(diag_button_frame, text="Salvar Trace JSON...", command=self.save_trace)
+        btn_diag_save.pack(side=tk.LEFT, padx=5)
+        self.diagnostics_text = LazyText(self.tab_diagnostics, wrap=tk.NONE, width=60)
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.refresh_diagnostics()
 
-        self.update_listboxes()
+    def _build_search_bar(self, parent, var, callback):
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        ent = ttk.Entry(search_frame, textvariable=var)
+        ent.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        btn_clear = ttk.Button(search_frame, text="Limpar", command=lambda: var.set(""))
+        btn_clear.pack(side=tk.LEFT)
+        var.trace_add("write", lambda *args: callback())
+
+    def _build_criteria_bar(self, parent, source):
+        """Combos de critérios (ver CATALOG_CRITERIA); os valores vêm do catálogo carregado."""
+        criteria_frame = ttk.Frame(parent)
+        criteria_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        self.criteria_vars[source] = {}
+        self.criteria_boxes[source] = {}
+        for field, label in CATALOG_CRITERIA[source]:
+            keys = ("min", "max") if field == "nivelDesafio" else (None,)
+            for key in keys:
+                ttk.Label(criteria_frame, text=label if key != "max" else "até:").pack(side=tk.LEFT)
+                var = tk.StringVar()
+                box = ttk.Combobox(criteria_frame, textvariable=var, width=8 if key else 20)
+                box.pack(side=tk.LEFT, padx=(2, 8))
+                var.trace_add("write", lambda *args: self.filter_catalog(source))
+                self.criteria_vars[source][(field, key)] = var
+                self.criteria_boxes[source].setdefault(field, []).append(box)
+        btn_clear = ttk.Button(criteria_frame, text="Limpar Critérios",
+                               command=lambda: [var.set("") for var in self.criteria_vars[source].values()])
+        btn_clear.pack(side=tk.LEFT)
+
+    def _set_criteria_choices(self, source, records):
+        facets = getattr(records, "facets", None)
+        for field, boxes in self.criteria_boxes.get(source, {}).items():
+            values = [""] + (facets.values(field) if facets is not None and field in facets.fields else [])
+            for box in boxes:
+                box["values"] = values
+
+    def _criteria(self, source):
+        """Critérios preenchidos na aba, no formato de Facets.match."""
+        criteria = {}
+        low = high = None
+        for (field, key), var in self.criteria_vars[source].items():
+            text = var.get().strip()
+            if not text:
+                continue
+            if key == "min":
+                low = challenge_value(text)
+            elif key == "max":
+                high = challenge_value(text)
+            else:
+                criteria[field] = text
+        if low is not None or high is not None:
+            criteria["nivelDesafio"] = (low, high)
+        return criteria
+
+    def filter_catalog(self, source, keep=False):
+        """Filtra a lista de monstros/itens pelo texto digitado na busca e pelos critérios.
 
-    def _on_mousewheel(self, event, canvas):
-        canvas.yview_scroll(-1 * (event.delta // 120), "units")
+        `keep` mantém a seleção e a rolagem (recarga do catálogo alterado em disco).
+        """
+        if source in self._loading:
+            return  # O filtro é aplicado quando a carga termina
+        if (self.monster_list if source == "monster" else self.item_list) is None:
+            return  # Aba ainda não montada: filtra quando ela abrir
+        if source == "monster":
+            self.monster_list.set_items(filter_names(self.monster_index, getattr(self.monsters, "facets", None),
+                                                     self.monster_search.get(), self._criteria("monster")),
+                                        keep=keep)
+        elif source == "item":
+            self.item_list.set_items(filter_names(self.item_index, getattr(self.items, "facets", None),
+                                                  self.item_search.get(), self._criteria("item")), keep=keep)
+
+    def _on_mousewheel(self, event):
+        widget = event.widget
+        while widget is not None and widget not in self._scroll_canvases:
+            widget = getattr(widget, "master", None)
+        if widget is not None:
+            widget.yview_scroll(-1 * (event.delta // 120), "units")
 
     def toggle_field(self, field, var):
         widget = self.entries[field]
-        default = "0" if field in self.numeric_fields else "nenhum"
+        default = empty_value(field)
         if var.get():
             if field in self.list_fields:
                 widget.config(state=tk.NORMAL)
@@ -230,45 +1002,86 @@ class CampaignApp:
                 widget.config(state=tk.NORMAL)
                 widget.delete(0, tk.END)
 
-    def add_campaign(self):
-        camp = {}
+    def _read_form(self, entries, check_vars):
+        """Lê os widgets do formulário: (campo -> texto, campos marcados "Não tem")."""
+        values = {}
         for field in self.fields:
-            widget = self.entries[field]
+            widget = entries[field]
             if field in self.list_fields:
-                if self.check_vars[field].get():
-                    value = "nenhum"
-                else:
-                    value = widget.get("1.0", tk.END).strip()
+                values[field] = widget.get("1.0", tk.END)
             else:
-                if self.check_vars[field].get():
-                    value = "0" if field in self.numeric_fields else "nenhum"
-                else:
-                    value = widget.get().strip()
-            camp[field] = value
-        if not camp.get("titulo") or camp["titulo"] == "nenhum":
-            messagebox.showerror("Erro", "O campo 'titulo' é obrigatório.")
-            return
-        self.added_campaigns[camp["titulo"]] = camp
-        self.update_listboxes()
+                values[field] = widget.get()
+        empty = {field for field in self.fields if check_vars[field].get()}
+        return values, empty
+
+    def add_campaign(self):
+        try:
+            camp = build_campaign(*self._read_form(self.entries, self.check_vars))
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+            return
+        if self._form_problems(camp):
+            return
+        self.changes.add("added", camp["titulo"], camp)
         messagebox.showinfo("Sucesso", f"Campanha '{camp['titulo']}' adicionada com sucesso!")
         self.clear_form()
 
+    def generate_encounter(self):
+        """Sorteia um encontro balanceado (ver EncounterBuilder) e preenche o formulário."""
+        if self._is_loading("monster") or self._is_loading("item"):
+            return
+        if not self.monsters:
+            messagebox.showerror("Erro", "Carregue o catálogo de monstros para gerar encontros.")
+            return
+        wanted = normalize_text(self.entries["dificuldade"].get().strip())
+        dificuldade = next((d for d in DIFFICULTY_LEVELS if normalize_text(d) == wanted), None)
+        if dificuldade is None:
+            messagebox.showerror("Erro", "Preencha a dificuldade com fácil, médio ou difícil.")
+            return
+        try:
+            party_size = int(self.entries["grupoMinimo"].get().strip())
+            level = int(self.party_level.get())
+        except ValueError:
+            messagebox.showerror("Erro", "O grupoMinimo e o nível do grupo devem ser números inteiros.")
+            return
+        with diagnostics.recorder.span("generate_encounter") as info:
+            try:
+                if self.encounters is None:
+                    self.encounters = EncounterBuilder(self.monsters, self.items)
+                encounter = self.encounters.generate(dificuldade, party_size, level)
+            except ValueError as e:
+                messagebox.showerror("Erro", str(e))
+                return
+            if encounter is None:
+                messagebox.showerror("Erro", "Nenhuma combinação de monstros do catálogo cabe no orçamento de XP.")
+                return
+            info["registros"] = len(encounter["monstros"]) + 1
+            for field in ("monstros", "chefões", "recompensas"):
+                if self.check_vars[field].get():
+                    self.check_vars[field].set(False)
+                    self.toggle_field(field, self.check_vars[field])
+                widget = self.entries[field]
+                widget.delete("1.0", tk.END)
+                widget.insert(tk.END, "\n".join(encounter[field]) if encounter[field] else empty_value(field))
+        self.status_var.set(f"Encontro {dificuldade}: {info['registros']} monstro(s), "
+                            f"{encounter['xp']} XP ({encounter['xp_ajustado']} XP ajustado)")
+
     def update_listboxes(self):
-        self.file_campaign_listbox.delete(0, tk.END)
-        for name in self.file_campaigns:
-            self.file_campaign_listbox.insert(tk.END, name)
-        self.added_campaign_listbox.delete(0, tk.END)
-        for name in self.added_campaigns:
-            self.added_campaign_listbox.insert(tk.END, name)
-        self.history_campaign_listbox.delete(0, tk.END)
-        for name in self.historic_campaigns:
-            self.history_campaign_listbox.insert(tk.END, name)
-        self.monster_listbox.delete(0, tk.END)
-        for name in self.monsters:
-            self.monster_listbox.insert(tk.END, name)
-        self.item_listbox.delete(0, tk.END)
-        for name in self.items:
-            self.item_listbox.insert(tk.END, name)
+        """Recarrega todas as listas a partir dos dicionários (apenas em cargas completas).
+
+        Mutações pontuais (adicionar, editar, excluir) atualizam só o painel afetado
+        via VirtualListbox.insert/rename/remove.
+        """
+        with diagnostics.recorder.span("update_listboxes") as info:
+            self.file_campaign_list.set_items(self.file_campaigns)
+            self.added_campaign_list.set_items(self.added_campaigns)
+            if self.history_campaign_list is not None:
+                self.history_campaign_list.set_items(self.historic_campaigns)
+            self.filter_catalog("monster")
+            self.filter_catalog("item")
+            info["registros"] = sum(len(pane) for pane in (
+                self.file_campaign_list, self.added_campaign_list, self.history_campaign_list,
+                self.monster_list, self.item_list) if pane is not None)
 
     def clear_form(self):
         for field in self.fields:
@@ -282,56 +1095,135 @@ class CampaignApp:
             self.check_vars[field].set(False)
 
     def select_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
+        file_path = filedialog.askopenfilename(filetypes=[("Campanhas", file_patterns()), ("JSON Files", "*.json"),
+                                                          ("Todos os arquivos", "*")])
         if file_path:
+            if self.campaign_file_path:
+                self._unwatch(self.campaign_file_path)
             self.campaign_file_path = file_path
             self.file_label.config(text=os.path.basename(file_path))
             self.load_file_campaigns()
         else:
             self.file_label.config(text="Nenhum arquivo selecionado")
 
-    def load_file_campaigns(self):
-        try:
-            with open(self.campaign_file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                self.file_campaigns = {}
-                for camp in data:
-                    if "titulo" in camp:
-                        self.file_campaigns[camp["titulo"]] = camp
+    def load_file_campaigns(self, reload=False):
+        """Carrega o arquivo de campanhas selecionado.
+
+        Com `reload` (o arquivo mudou em disco), as alterações ainda não gravadas
+        são reaplicadas sobre a versão nova (ver ChangeLog.rebase) em vez de
+        descartadas, e a lista mantém a seleção.
+        """
+        def load(on_batch):
+            refs = RefCollector()
+            check = RecordCheck(validator_for("campanhas"))  # Validação na mesma passada da leitura
+            return (load_records(path, "titulo", on_batch=on_batch, visit=refs, decode=Campaign.from_dict,
+                                 check=check, fmt=format_for(path)), refs.refs)
+
+        def apply(records, refs):
+            # Posições no arquivo lido, antes da mescla (que pode trocar registros por versões em memória)
+            self.file_locations = records.locations()
+            self.references.set_source("file", refs)
+            if reload:
+                conflicts = self.changes.rebase("file", records)
+                self.file_campaigns = records
+                pending = self.changes.pending("file")
+                for title in [*pending["modified"], *pending["added"], *pending["deleted"]]:
+                    self.references.set_campaign("file", title, records.get(title))
+                self._keep_editor("file")
             else:
-                if "titulo" in data:
-                    self.file_campaigns = {data["titulo"]: data}
-                else:
-                    self.file_campaigns = {}
-            self.update_listboxes()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar campanhas do arquivo: {e}")
+                self.changes.reset_source("file")
+                self.file_campaigns = records
+            self.file_campaign_list.set_items(records, keep=reload)
+            self._watch(path, signature, lambda: self.load_file_campaigns(reload=True))
+            if reload:
+                note = f" (suas alterações prevaleceram em: {', '.join(conflicts)})" if conflicts else ""
+                self._post(self.status_var.set, f"{os.path.basename(path)} recarregado do disco{note}.")
+            self._report_problems("file", path, records.problems)
+        path = self.campaign_file_path
+        signature = file_signature(path) if os.path.exists(path) else None
+        self._start_load("file", path, self.file_campaign_list, load, apply,
+                         "Erro ao carregar campanhas do arquivo", reload)
+
+    def _report_problems(self, source, path, check):
+        """Guarda os problemas de validação da carga e avisa na barra de status."""
+        self.problems[source] = check
+        if check is not None and check.count:
+            self._post(self.status_var.set, f"{os.path.basename(path)}: {check.count} problema(s) de validação "
+                                            "(ver Validar Dados).")
+
+    def _form_problems(self, camp, parent=None):
+        """Valida uma campanha do formulário pelo schema; mostra os problemas e retorna True se houver."""
+        problems = validator_for("campanhas")(camp)
+        if not problems:
+            return False
+        lines = [f"{path}: {message}" for path, message in problems[:PROBLEMS_MAX_LINES]]
+        if len(problems) > PROBLEMS_MAX_LINES:
+            lines.append(f"... e mais {len(problems) - PROBLEMS_MAX_LINES}")
+        messagebox.showerror("Erro", "Corrija os campos:\n\n" + "\n".join(lines), parent=parent)
+        return True
+
+    def _keep_editor(self, source):
+        """Depois de uma recarga, aponta o editor aberto para o registro novo do mesmo título.
+
+        O formulário não é tocado: o que o usuário digitou é salvo sobre a versão nova.
+        """
+        if self.edit_target is None or self.edit_target[0] != source:
+            return
+        _, name, camp = self.edit_target
+        current = self._campaigns(source).get(name)
+        if current is not None and current is not camp:
+            self.edit_target = (source, name, current)
 
     def edit_campaign_popup(self, source):
+        if self._is_loading(source):
+            return
         if source == "file":
-            selection = self.file_campaign_listbox.curselection()
-            if not selection:
+            name = self.file_campaign_list.selected()
+            if name is None:
                 return
-            name = self.file_campaign_listbox.get(selection[0])
             camp = self.file_campaigns[name]
         elif source == "added":
-            selection = self.added_campaign_listbox.curselection()
-            if not selection:
+            name = self.added_campaign_list.selected()
+            if name is None:
                 return
-            name = self.added_campaign_listbox.get(selection[0])
             camp = self.added_campaigns[name]
         elif source == "history":
-            selection = self.history_campaign_listbox.curselection()
-            if not selection:
+            name = self.history_campaign_list.selected()
+            if name is None:
                 return
-            name = self.history_campaign_listbox.get(selection[0])
             camp = self.historic_campaigns[name]
         else:
             return
+        if self.editor is None:
+            self._build_editor()
+        self.edit_target = (source, name, camp)
+        self.editor.title(f"Editar Campanha - {name}")
+        for field in self.fields:
+            widget = self.edit_entries[field]
+            value = camp.get(field, "")
+            empty = is_empty_value(value)
+            if empty:
+                value = empty_value(field)
+            elif isinstance(value, list):
+                value = "\n".join(str(v) for v in value)
+            self.edit_check_vars[field].set(empty)
+            state = tk.DISABLED if empty else tk.NORMAL
+            if field in self.list_fields:
+                widget.set_text(str(value), state=state)
+            else:
+                widget.config(state=tk.NORMAL)
+                widget.delete(0, tk.END)
+                widget.insert(0, value)
+                widget.config(state=state)
+        self.editor_canvas.yview_moveto(0)
+        self.editor.deiconify()
+        self.editor.lift()
+
+    def _build_editor(self):
+        """Cria a janela de edição uma única vez; edit_campaign_popup só a repreenche."""
         popup = tk.Toplevel(self.root)
-        popup.title(f"Editar Campanha - {name}")
         popup.geometry("600x600")
+        popup.protocol("WM_DELETE_WINDOW", self._hide_editor)
         canvas = tk.Canvas(popup)
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar = ttk.Scrollbar(popup, orient="vertical", command=canvas.yview)
@@ -340,56 +1232,53 @@ class CampaignApp:
         frame = ttk.Frame(canvas)
         canvas.create_window((0, 0), window=frame, anchor="nw")
         frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.bind("<Enter>", lambda e: canvas.bind_all("<MouseWheel>", lambda event: self._on_mousewheel(event, canvas)))
-        canvas.bind("<Leave>", lambda e: canvas.unbind_all("<MouseWheel>"))
-        edit_entries = {}
-        edit_check_vars = {}
+        self._scroll_canvases.add(canvas)
         for idx, field in enumerate(self.fields):
             lbl = ttk.Label(frame, text=field)
             lbl.grid(row=idx, column=0, sticky=tk.W, padx=5, pady=2)
             if field in self.list_fields:
-                txt = tk.Text(frame, height=3, width=40)
-                txt.grid(row=idx, column=1, sticky=tk.W, padx=5, pady=2)
-                current_val = camp.get(field, "")
-                txt.insert(tk.END, current_val)
-                edit_entries[field] = txt
+                widget = LazyText(frame, height=3, width=40)
             else:
-                ent = ttk.Entry(frame, width=40)
-                ent.grid(row=idx, column=1, sticky=tk.W, padx=5, pady=2)
-                ent.insert(0, camp.get(field, ""))
-                edit_entries[field] = ent
-            var = tk.BooleanVar(value=(camp.get(field, "") == "nenhum" or camp.get(field, "") == "0"))
+                widget = ttk.Entry(frame, width=40)
+            widget.grid(row=idx, column=1, sticky=tk.W, padx=5, pady=2)
+            self.edit_entries[field] = widget
+            var = tk.BooleanVar()
             chk = ttk.Checkbutton(frame, text="Não tem", variable=var,
-                                  command=lambda f=field, v=var, key=field: self.toggle_field_edit(f, v, edit_entries, key))
+                                  command=lambda f=field, v=var: self.toggle_field_edit(f, v, self.edit_entries, f))
             chk.grid(row=idx, column=2, padx=5, pady=2)
-            edit_check_vars[field] = var
-
-        def save_changes():
-            for field in self.fields:
-                widget = edit_entries[field]
-                if field in self.list_fields:
-                    if edit_check_vars[field].get():
-                        value = "nenhum"
-                    else:
-                        value = widget.get("1.0", tk.END).strip()
-                else:
-                    if edit_check_vars[field].get():
-                        value = "0" if field in self.numeric_fields else "nenhum"
-                    else:
-                        value = widget.get().strip()
-                camp[field] = value
-            if source == "file":
-                self.modified_file_campaigns.add(name)
-            self.update_listboxes()
-            messagebox.showinfo("Sucesso", f"Campanha '{name}' atualizada com sucesso!")
-            popup.destroy()
-
-        btn_save = ttk.Button(frame, text="Salvar Alterações", command=save_changes)
+            self.edit_check_vars[field] = var
+        btn_save = ttk.Button(frame, text="Salvar Alterações", command=self._save_edit)
         btn_save.grid(row=len(self.fields), column=0, columnspan=3, pady=10)
+        self.editor, self.editor_canvas = popup, canvas
+
+    def _hide_editor(self):
+        self.edit_target = None
+        self.editor.withdraw()
+
+    def _save_edit(self):
+        if self.edit_target is None:
+            return
+        source, name, camp = self.edit_target
+        if self._is_loading(source):
+            return  # O formulário continua aberto; salve de novo ao fim da carga
+        if self._campaigns(source).get(name) is not camp:
+            messagebox.showerror("Erro", f"A campanha '{name}' foi excluída ou recarregada.", parent=self.editor)
+            self._hide_editor()
+            return
+        try:
+            values = build_campaign(*self._read_form(self.edit_entries, self.edit_check_vars))
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=self.editor)
+            return
+        if self._form_problems(values, parent=self.editor):
+            return
+        self.changes.edit(source, name, values)
+        messagebox.showinfo("Sucesso", f"Campanha '{name}' atualizada com sucesso!", parent=self.editor)
+        self._hide_editor()
 
     def toggle_field_edit(self, field, var, entries, key):
         widget = entries[key]
-        default = "0" if field in self.numeric_fields else "nenhum"
+        default = empty_value(field)
         if var.get():
             if field in self.list_fields:
                 widget.config(state=tk.NORMAL)
@@ -410,148 +1299,363 @@ class CampaignApp:
                 widget.delete(0, tk.END)
 
     def delete_campaign_from_file(self):
-        selection = self.file_campaign_listbox.curselection()
-        if not selection:
+        if self._is_loading("file"):
+            return
+        name = self.file_campaign_list.selected()
+        if name is None:
             messagebox.showerror("Erro", "Selecione uma campanha para excluir.")
             return
-        name = self.file_campaign_listbox.get(selection[0])
         if messagebox.askyesno("Confirmação", f"Excluir a campanha '{name}' do arquivo atual?"):
-            if name in self.file_campaigns:
-                del self.file_campaigns[name]
-            if name in self.modified_file_campaigns:
-                self.modified_file_campaigns.remove(name)
-            self.update_listboxes()
+            self.changes.delete("file", name)
 
     def delete_campaign_from_added(self):
-        selection = self.added_campaign_listbox.curselection()
-        if not selection:
+        if self._is_loading("history"):
+            return  # A versão do histórico (se houver) é restaurada no diário
+        name = self.added_campaign_list.selected()
+        if name is None:
             messagebox.showerror("Erro", "Selecione uma campanha para excluir dos adicionados.")
             return
-        name = self.added_campaign_listbox.get(selection[0])
         if messagebox.askyesno("Confirmação", f"Excluir a campanha '{name}' dos adicionados?"):
-            if name in self.added_campaigns:
-                del self.added_campaigns[name]
-            self.update_listboxes()
+            self.changes.delete("added", name)
 
     def delete_campaign_from_history(self):
-        selection = self.history_campaign_listbox.curselection()
-        if not selection:
+        if self._is_loading("history"):
+            return
+        name = self.history_campaign_list.selected()
+        if name is None:
             messagebox.showerror("Erro", "Selecione uma campanha para excluir do histórico.")
             return
-        name = self.history_campaign_listbox.get(selection[0])
         if messagebox.askyesno("Confirmação", f"Excluir a campanha '{name}' do histórico?"):
-            if name in self.historic_campaigns:
-                del self.historic_campaigns[name]
-            self.update_listboxes()
+            self.changes.delete("history", name)
 
     def import_monster_to_campaign(self, individual=True):
-        if individual:
-            selection = self.monster_listbox.curselection()
-            if not selection:
-                messagebox.showerror("Erro", "Selecione um monstro para importar.")
-                return
-            name = self.monster_listbox.get(selection[0])
-            current = self.entries["monstros"].get("1.0", tk.END).strip()
-            new_val = current + ("\n" if current else "") + name
-            self.entries["monstros"].delete("1.0", tk.END)
-            self.entries["monstros"].insert(tk.END, new_val)
-        else:
-            names = list(self.monsters.keys())
-            current = self.entries["monstros"].get("1.0", tk.END).strip()
-            for n in names:
-                current += "\n" + n if current else n
-            self.entries["monstros"].delete("1.0", tk.END)
-            self.entries["monstros"].insert(tk.END, current)
-        messagebox.showinfo("Sucesso", "Monstro(s) importado(s) para a campanha.")
+        self._import_from_catalog("monster", individual)
 
     def import_item_to_campaign(self, individual=True):
+        self._import_from_catalog("item", individual)
+
+    def _import_from_catalog(self, source, individual):
+        """Acrescenta ao campo da campanha os ids dos selecionados (ou de toda a lista filtrada).
+
+        Registros que o campo já cita (por id ou nome) são pulados, e o texto é
+        atualizado uma única vez, acrescentando só as linhas novas.
+        """
+        if self._is_loading(source):
+            return
+        field, catalog, singular, plural = CATALOG_IMPORTS[source]
+        pane = self.monster_list if source == "monster" else self.item_list
         if individual:
-            selection = self.item_listbox.curselection()
-            if not selection:
-                messagebox.showerror("Erro", "Selecione um item para importar.")
+            names = pane.selected_all()
+            if not names:
+                messagebox.showerror("Erro", f"Selecione um ou mais {catalog} para importar.")
                 return
-            name = self.item_listbox.get(selection[0])
-            current = self.entries["recompensas"].get("1.0", tk.END).strip()
-            new_val = current + ("\n" if current else "") + name
-            self.entries["recompensas"].delete("1.0", tk.END)
-            self.entries["recompensas"].insert(tk.END, new_val)
         else:
-            names = list(self.items.keys())
-            current = self.entries["recompensas"].get("1.0", tk.END).strip()
-            for n in names:
-                current += "\n" + n if current else n
-            self.entries["recompensas"].delete("1.0", tk.END)
-            self.entries["recompensas"].insert(tk.END, current)
-        messagebox.showinfo("Sucesso", "Item(s) importado(s) para a campanha.")
+            names = list(pane)
+            if not names:
+                messagebox.showerror("Erro", f"Nenhum {singular} atende à busca e aos critérios.")
+                return
+            if len(names) > IMPORT_CONFIRM and not messagebox.askyesno(
+                    "Confirmar", f"Importar {len(names)} {catalog} para a campanha?"):
+                return
+        with diagnostics.recorder.span(f"import_{source}_to_campaign", registros=len(names)) as info:
+            widget = self.entries[field]
+            current = widget.get("1.0", tk.END).strip()
+            if is_empty_value(current):
+                current = ""
+            refs = self.references.new_refs(catalog, current, names)
+            info["registros"] = len(refs)
+            if refs and not current:
+                widget.delete("1.0", tk.END)
+                widget.insert(tk.END, "\n".join(refs))
+            elif refs:
+                widget.insert(tk.END, "\n" + "\n".join(refs))
+        skipped = len(names) - len(refs)
+        message = f"{plural} importado(s) para a campanha: {len(refs)}."
+        if skipped:
+            message += f" {skipped} já estava(m) na campanha."
+        messagebox.showinfo("Sucesso", message)
 
     def show_detail_popup(self, source):
+        if self._is_loading(source):
+            return
         if source == "monster":
-            selection = self.monster_listbox.curselection()
-            if not selection:
+            name = self.monster_list.selected()
+            if name is None:
                 return
-            name = self.monster_listbox.get(selection[0])
             detail = self.monsters.get(name, {})
+            catalog = "monstros"
         elif source == "item":
-            selection = self.item_listbox.curselection()
-            if not selection:
+            name = self.item_list.selected()
+            if name is None:
                 return
-            name = self.item_listbox.get(selection[0])
             detail = self.items.get(name, {})
+            catalog = "itens"
         else:
             return
-        popup = tk.Toplevel(self.root)
-        popup.title(f"Detalhes - {name}")
-        text = tk.Text(popup, wrap=tk.WORD, width=60, height=20)
-        text.pack(fill=tk.BOTH, expand=True)
         detail_str = json.dumps(detail, indent=4, ensure_ascii=False)
-        text.insert(tk.END, detail_str)
-        text.config(state=tk.DISABLED)
+        users = self.references.users_of(catalog, name)
+        if users:
+            labels = {"file": "arquivo", "added": "adicionadas", "history": "histórico"}
+            detail_str += "\n\nUsado em:\n" + "\n".join(f" - {title} ({labels[src]})" for src, title in users)
+        self._show_text_window(f"Detalhes - {name}", detail_str)
+
+    def _show_text_window(self, title, text):
+        """Mostra um texto somente leitura na janela de detalhes, criada uma vez e reaproveitada."""
+        if self.detail_window is None:
+            popup = tk.Toplevel(self.root)
+            popup.protocol("WM_DELETE_WINDOW", popup.withdraw)
+            self.detail_text = LazyText(popup, wrap=tk.WORD, width=60, height=20)
+            self.detail_text.pack(fill=tk.BOTH, expand=True)
+            self.detail_window = popup
+        self.detail_window.title(title)
+        self.detail_text.set_text(text, state=tk.DISABLED)
+        self.detail_window.deiconify()
+        self.detail_window.lift()
+
+    def refresh_diagnostics(self):
+        """Mostra na aba Diagnóstico o resumo por operação e os eventos mais recentes."""
+        if self.diagnostics_text is None:
+            return  # Aba ainda não montada
+        lines = [self.startup.format(), "", f"{'operação':<28} {'vezes':>5} {'total ms':>10} {'máx ms':>9} {'registros':>10} "
+                 f"{'lidos KB':>10} {'gravados KB':>11}"]
+        for op, stats in diagnostics.recorder.summary().items():
+            lines.append(f"{op:<28} {stats['vezes']:>5} {stats['total'] * 1000:>10.1f} {stats['maximo'] * 1000:>9.1f} "
+                         f"{stats['registros']:>10} {stats['bytes_lidos'] / 1024:>10.1f} "
+                         f"{stats['bytes_gravados'] / 1024:>11.1f}")
+        lines.append("")
+        lines.append("Eventos recentes:")
+        for event in list(diagnostics.recorder.events)[-DIAG_RECENT_EVENTS:]:
+            extra = ", ".join(f"{k}={v}" for k, v in event.items() if k not in ("op", "inicio", "segundos"))
+            lines.append(f"{event['inicio']:>10.3f}s  {event['op']:<28} {event['segundos'] * 1000:>9.1f} ms  {extra}")
+        self.diagnostics_text.set_text("\n".join(lines), state=tk.DISABLED)
+
+    def save_trace(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
+        if not path:
+            return
+        try:
+            diagnostics.recorder.dump(path)
+        except OSError as e:
+            messagebox.showerror("Erro", f"Erro ao salvar o trace: {e}")
+
+    def check_references(self):
+        """Lista monstros/itens citados pelas campanhas que não existem nos catálogos."""
+        if any(self._is_loading(s) for s in ("file", "history", "monster", "item")):
+            return
+        dangling = self.references.dangling()
+        if not dangling:
+            messagebox.showinfo("Referências", "Todas as referências a monstros e itens foram encontradas.")
+            return
+        labels = {"file": "arquivo", "added": "adicionadas", "history": "histórico"}
+        self._show_text_window(f"Referências não encontradas ({len(dangling)})",
+                               "\n".join(f"{title} ({labels[src]}) - {field}: {ref}"
+                                         for src, title, field, ref in dangling))
+
+    def validate_data(self):
+        """Lista os problemas de schema: os das cargas (arquivo, monstros, itens) e os das campanhas alteradas."""
+        if any(self._is_loading(s) for s in ("file", "monster", "item")):
+            return
+        lines = []
+        total = 0
+        labels = {"file": "Arquivo de campanhas", "monster": "Monstros", "item": "Itens"}
+        for source, label in labels.items():
+            check = self.problems.get(source)
+            if check is None or not check.count:
+                continue
+            total += check.count
+            lines.append(f"{label} (ao carregar): {check.count} problema(s)")
+            lines.extend(f"  {format_problem(p)}" for p in check.problems)
+            if check.count > len(check.problems):
+                lines.append(f"  ... e mais {check.count - len(check.problems)}")
+        edited = validate_records(self.file_campaigns, "campanhas", self.changes.pending("file")["modified"])
+        added = validate_records(self.added_campaigns, "campanhas")
+        for label, problems in (("Campanhas editadas do arquivo", edited), ("Campanhas adicionadas", added)):
+            if problems:
+                total += len(problems)
+                lines.append(f"{label}: {len(problems)} problema(s)")
+                lines.extend(f"  {format_problem(p)}" for p in problems)
+        if not lines:
+            messagebox.showinfo("Validação", "Nenhum problema encontrado.")
+            return
+        self._show_text_window(f"Problemas de validação ({total})", "\n".join(lines))
 
     def generate_file(self):
-        summary = "Resumo das alterações:\n\n"
-        if self.modified_file_campaigns:
-            summary += "Campanhas modificadas (do arquivo):\n"
-            for name in self.modified_file_campaigns:
-                summary += f" - {name}\n"
+        if self._is_loading("file"):
+            return
+        if self.campaign_file_path is None:
+            messagebox.showerror("Erro", "Selecione um arquivo de campanhas.")
+            return
+        pending = self.changes.pending("file")
+        modified, deleted = pending["modified"], pending["deleted"]
+        additions = pending_additions(self.file_campaigns, pending["added"], self.added_campaigns)
+        skipped = set(skipped_additions(self.file_campaigns, self.file_locations, modified, additions, deleted))
+        lines = []
+        # Só o que será reescrito é validado; o resto do arquivo foi validado na carga
+        problems = validate_records(self.file_campaigns, "campanhas", modified)
+        problems += validate_records(additions, "campanhas", [name for name in additions if name not in skipped])
+        if problems:
+            lines.append(f"Atenção: {len(problems)} problema(s) de validação nas campanhas a gravar:")
+            lines.extend(f" - {format_problem(p)}" for p in problems[:PROBLEMS_MAX_LINES])
+            if len(problems) > PROBLEMS_MAX_LINES:
+                lines.append(f" - ... e mais {len(problems) - PROBLEMS_MAX_LINES}")
+        if modified:
+            lines.append("Campanhas modificadas (do arquivo):")
+            for name, diff in modified.items():
+                lines.append(f" - {name}")
+                lines.extend(f"     {describe_diff(field, old, new)}" for field, (old, new) in diff.items())
+        if deleted:
+            lines.append("Campanhas excluídas (do arquivo):")
+            lines.extend(f" - {name}" for name in deleted)
+        if pending["added"]:
+            lines.append("Campanhas editadas aqui e excluídas do arquivo no disco (voltam ao fim do arquivo):")
+            lines.extend(f" - {name}" for name in pending["added"])
         if self.added_campaigns:
-            summary += "\nCampanhas adicionadas:\n"
-            for name in self.added_campaigns:
-                summary += f" - {name}\n"
-        summary += "\nDeseja gerar o novo arquivo de campanhas?\n\n"
-        summary += ("Observação: O arquivo original não será alterado; um novo arquivo 'campanhas_novo.json' será criado com as alterações e adições.")
+            lines.append("Campanhas adicionadas:")
+            lines.extend(f" - {name}" + (" (ignorada: o título já existe no arquivo)" if name in skipped else "")
+                         for name in self.added_campaigns)
+        if not lines:
+            lines.append("Nenhuma alteração; o novo arquivo será uma cópia do original.")
+        if len(lines) > SUMMARY_MAX_LINES:
+            lines[SUMMARY_MAX_LINES:] = [f"... e mais {len(lines) - SUMMARY_MAX_LINES} linha(s)"]
+        summary = "Resumo das alterações:\n\n" + "\n".join(lines)
+        summary += "\n\nDeseja gerar o novo arquivo de campanhas?\n\n"
+        summary += ("Observação: O arquivo original não será alterado; um novo arquivo "
+                    f"'{os.path.basename(self._new_file_path())}' será criado com as alterações e adições.")
         if not messagebox.askyesno("Confirmar Geração de Arquivo", summary):
             return
         try:
-            with open(self.campaign_file_path, "r", encoding="utf-8") as f:
-                original_data = json.load(f)
-            if not isinstance(original_data, list):
-                original_data = [original_data]
-            for i, camp in enumerate(original_data):
-                if camp.get("titulo") in self.modified_file_campaigns:
-                    original_data[i] = self.file_campaigns[camp.get("titulo")]
-            for name, camp in self.added_campaigns.items():
-                if not any(c.get("titulo") == name for c in original_data):
-                    original_data.append(camp)
-            base, ext = os.path.splitext(self.campaign_file_path)
-            new_file_path = f"{base}_novo{ext}"
-            with open(new_file_path, "w", encoding="utf-8") as f:
-                json.dump(original_data, f, ensure_ascii=False, indent=4)
+            new_file_path = self._write_new_file(pending)
             messagebox.showinfo("Sucesso", f"Novo arquivo gerado: {os.path.basename(new_file_path)}")
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao gerar novo arquivo: {e}")
 
+    def _output_format(self):
+        label = self.output_format.get()
+        return next((fmt for fmt in FORMATS.values() if fmt.label == label), FORMATS[DEFAULT_FORMAT])
+
+    def _new_file_path(self):
+        """<arquivo>_novo com a extensão do formato escolhido (ex.: campanhas_novo.jsonl)."""
+        return f"{split_extension(self.campaign_file_path)[0]}_novo{self._output_format().extension}"
+
+    def _write_new_file(self, pending=None):
+        """Grava <arquivo>_novo no formato escolhido com as alterações pendentes; retorna o caminho."""
+        if pending is None:
+            pending = self.changes.pending("file")
+        new_file_path = self._new_file_path()
+        fmt = self._output_format()
+        with diagnostics.recorder.span("generate_file", formato=fmt.name) as info:
+            # No JSON recuado só os campos alterados são reescritos; o resto do arquivo é copiado
+            info["registros"] = export_campaign_file(
+                self.campaign_file_path, new_file_path, self.file_campaigns, self.file_locations,
+                {name: set(diff) for name, diff in pending["modified"].items()},
+                pending_additions(self.file_campaigns, pending["added"], self.added_campaigns),
+                deleted=pending["deleted"], fmt=fmt)
+            info["bytes_lidos"] = os.path.getsize(self.campaign_file_path)
+            info["bytes_gravados"] = os.path.getsize(new_file_path)
+        return new_file_path
+
     def on_closing(self):
-        # Mescla as campanhas adicionadas com o histórico e salva
-        for name, camp in self.added_campaigns.items():
-            self.historic_campaigns[name] = camp
+        # Inclusões/edições/exclusões já estão no diário do histórico; o snapshot
+        # só é regravado quando o diário cresceu demais
+        if self.watcher is not None:
+            self.watcher.stop()
+        self._wait_for_load("history")
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
         try:
-            with open("campanhas_historico.json", "w", encoding="utf-8") as f:
-                json.dump(list(self.historic_campaigns.values()), f, ensure_ascii=False, indent=4)
+            with diagnostics.recorder.span("on_closing") as info:
+                if self.history_loaded and self.history.pending >= HistoryStore.COMPACT_THRESHOLD:
+                    # Mescla as campanhas adicionadas com o histórico antes de compactar
+                    for name, camp in self.added_campaigns.items():
+                        self.historic_campaigns[name] = camp
+                    fmt = self._output_format()
+                    # O snapshot só muda de formato se a extensão dele continuar valendo (JSON recuado/compacto)
+                    self.history.compact(self.historic_campaigns,
+                                         fmt if fmt.extension == self.history.format.extension else None)
+                    info["registros"] = len(self.historic_campaigns)
+                    info["bytes_gravados"] = os.path.getsize(self.history.path)
+                self.history.close()
+            if self.database is not None:
+                self.database.close()
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao salvar o histórico: {e}")
+        diagnostics.stop_profiler()
         self.root.destroy()
 
+def run_gui_benchmark(directory):
+    """Mede as ações da interface com Tk de verdade (janela oculta) nos dados de `directory`.
+
+    Complementa `python -m campanhas bench` (só a camada de dados) com o custo dos
+    widgets; exige um display. Os caminhos são relativos ao diretório, como no app.
+    """
+    root = tk.Tk()
+    root.withdraw()
+    os.chdir(directory)
+    results = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        func()
+        results[name] = round(time.perf_counter() - start, 6)
+
+    def wait_loads():
+        # As cargas iniciais só começam depois da primeira pintura
+        while app._loading or "cargas" not in app.startup.marks:
+            root.update()
+
+    app = None
+
+    def start_app():
+        nonlocal app
+        app = CampaignApp(root)
+        root.update_idletasks()
+    timed("iniciar", start_app)
+    timed("load_monsters_load_items", wait_loads)
+
+    def load_file():
+        app.campaign_file_path = os.path.abspath("campanhas.json")
+        app.load_file_campaigns()
+        wait_loads()
+    timed("load_file_campaigns", load_file)
+    timed("update_listboxes", lambda: (app.update_listboxes(), root.update_idletasks()))
+    first = next(iter(app.file_campaigns), None)
+    if first is not None:
+        timed("editar", lambda: app.changes.edit("file", first, {"dificuldade": "difícil", "npcs": ["Bench"]}))
+    timed("generate_file", app._write_new_file)
+    timed("on_closing", app.on_closing)
+    return {"registros": len(app.file_campaigns), "python": sys.version.split()[0], "operacoes": results}
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerenciador de Campanhas")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="ignora e regrava os caches de monstros.json/itens.json")
+    parser.add_argument("--banco", metavar="ARQUIVO.db",
+                        help="lê monstros, itens e histórico do banco SQLite (ver python -m campanhas banco importar)")
+    parser.add_argument("--sem-monitorar", action="store_true",
+                        help="não recarrega os arquivos de campanhas/monstros/itens quando mudam em disco")
+    parser.add_argument("--diagnostico", action="store_true",
+                        help=f"liga a instrumentação e a aba Diagnóstico (o mesmo que {diagnostics.ENV_ENABLE}=1)")
+    parser.add_argument("--tempo-inicio", nargs="?", const="texto", choices=("texto", "json"),
+                        help="imprime o tempo de cada fase da inicialização quando as cargas terminam")
+    parser.add_argument("--benchmark", metavar="DIR",
+                        help="mede as ações da interface nos dados de DIR (ver python -m campanhas sintetico) "
+                             "e imprime o resultado em JSON")
+    args = parser.parse_args()
+    if args.benchmark:
+        print(json.dumps(run_gui_benchmark(args.benchmark), ensure_ascii=False, indent=4))
+        sys.exit(0)
+    if args.diagnostico:
+        diagnostics.recorder.enabled = True
+    diagnostics.start_profiler()  # Só se CAMPANHAS_PROFILE estiver definida
+    startup = diagnostics.StartupReport(_START)
+    startup.mark("imports")
     root = tk.Tk()
-    app = CampaignApp(root)
+    startup.mark("tk")
+    app = CampaignApp(root, rebuild_cache=args.rebuild_cache, database=args.banco,
+                      watch_files=not args.sem_monitorar, startup=startup)
+    if args.tempo_inicio == "json":
+        app.on_startup_done = lambda: print(json.dumps(startup.report(), ensure_ascii=False, indent=4))
+    elif args.tempo_inicio:
+        app.on_startup_done = lambda: print(startup.format())
     root.mainloop()
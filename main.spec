@@ -10,25 +10,25 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Módulos da biblioteca padrão que o app não usa (menos para empacotar e descompactar)
+    excludes=['unittest', 'pydoc', 'doctest', 'pdb', 'lib2to3'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
+# Modo pasta (onedir): o executável de arquivo único se descompacta num
+# diretório temporário a cada abertura, o que domina o tempo de inicialização
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='main',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='main',
+)
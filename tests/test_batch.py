@@ -0,0 +1,13 @@
+import json
+
+from campanhas.batch import run_job
+
+
+def test_additions_with_existing_titles_are_reported_as_skipped(tmp_path):
+    src, dest = tmp_path / "campanhas.json", tmp_path / "saida" / "novo.json"
+    src.write_text(json.dumps([{"titulo": "A"}, {"titulo": "B"}]), encoding="utf-8")
+    job = {"origem": str(src), "destino": str(dest), "adicionar": [{"titulo": "Nova"}, {"titulo": "B"}]}
+    result = run_job(job)
+    assert result["adicionadas"] == 1
+    assert result["ignoradas"] == ["B"]
+    assert [c["titulo"] for c in json.loads(dest.read_text(encoding="utf-8"))] == ["A", "B", "Nova"]
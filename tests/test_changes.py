@@ -0,0 +1,72 @@
+from campanhas import ChangeLog
+
+
+def _log(records):
+    stores = {"file": records}
+    return stores, ChangeLog(stores.__getitem__)
+
+
+def _reload(stores, changes, fresh):
+    conflicts = changes.rebase("file", fresh)
+    stores["file"] = fresh
+    return conflicts
+
+
+def test_rebase_merges_edits_into_the_new_disk_version():
+    stores, changes = _log({"A": {"titulo": "A", "corpo": "a", "npcs": []}})
+    record = stores["file"]["A"]
+    changes.edit("file", "A", {"corpo": "meu"})
+    conflicts = _reload(stores, changes, {"A": {"titulo": "A", "corpo": "a", "npcs": ["Zé"]}})
+    assert conflicts == {}
+    assert stores["file"]["A"] is record  # Quem segura o registro (ex.: o editor) continua válido
+    assert record == {"titulo": "A", "corpo": "meu", "npcs": ["Zé"]}
+    assert changes.pending("file")["modified"] == {"A": {"corpo": ("a", "meu")}}
+
+
+def test_rebase_reports_fields_changed_on_both_sides():
+    stores, changes = _log({"A": {"titulo": "A", "corpo": "a"}})
+    changes.edit("file", "A", {"corpo": "meu"})
+    conflicts = _reload(stores, changes, {"A": {"titulo": "A", "corpo": "do disco"}})
+    assert conflicts == {"A": ["corpo"]}
+    assert stores["file"]["A"]["corpo"] == "meu"
+
+
+def test_rebase_same_change_on_both_sides_is_not_a_conflict():
+    stores, changes = _log({"A": {"titulo": "A", "corpo": "a"}})
+    changes.edit("file", "A", {"corpo": "igual"})
+    assert _reload(stores, changes, {"A": {"titulo": "A", "corpo": "igual"}}) == {}
+    assert changes.pending("file")["modified"] == {}
+
+
+def test_rebase_redoes_deletions():
+    stores, changes = _log({"A": {"titulo": "A"}, "B": {"titulo": "B"}})
+    changes.delete("file", "A")
+    fresh = {"A": {"titulo": "A", "corpo": "novo"}, "B": {"titulo": "B"}, "C": {"titulo": "C"}}
+    _reload(stores, changes, fresh)
+    assert list(fresh) == ["B", "C"]
+    assert changes.pending("file")["deleted"] == ["A"]
+
+
+def test_rebase_deleted_on_both_sides_leaves_nothing_pending():
+    stores, changes = _log({"A": {"titulo": "A"}, "B": {"titulo": "B"}})
+    changes.delete("file", "A")
+    _reload(stores, changes, {"B": {"titulo": "B"}})
+    assert changes.pending("file") == {"modified": {}, "added": [], "deleted": []}
+
+
+def test_rebase_keeps_edited_records_deleted_on_disk():
+    stores, changes = _log({"A": {"titulo": "A", "corpo": "a"}})
+    changes.edit("file", "A", {"corpo": "meu"})
+    fresh = {}
+    _reload(stores, changes, fresh)
+    assert fresh == {"A": {"titulo": "A", "corpo": "meu"}}
+    assert changes.pending("file")["added"] == ["A"]
+
+
+def test_rebase_forgets_undo_history_of_the_source():
+    stores, changes = _log({"A": {"titulo": "A", "corpo": "a"}})
+    changes.edit("file", "A", {"corpo": "meu"})
+    _reload(stores, changes, {"A": {"titulo": "A", "corpo": "a"}})
+    assert changes.next_undo() is None
+    assert changes.undo() is None
+    assert stores["file"]["A"]["corpo"] == "meu"
@@ -0,0 +1,16 @@
+from campanhas import CatalogDatabase, load_catalog_db
+
+
+def test_rebuild_ignores_the_cached_search_index(tmp_path):
+    db = CatalogDatabase(str(tmp_path / "catalogo.db"))
+    try:
+        db.put("monstros", {"id": "orc", "nome": "Orc"})
+        assert load_catalog_db(db, "monstros")[1].search("orc") == ["Orc"]
+        # Alteração feita por fora (sem passar pela geração da tabela): o índice guardado fica velho
+        with db.transaction() as cur:
+            cur.execute("UPDATE monstros SET nome = 'Goblin', dados = ? WHERE nome = 'Orc'",
+                        ('{"id": "goblin", "nome": "Goblin"}',))
+        assert load_catalog_db(db, "monstros")[1].search("goblin") == []
+        assert load_catalog_db(db, "monstros", rebuild=True)[1].search("goblin") == ["Goblin"]
+    finally:
+        db.close()
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from campanhas import (
+    ChangeLog, export_campaign_file, iter_json_array, load_records, patch_records_file, pending_additions,
+)
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records, indent=4, ensure_ascii=False), encoding="utf-8")
+
+
+def test_edited_record_deleted_on_disk_is_exported(tmp_path):
+    src = tmp_path / "campanhas.json"
+    _write(src, [{"titulo": "A"}, {"titulo": "B", "corpo": "original"}, {"titulo": "C"}])
+    stores = {"file": load_records(str(src), "titulo")}
+    changes = ChangeLog(stores.__getitem__)
+    changes.edit("file", "B", {"corpo": "editado"})
+
+    # B some do disco e o arquivo é recarregado: a edição do usuário prevalece
+    _write(src, [{"titulo": "A"}, {"titulo": "C"}])
+    fresh = load_records(str(src), "titulo")
+    locations = fresh.locations()
+    changes.rebase("file", fresh)
+    stores["file"] = fresh
+    pending = changes.pending("file")
+    assert pending["added"] == ["B"]
+
+    dest = tmp_path / "campanhas_novo.json"
+    export_campaign_file(str(src), str(dest), fresh, locations, pending["modified"],
+                         pending_additions(fresh, pending["added"], {}), deleted=pending["deleted"])
+    out = json.loads(dest.read_text(encoding="utf-8"))
+    assert [c["titulo"] for c in out] == ["A", "C", "B"]
+    assert out[2]["corpo"] == "editado"
+
+
+def _entries(path):
+    """{titulo: (offset, tamanho)} dos registros de um array JSON."""
+    return {value["titulo"]: (offset, length) for offset, length, value in iter_json_array(str(path))}
+
+
+RECORDS = [
+    {"titulo": "A", "corpo": "a", "monstros": ["orc", "goblin"]},
+    {"titulo": "B", "corpo": "b"},
+    {"titulo": "C", "corpo": "c"},
+]
+
+
+@pytest.mark.parametrize("removed", ["A", "B", "C"])
+def test_patch_removes_first_middle_and_last(tmp_path, removed):
+    src, dest = tmp_path / "c.json", tmp_path / "c_novo.json"
+    _write(src, RECORDS)
+    offset, length = _entries(src)[removed]
+    patch_records_file(str(src), str(dest), {offset: (length, None)}, [])
+    assert json.loads(dest.read_text(encoding="utf-8")) == [r for r in RECORDS if r["titulo"] != removed]
+
+
+def test_patch_removes_everything(tmp_path):
+    src, dest = tmp_path / "c.json", tmp_path / "c_novo.json"
+    _write(src, RECORDS)
+    patches = {offset: (length, None) for offset, length in _entries(src).values()}
+    patch_records_file(str(src), str(dest), patches, [])
+    assert json.loads(dest.read_text(encoding="utf-8")) == []
+
+
+def test_field_patch_keeps_the_rest_of_the_file(tmp_path):
+    src, dest = tmp_path / "c.json", tmp_path / "c_novo.json"
+    _write(src, RECORDS)
+    offset, length = _entries(src)["A"]
+    record = dict(RECORDS[0], corpo="editado", npcs=["Zé"])
+    patch_records_file(str(src), str(dest), {offset: (length, record, {"corpo", "npcs"})}, [])
+    # Só o valor de "corpo" muda e "npcs" entra no fim, no mesmo recuo: o resto é copiado
+    expected = json.dumps([record, *RECORDS[1:]], indent=4, ensure_ascii=False)
+    assert dest.read_text(encoding="utf-8") == expected
+
+
+@pytest.mark.parametrize("text", ["[]", "[\n]", "[ ]"])
+def test_additions_to_empty_array(tmp_path, text):
+    src, dest = tmp_path / "c.json", tmp_path / "c_novo.json"
+    src.write_text(text, encoding="utf-8")
+    patch_records_file(str(src), str(dest), {}, RECORDS[:2])
+    assert json.loads(dest.read_text(encoding="utf-8")) == RECORDS[:2]
+
+
+def test_additions_follow_last_element_indent(tmp_path):
+    src, dest = tmp_path / "c.json", tmp_path / "c_novo.json"
+    _write(src, RECORDS[:1])
+    patch_records_file(str(src), str(dest), {}, [{"titulo": "N"}])
+    text = dest.read_text(encoding="utf-8")
+    assert json.loads(text) == [RECORDS[0], {"titulo": "N"}]
+    assert text == json.dumps([RECORDS[0], {"titulo": "N"}], indent=4, ensure_ascii=False)
@@ -0,0 +1,26 @@
+import pytest
+
+from campanhas import validator_for
+
+
+@pytest.mark.parametrize("record", [
+    {"titulo": "A", "grupoMinimo": 3, "monstros": ["orc"]},
+    # Histórico gravado por versões antigas: texto numérico e listas como texto
+    {"titulo": "A", "grupoMinimo": "3", "monstros": "orc\ngoblin", "npcs": "nenhum"},
+    {"titulo": "A", "grupoMinimo": " 4 "},
+])
+def test_valid_campaigns(record):
+    assert validator_for("campanhas")(record) == []
+
+
+@pytest.mark.parametrize("record, field", [
+    ({"titulo": "A", "grupoMinimo": ""}, "grupoMinimo"),
+    ({"titulo": "A", "grupoMinimo": "  "}, "grupoMinimo"),
+    ({"titulo": "A", "grupoMinimo": "três"}, "grupoMinimo"),
+    ({"titulo": "A", "grupoMinimo": -1}, "grupoMinimo"),
+    ({"titulo": "A", "monstros": 3}, "monstros"),
+    ({"titulo": "A", "monstros": [""]}, "monstros[0]"),
+    ({"grupoMinimo": 3}, "titulo"),
+])
+def test_invalid_campaigns(record, field):
+    assert [path for path, _ in validator_for("campanhas")(record)] == [field]
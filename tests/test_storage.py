@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from campanhas import iter_json_array
+
+MIXED = '[12.5, -3e+10, true, null, {"titulo": "Ação", "n": 1.25}, "x", [1, 2.5], 0]'
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_scalars_split_at_chunk_boundary(tmp_path, chunk_size):
+    path = tmp_path / "a.json"
+    for text in ("[12.5]", MIXED):
+        path.write_bytes(text.encode("utf-8"))
+        data = path.read_bytes()
+        records = list(iter_json_array(str(path), chunk_size=chunk_size))
+        assert [value for _, _, value in records] == json.loads(text)
+        for offset, length, value in records:
+            assert json.loads(data[offset:offset + length]) == value
+
+
+def test_offsets_are_bytes_with_bom_and_multibyte_text(tmp_path):
+    path = tmp_path / "a.json"
+    records = [{"titulo": "Ação"}, {"titulo": "Dragão", "npcs": ["Zé"]}]
+    data = b"\xef\xbb\xbf" + json.dumps(records, indent=4, ensure_ascii=False).encode("utf-8")
+    path.write_bytes(data)
+    for chunk_size in (1, 7, 1 << 16):
+        found = list(iter_json_array(str(path), chunk_size=chunk_size))
+        assert [value for _, _, value in found] == records
+        for offset, length, value in found:
+            assert json.loads(data[offset:offset + length].decode("utf-8")) == value
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[]", []),
+    (" [ \n ] ", []),
+    ('{"titulo": "solo"}', [{"titulo": "solo"}]),
+    ("  42  ", [42]),
+])
+def test_empty_array_and_single_top_value(tmp_path, text, expected):
+    path = tmp_path / "a.json"
+    path.write_text(text, encoding="utf-8")
+    for chunk_size in (1, 3, 1 << 16):
+        assert [value for _, _, value in iter_json_array(str(path), chunk_size=chunk_size)] == expected
+
+
+def test_invalid_json_raises(tmp_path):
+    path = tmp_path / "a.json"
+    path.write_text('[{"titulo": "A"}, {"titulo": ]', encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(str(path), chunk_size=4))